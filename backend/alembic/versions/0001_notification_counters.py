@@ -0,0 +1,54 @@
+"""Contadores de notificações não lidas
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_counters",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("unread_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("patient_id", name="uq_notification_counters_patient_id"),
+        sa.UniqueConstraint("user_id", name="uq_notification_counters_user_id"),
+    )
+    op.create_index("ix_notification_counters_id", "notification_counters", ["id"])
+
+    # Popular os contadores a partir das notificações não lidas existentes
+    op.execute(
+        """
+        INSERT INTO notification_counters (patient_id, unread_count)
+        SELECT patient_id, count(*)
+        FROM notifications
+        WHERE read = false AND patient_id IS NOT NULL
+        GROUP BY patient_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO notification_counters (user_id, unread_count)
+        SELECT user_id, count(*)
+        FROM notifications
+        WHERE read = false AND user_id IS NOT NULL
+        GROUP BY user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notification_counters_id", table_name="notification_counters")
+    op.drop_table("notification_counters")
@@ -0,0 +1,42 @@
+"""Índices para listagem paginada de notificações
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_notifications_patient_created", "patient_id", None),
+    ("ix_notifications_user_created", "user_id", None),
+    ("ix_notifications_patient_unread", "patient_id", "read = false"),
+    ("ix_notifications_user_unread", "user_id", "read = false"),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de transação
+    with op.get_context().autocommit_block():
+        for name, column, where in INDEXES:
+            op.create_index(
+                name,
+                "notifications",
+                [column, sa.text("created_at DESC"), sa.text("id DESC")],
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.drop_index(name, table_name="notifications", postgresql_concurrently=True)
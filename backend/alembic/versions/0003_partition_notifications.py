@@ -0,0 +1,131 @@
+"""Particionamento mensal da tabela de notificações
+
+Converte `notifications` em tabela particionada por faixa mensal de `created_at`.
+As partições futuras passam a ser criadas pelo scheduler
+(app.services.scheduler), que também remove as partições fora da retenção.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# Meses à frente criados já na migração
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, patient_id, user_id, title, message, type, read, read_at, data, created_at"
+
+INDEXES = """
+CREATE INDEX ix_notifications_id ON notifications (id);
+CREATE INDEX ix_notifications_patient_created ON notifications (patient_id, created_at DESC, id DESC);
+CREATE INDEX ix_notifications_user_created ON notifications (user_id, created_at DESC, id DESC);
+CREATE INDEX ix_notifications_patient_unread ON notifications (patient_id, created_at DESC, id DESC)
+    WHERE read = false;
+CREATE INDEX ix_notifications_user_unread ON notifications (user_id, created_at DESC, id DESC)
+    WHERE read = false;
+"""
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    op.execute("ALTER TABLE notifications RENAME TO notifications_legacy")
+    op.execute("ALTER TABLE notifications_legacy RENAME CONSTRAINT notifications_pkey TO notifications_legacy_pkey")
+    for name in ("id", "patient_created", "user_created", "patient_unread", "user_unread"):
+        op.execute(f"DROP INDEX IF EXISTS ix_notifications_{name}")
+
+    op.execute(
+        """
+        CREATE TABLE notifications (
+            id integer NOT NULL DEFAULT nextval('notifications_id_seq'),
+            patient_id integer REFERENCES patients (id),
+            user_id integer REFERENCES users (id),
+            title varchar(255) NOT NULL,
+            message text NOT NULL,
+            type varchar(50) NOT NULL,
+            read boolean DEFAULT false,
+            read_at timestamptz,
+            data jsonb,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    # A sequência passa a pertencer à nova tabela antes de remover a antiga
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+
+    # Criar partições do mês mais antigo até MONTHS_AHEAD meses à frente
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM notifications_legacy")).scalar()
+    today = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else today
+    last = _add_months(today, MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE notifications_y{month.year}m{month.month:02d} PARTITION OF notifications "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+    op.execute(
+        f"""
+        INSERT INTO notifications ({COLUMNS})
+        SELECT id, patient_id, user_id, title, message, type, read, read_at, data,
+               coalesce(created_at, now())
+        FROM notifications_legacy
+        """
+    )
+    op.execute("DROP TABLE notifications_legacy")
+
+    # Índices no pai são propagados para todas as partições, atuais e futuras
+    for statement in INDEXES.split(";"):
+        if statement.strip():
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE notifications RENAME TO notifications_partitioned")
+    op.execute(
+        "ALTER TABLE notifications_partitioned RENAME CONSTRAINT notifications_pkey TO notifications_partitioned_pkey"
+    )
+    for name in ("id", "patient_created", "user_created", "patient_unread", "user_unread"):
+        op.execute(f"DROP INDEX IF EXISTS ix_notifications_{name}")
+
+    op.execute(
+        """
+        CREATE TABLE notifications (
+            id integer PRIMARY KEY DEFAULT nextval('notifications_id_seq'),
+            patient_id integer REFERENCES patients (id),
+            user_id integer REFERENCES users (id),
+            title varchar(255) NOT NULL,
+            message text NOT NULL,
+            type varchar(50) NOT NULL,
+            read boolean DEFAULT false,
+            read_at timestamptz,
+            data jsonb,
+            created_at timestamptz DEFAULT now()
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+    op.execute(f"INSERT INTO notifications ({COLUMNS}) SELECT {COLUMNS} FROM notifications_partitioned")
+    op.execute("DROP TABLE notifications_partitioned")
+
+    for statement in INDEXES.split(";"):
+        if statement.strip():
+            op.execute(statement)
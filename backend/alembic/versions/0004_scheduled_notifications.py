@@ -0,0 +1,49 @@
+"""Notificações agendadas
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scheduled_notifications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("type", sa.String(50), nullable=False),
+        sa.Column("data", postgresql.JSONB(), nullable=True),
+        sa.Column("send_push", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("send_email", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("send_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("notification_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_scheduled_notifications_id", "scheduled_notifications", ["id"])
+    op.create_index(
+        "ix_scheduled_notifications_pending",
+        "scheduled_notifications",
+        ["send_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_scheduled_notifications_pending", table_name="scheduled_notifications")
+    op.drop_index("ix_scheduled_notifications_id", table_name="scheduled_notifications")
+    op.drop_table("scheduled_notifications")
@@ -0,0 +1,39 @@
+"""Preferências de entrega de notificações
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_preferences",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("channels", postgresql.JSONB(), nullable=False, server_default="{}"),
+        sa.Column("quiet_start", sa.Time(), nullable=True),
+        sa.Column("quiet_end", sa.Time(), nullable=True),
+        sa.Column("timezone", sa.String(50), nullable=False, server_default="America/Sao_Paulo"),
+        sa.Column("language", sa.String(10), nullable=False, server_default="pt-BR"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("patient_id", name="uq_notification_preferences_patient_id"),
+        sa.UniqueConstraint("user_id", name="uq_notification_preferences_user_id"),
+    )
+    op.create_index("ix_notification_preferences_id", "notification_preferences", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notification_preferences_id", table_name="notification_preferences")
+    op.drop_table("notification_preferences")
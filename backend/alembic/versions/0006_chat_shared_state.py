@@ -0,0 +1,67 @@
+"""Estado compartilhado do chat entre processos
+
+Sessões e salas das conexões Socket.IO, batimento dos processos e tabela de
+transbordo do gerenciador LISTEN/NOTIFY (app.services.chat_pubsub).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_workers",
+        sa.Column("worker_id", sa.String(64), primary_key=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("last_seen", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_table(
+        "chat_sessions",
+        sa.Column("sid", sa.String(64), primary_key=True),
+        sa.Column(
+            "worker_id", sa.String(64),
+            sa.ForeignKey("chat_workers.worker_id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("user_id", sa.String(64), nullable=False),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("connected_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_chat_sessions_worker_id", "chat_sessions", ["worker_id"])
+    op.create_index("ix_chat_sessions_user_id", "chat_sessions", ["user_id"])
+    op.create_table(
+        "chat_session_rooms",
+        sa.Column(
+            "sid", sa.String(64),
+            sa.ForeignKey("chat_sessions.sid", ondelete="CASCADE"), primary_key=True
+        ),
+        sa.Column("room", sa.String(100), primary_key=True),
+    )
+    op.create_index("ix_chat_session_rooms_room", "chat_session_rooms", ["room"])
+
+    # Conteúdos maiores que o limite do NOTIFY (8000 bytes)
+    op.create_table(
+        "socketio_spill",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("socketio_spill")
+    op.drop_index("ix_chat_session_rooms_room", table_name="chat_session_rooms")
+    op.drop_table("chat_session_rooms")
+    op.drop_index("ix_chat_sessions_user_id", table_name="chat_sessions")
+    op.drop_index("ix_chat_sessions_worker_id", table_name="chat_sessions")
+    op.drop_table("chat_sessions")
+    op.drop_table("chat_workers")
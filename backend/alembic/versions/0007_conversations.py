@@ -0,0 +1,58 @@
+"""Tabela de conversas do chat
+
+Até aqui a conversa existia apenas implicitamente, pela primeira mensagem.
+Cria `conversations`, preenche a partir de `messages` e passa a exigir a
+conversa por chave estrangeira.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "conversations",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=False),
+        sa.Column("assigned_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("last_message_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_conversations_patient_id", "conversations", ["patient_id"])
+    op.create_index("ix_conversations_assigned_user_id", "conversations", ["assigned_user_id"])
+
+    # Paciente e profissional da primeira mensagem de cada conversa
+    op.execute(
+        """
+        INSERT INTO conversations (id, patient_id, assigned_user_id, created_at, last_message_at)
+        SELECT conversation_id,
+               (array_agg(patient_id ORDER BY created_at, id))[1],
+               (array_agg(user_id ORDER BY created_at, id) FILTER (WHERE user_id IS NOT NULL))[1],
+               min(created_at),
+               max(created_at)
+        FROM messages
+        GROUP BY conversation_id
+        """
+    )
+
+    op.create_foreign_key(
+        "fk_messages_conversation_id", "messages", "conversations", ["conversation_id"], ["id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("fk_messages_conversation_id", "messages", type_="foreignkey")
+    op.drop_index("ix_conversations_assigned_user_id", table_name="conversations")
+    op.drop_index("ix_conversations_patient_id", table_name="conversations")
+    op.drop_table("conversations")
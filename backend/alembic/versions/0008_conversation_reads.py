@@ -0,0 +1,70 @@
+"""Marcas de leitura das conversas do chat
+
+Substitui as flags de leitura por mensagem por uma marca (última mensagem lida)
+por participante. As não lidas passam a ser derivadas da marca e de
+`conversations.last_message_id`.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("last_message_id", sa.Integer(), nullable=True))
+    op.execute(
+        """
+        UPDATE conversations c
+        SET last_message_id = m.max_id
+        FROM (SELECT conversation_id, max(id) AS max_id FROM messages GROUP BY conversation_id) m
+        WHERE m.conversation_id = c.id
+        """
+    )
+
+    op.create_table(
+        "conversation_reads",
+        sa.Column(
+            "conversation_id", postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True
+        ),
+        sa.Column("participant_type", sa.String(10), primary_key=True),
+        sa.Column("participant_id", sa.Integer(), primary_key=True),
+        sa.Column("last_read_message_id", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    # Marcas a partir das flags existentes: o paciente leu as mensagens da equipe
+    # e o profissional responsável leu as do paciente
+    op.execute(
+        """
+        INSERT INTO conversation_reads (conversation_id, participant_type, participant_id, last_read_message_id)
+        SELECT m.conversation_id, 'patient', c.patient_id, max(m.id)
+        FROM messages m JOIN conversations c ON c.id = m.conversation_id
+        WHERE m.sender_type = 'staff' AND m.read = true
+        GROUP BY m.conversation_id, c.patient_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO conversation_reads (conversation_id, participant_type, participant_id, last_read_message_id)
+        SELECT m.conversation_id, 'staff', c.assigned_user_id, max(m.id)
+        FROM messages m JOIN conversations c ON c.id = m.conversation_id
+        WHERE m.sender_type = 'patient' AND m.read = true AND c.assigned_user_id IS NOT NULL
+        GROUP BY m.conversation_id, c.assigned_user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("conversation_reads")
+    op.drop_column("conversations", "last_message_id")
@@ -0,0 +1,35 @@
+"""Índice do histórico do chat paginado por ID
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 17:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY não roda dentro de transação
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_conversation_id_desc",
+            "messages",
+            ["conversation_id", sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_messages_conversation_id_desc",
+            table_name="messages",
+            postgresql_concurrently=True,
+        )
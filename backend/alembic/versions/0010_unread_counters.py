@@ -0,0 +1,60 @@
+"""Contadores de não lidas do chat por conversa e papel
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "unread_counters",
+        sa.Column(
+            "conversation_id", postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True
+        ),
+        sa.Column("participant_role", sa.String(10), primary_key=True),
+        sa.Column("unread_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_unread_counters_role_pending",
+        "unread_counters",
+        ["participant_role", "conversation_id"],
+        postgresql_where=sa.text("unread_count > 0"),
+    )
+
+    # Mensagens do outro lado após a maior marca de leitura do papel
+    op.execute(
+        """
+        INSERT INTO unread_counters (conversation_id, participant_role, unread_count)
+        SELECT c.id, roles.role, count(m.id)
+        FROM conversations c
+        CROSS JOIN (VALUES ('patient', 'staff'), ('staff', 'patient')) AS roles (role, sender)
+        LEFT JOIN LATERAL (
+            SELECT max(r.last_read_message_id) AS watermark
+            FROM conversation_reads r
+            WHERE r.conversation_id = c.id AND r.participant_type = roles.role
+        ) w ON true
+        LEFT JOIN messages m
+            ON m.conversation_id = c.id
+            AND m.sender_type = roles.sender
+            AND m.id > coalesce(w.watermark, 0)
+        GROUP BY c.id, roles.role
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_unread_counters_role_pending", table_name="unread_counters")
+    op.drop_table("unread_counters")
@@ -0,0 +1,33 @@
+"""Presença dos profissionais no chat
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "chat_sessions",
+        sa.Column("last_beat", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_table(
+        "staff_presence",
+        sa.Column("user_id", sa.String(64), primary_key=True),
+        sa.Column("status", sa.String(10), nullable=False, server_default="offline"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("staff_presence")
+    op.drop_column("chat_sessions", "last_beat")
@@ -0,0 +1,55 @@
+"""Anexos do chat e envios em partes
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_attachments",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("content_type", sa.String(100), nullable=False),
+        sa.Column("path", sa.String(500), nullable=False),
+        sa.Column("thumbnail_path", sa.String(500), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "chat_uploads",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("owner_role", sa.String(10), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("content_type", sa.String(100), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("sha256", sa.String(64), nullable=False),
+        sa.Column("received", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("status", sa.String(20), nullable=False, server_default="uploading"),
+        sa.Column(
+            "attachment_sha256", sa.String(64),
+            sa.ForeignKey("chat_attachments.sha256"), nullable=True
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_chat_uploads_owner", "chat_uploads", ["owner_role", "owner_id"])
+    op.create_index("ix_chat_uploads_attachment_sha256", "chat_uploads", ["attachment_sha256"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_chat_uploads_attachment_sha256", table_name="chat_uploads")
+    op.drop_index("ix_chat_uploads_owner", table_name="chat_uploads")
+    op.drop_table("chat_uploads")
+    op.drop_table("chat_attachments")
@@ -0,0 +1,48 @@
+"""Índices da caixa de entrada do chat ordenada por atividade
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 21:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+ACTIVITY = sa.text("coalesce(last_message_at, created_at) DESC")
+
+
+def upgrade() -> None:
+    # CONCURRENTLY não roda dentro de transação
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_conversations_activity",
+            "conversations",
+            [ACTIVITY, sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_conversations_patient_activity",
+            "conversations",
+            ["patient_id", ACTIVITY, sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_conversations_patient_activity",
+            table_name="conversations",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_conversations_activity",
+            table_name="conversations",
+            postgresql_concurrently=True,
+        )
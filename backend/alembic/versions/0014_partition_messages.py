@@ -0,0 +1,169 @@
+"""Particionamento mensal das mensagens do chat e arquivo compactado
+
+Converte `messages` em tabela particionada por faixa mensal de `created_at` e
+cria `message_archive`, que recebe as partições frias em blocos JSONB
+comprimidos (lz4). As partições futuras e o arquivamento ficam a cargo do
+scheduler (app.services.scheduler).
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 22:00:00
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+# Meses à frente criados já na migração
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    "id, conversation_id, patient_id, user_id, sender_type, content, encrypted, read, read_at, "
+    "attachment_url, attachment_type, created_at"
+)
+
+INDEX_NAMES = ("ix_messages_id", "ix_messages_conversation_id", "ix_messages_conversation_id_desc")
+
+INDEXES = """
+CREATE INDEX ix_messages_id ON messages (id);
+CREATE INDEX ix_messages_conversation_id ON messages (conversation_id);
+CREATE INDEX ix_messages_conversation_id_desc ON messages (conversation_id, id DESC);
+"""
+
+TABLE = """
+CREATE TABLE messages (
+    id integer {id_definition},
+    conversation_id uuid NOT NULL,
+    patient_id integer NOT NULL REFERENCES patients (id),
+    user_id integer REFERENCES users (id),
+    sender_type varchar(10) NOT NULL,
+    content text NOT NULL,
+    encrypted boolean DEFAULT true,
+    read boolean DEFAULT false,
+    read_at timestamptz,
+    attachment_url varchar(255),
+    attachment_type varchar(50),
+    created_at timestamptz {created_at_definition},
+    CONSTRAINT fk_messages_conversation_id FOREIGN KEY (conversation_id) REFERENCES conversations (id)
+    {primary_key}
+) {partitioning}
+"""
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _rename_current(suffix: str) -> None:
+    op.execute(f"ALTER TABLE messages RENAME TO messages_{suffix}")
+    op.execute(f"ALTER TABLE messages_{suffix} RENAME CONSTRAINT messages_pkey TO messages_{suffix}_pkey")
+    for name in INDEX_NAMES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    _rename_current("legacy")
+    op.execute(
+        TABLE.format(
+            id_definition="NOT NULL DEFAULT nextval('messages_id_seq')",
+            created_at_definition="NOT NULL DEFAULT now()",
+            primary_key=", PRIMARY KEY (id, created_at)",
+            partitioning="PARTITION BY RANGE (created_at)",
+        )
+    )
+    # A sequência passa a pertencer à nova tabela antes de remover a antiga
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY messages.id")
+
+    # Criar partições do mês mais antigo até MONTHS_AHEAD meses à frente
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM messages_legacy")).scalar()
+    today = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else today
+    last = _add_months(today, MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE messages_y{month.year}m{month.month:02d} PARTITION OF messages "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+    op.execute(
+        f"""
+        INSERT INTO messages ({COLUMNS})
+        SELECT id, conversation_id, patient_id, user_id, sender_type, content, encrypted, read, read_at,
+               attachment_url, attachment_type, coalesce(created_at, now())
+        FROM messages_legacy
+        """
+    )
+    op.execute("DROP TABLE messages_legacy")
+
+    # Índices no pai são propagados para todas as partições, atuais e futuras
+    for statement in INDEXES.split(";"):
+        if statement.strip():
+            op.execute(statement)
+
+    # Blocos de até algumas centenas de mensagens por conversa; o JSONB é
+    # comprimido pelo TOAST, e o bloco inteiro ocupa uma única entrada de índice
+    op.execute(
+        """
+        CREATE TABLE message_archive (
+            conversation_id uuid NOT NULL REFERENCES conversations (id),
+            first_id integer NOT NULL,
+            last_id integer NOT NULL,
+            first_at timestamptz NOT NULL,
+            last_at timestamptz NOT NULL,
+            message_count integer NOT NULL,
+            messages jsonb COMPRESSION lz4 NOT NULL,
+            archived_at timestamptz DEFAULT now(),
+            PRIMARY KEY (conversation_id, first_id)
+        )
+        """
+    )
+    op.create_index("ix_message_archive_last_id", "message_archive", ["last_id"])
+
+
+def downgrade() -> None:
+    _rename_current("partitioned")
+    op.execute(
+        TABLE.format(
+            id_definition="PRIMARY KEY DEFAULT nextval('messages_id_seq')",
+            created_at_definition="DEFAULT now()",
+            primary_key="",
+            partitioning="",
+        )
+    )
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY messages.id")
+    op.execute(f"INSERT INTO messages ({COLUMNS}) SELECT {COLUMNS} FROM messages_partitioned")
+
+    # Devolver as mensagens arquivadas
+    op.execute(
+        f"""
+        INSERT INTO messages ({COLUMNS})
+        SELECT m.id, a.conversation_id, m.patient_id, m.user_id, m.sender_type, m.content,
+               m.encrypted, coalesce(m.read, false), to_timestamp(m.read_at),
+               m.attachment_url, m.attachment_type, to_timestamp(m.created_at)
+        FROM message_archive a
+        CROSS JOIN LATERAL jsonb_to_recordset(a.messages) AS m(
+            id integer, patient_id integer, user_id integer, sender_type varchar, content text,
+            encrypted boolean, read boolean, read_at double precision,
+            attachment_url varchar, attachment_type varchar, created_at double precision
+        )
+        """
+    )
+    op.execute("DROP TABLE messages_partitioned")
+    op.drop_index("ix_message_archive_last_id", table_name="message_archive")
+    op.drop_table("message_archive")
+
+    for statement in INDEXES.split(";"):
+        if statement.strip():
+            op.execute(statement)
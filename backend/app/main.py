@@ -8,8 +8,11 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
 from app.database import engine, get_db
-from app.routers import auth, patients, presence, chat, gamification, terms
+from app.routers import auth, patients, presence, chat, gamification, terms, notifications
 from app.services import security
+from app.services.chat_attachments import shutdown_thumbnail_pool
+from app.services.metrics import start_metrics_server
+from app.services.notification_coalescer import coalescer
 
 # Configurar logging
 logging.basicConfig(
@@ -18,13 +21,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Porta interna das métricas do Prometheus (não publicada fora da rede dos containers)
+API_METRICS_PORT = int(os.getenv("API_METRICS_PORT", "9100"))
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Inicialização do aplicativo
     logger.info("Inicializando o aplicativo CER IV")
+    start_metrics_server(API_METRICS_PORT)
     yield
     # Limpeza ao desligar
     logger.info("Desligando o aplicativo CER IV")
+    # Enviar notificações ainda agrupadas na janela de resumo
+    await coalescer.flush_all()
+    # Encerrar os processos de geração de miniaturas
+    shutdown_thumbnail_pool()
 
 # Criar instância do FastAPI
 app = FastAPI(
@@ -63,6 +74,7 @@ app.include_router(presence.router, prefix="/api", tags=["Presenças"])
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
 app.include_router(gamification.router, prefix="/api", tags=["Gamificação"])
 app.include_router(terms.router, prefix="/api", tags=["Termos"])
+app.include_router(notifications.router, prefix="/api", tags=["Notificações"])
 
 # Rota para verificar saúde da API
 @app.get("/health", tags=["Saúde"])
@@ -3,9 +3,10 @@ from datetime import datetime
 from typing import Optional, List
 from sqlalchemy.ext.declarative import declarative_base
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, Text, Boolean, Float, func
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Time, ForeignKey, Table, Text, Boolean, Float, UniqueConstraint, Index, Sequence, func
 
 from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import orm
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -13,14 +14,6 @@ from app.database import Base
 
 Base = declarative_base()
 
-# Definir a tabela de associação corretamente
-patient_guardian = Table(
-    'patient_guardian',
-    Base.metadata,
-    Column('patient_id', Integer, ForeignKey('patients.id')),
-    Column('guardian_id', Integer, ForeignKey('guardians.id'))
-)
-
 # Tabela de associação entre pacientes e responsáveis
 patient_guardian = Table(
     "patient_guardian",
@@ -100,8 +93,8 @@ class Guardian(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    # Relacionamentos
-    patients = relationship("Patient", secondary=patient_guardian, back_populates="guardians")
+    # Relacionamentos (a coluna `relationship` encobre a função dentro da classe)
+    patients = orm.relationship("Patient", secondary=patient_guardian, back_populates="guardians")
 
     def __repr__(self):
         return f"Guardian(id={self.id}, name={self.name}, relationship={self.relationship})"
@@ -258,12 +251,82 @@ class TermAcceptance(Base):
         return f"TermAcceptance(id={self.id}, patient_id={self.patient_id})"
 
 
+class Conversation(Base):
+    """Conversa do chat entre um paciente e a equipe"""
+    __tablename__ = "conversations"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False, index=True)
+    assigned_user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # Profissional responsável
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    last_message_id = Column(Integer, nullable=True)  # Comparado às marcas de leitura para derivar não lidas
+
+    # Relacionamentos
+    patient = relationship("Patient", foreign_keys=[patient_id])
+    assigned_user = relationship("User", foreign_keys=[assigned_user_id])
+
+    # Caixa de entrada ordenada pela última atividade (paginação por cursor)
+    __table_args__ = (
+        Index("ix_conversations_activity", func.coalesce(last_message_at, created_at).desc(), id.desc()),
+        Index(
+            "ix_conversations_patient_activity",
+            patient_id, func.coalesce(last_message_at, created_at).desc(), id.desc()
+        ),
+    )
+
+    def __repr__(self):
+        return f"Conversation(id={self.id}, patient_id={self.patient_id}, assigned_user_id={self.assigned_user_id})"
+
+
+class ConversationRead(Base):
+    """Marca de leitura: última mensagem lida por um participante de uma conversa"""
+    __tablename__ = "conversation_reads"
+
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    participant_type = Column(String(10), primary_key=True)  # patient, staff
+    participant_id = Column(Integer, primary_key=True)  # ID do paciente ou do usuário
+    last_read_message_id = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return (
+            f"ConversationRead(conversation_id={self.conversation_id}, participant={self.participant_type}:"
+            f"{self.participant_id}, last_read_message_id={self.last_read_message_id})"
+        )
+
+
+class UnreadCounter(Base):
+    """Mensagens não lidas de uma conversa por papel do participante (caixa de entrada)"""
+    __tablename__ = "unread_counters"
+
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    participant_role = Column(String(10), primary_key=True)  # patient, staff
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Caixa de entrada: apenas conversas com não lidas
+    __table_args__ = (
+        Index(
+            "ix_unread_counters_role_pending", participant_role, conversation_id,
+            postgresql_where=(unread_count > 0)
+        ),
+    )
+
+    def __repr__(self):
+        return (
+            f"UnreadCounter(conversation_id={self.conversation_id}, role={self.participant_role}, "
+            f"unread={self.unread_count})"
+        )
+
+
 class Message(Base):
     """Modelo para mensagens do chat"""
     __tablename__ = "messages"
 
-    id = Column(Integer, primary_key=True, index=True)
-    conversation_id = Column(UUID(as_uuid=True), nullable=False, index=True, default=uuid.uuid4)
+    # Tabela particionada por mês de created_at: a chave primária inclui a coluna de partição
+    id = Column(Integer, Sequence("messages_id_seq"), primary_key=True, index=True)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False, index=True, default=uuid.uuid4)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     sender_type = Column(String(10), nullable=False)  # patient, staff
@@ -273,21 +336,52 @@ class Message(Base):
     read_at = Column(DateTime(timezone=True), nullable=True)
     attachment_url = Column(String(255), nullable=True)
     attachment_type = Column(String(50), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     # Relacionamentos
     patient = relationship("Patient", back_populates="messages", foreign_keys=[patient_id])
     user = relationship("User", back_populates="messages", foreign_keys=[user_id])
 
+    # Histórico paginado por ID (before_id/after_id/since_id)
+    __table_args__ = (
+        Index("ix_messages_conversation_id_desc", conversation_id, id.desc()),
+    )
+
     def __repr__(self):
         return f"Message(id={self.id}, conversation_id={self.conversation_id}, sender_type={self.sender_type})"
 
 
+class MessageArchive(Base):
+    """Bloco de mensagens antigas do chat, arquivado a partir das partições frias de messages"""
+    __tablename__ = "message_archive"
+
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), primary_key=True)
+    first_id = Column(Integer, primary_key=True)
+    last_id = Column(Integer, nullable=False)
+    first_at = Column(DateTime(timezone=True), nullable=False)
+    last_at = Column(DateTime(timezone=True), nullable=False)
+    message_count = Column(Integer, nullable=False)
+    messages = Column(JSONB, nullable=False)  # Mensagens do bloco em ordem de ID (comprimidas com lz4 pelo TOAST)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Maior ID arquivado (limite entre o arquivo e as partições quentes)
+    __table_args__ = (
+        Index("ix_message_archive_last_id", last_id),
+    )
+
+    def __repr__(self):
+        return (
+            f"MessageArchive(conversation_id={self.conversation_id}, first_id={self.first_id}, "
+            f"last_id={self.last_id}, count={self.message_count})"
+        )
+
+
 class Notification(Base):
     """Modelo para notificações"""
     __tablename__ = "notifications"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Tabela particionada por mês de created_at: a chave primária inclui a coluna de partição
+    id = Column(Integer, Sequence("notifications_id_seq"), primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     title = Column(String(255), nullable=False)
@@ -296,7 +390,173 @@ class Notification(Base):
     read = Column(Boolean, default=False)
     read_at = Column(DateTime(timezone=True), nullable=True)
     data = Column(JSONB, nullable=True)  # Dados adicionais em JSON
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+
+    # Índices para listagem paginada por cursor (created_at, id) e para não lidas
+    __table_args__ = (
+        Index("ix_notifications_patient_created", patient_id, created_at.desc(), id.desc()),
+        Index("ix_notifications_user_created", user_id, created_at.desc(), id.desc()),
+        Index(
+            "ix_notifications_patient_unread", patient_id, created_at.desc(), id.desc(),
+            postgresql_where=(read == False)
+        ),
+        Index(
+            "ix_notifications_user_unread", user_id, created_at.desc(), id.desc(),
+            postgresql_where=(read == False)
+        ),
+    )
+
+    def __repr__(self):
+        return f"Notification(id={self.id}, type={self.type}, title={self.title})"
+
+
+class NotificationCounter(Base):
+    """Contador de notificações não lidas por paciente ou usuário"""
+    __tablename__ = "notification_counters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, unique=True)
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"NotificationCounter(patient_id={self.patient_id}, user_id={self.user_id}, unread={self.unread_count})"
+
+
+class ScheduledNotification(Base):
+    """Notificação agendada para envio futuro (lembretes de consulta, avisos de check-in)"""
+    __tablename__ = "scheduled_notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    title = Column(String(255), nullable=False)
+    message = Column(Text, nullable=False)
+    type = Column(String(50), nullable=False)
+    data = Column(JSONB, nullable=True)
+    send_push = Column(Boolean, nullable=False, default=True)
+    send_email = Column(Boolean, nullable=False, default=True)
+    send_at = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, sent, failed, canceled
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")  # Envios que falharam
+    notification_id = Column(Integer, nullable=True)  # Notificação gerada no envio (ou já persistida, se só a entrega foi adiada)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Apenas as pendentes ficam no índice usado pela carga da janela do scheduler
+    __table_args__ = (
+        Index("ix_scheduled_notifications_pending", send_at, postgresql_where=(status == "pending")),
+    )
+
+    def __repr__(self):
+        return f"ScheduledNotification(id={self.id}, send_at={self.send_at}, status={self.status})"
+
+
+class NotificationPreference(Base):
+    """Preferências de entrega de notificações de um paciente ou usuário"""
+    __tablename__ = "notification_preferences"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, unique=True)
+    # Canais por tipo: {"badge": {"push": true, "email": false}, "*": {...}}
+    channels = Column(JSONB, nullable=False, default=dict, server_default="{}")
+    quiet_start = Column(Time, nullable=True)  # Início do horário de silêncio (hora local)
+    quiet_end = Column(Time, nullable=True)  # Fim do horário de silêncio (hora local)
+    timezone = Column(String(50), nullable=False, default="America/Sao_Paulo", server_default="America/Sao_Paulo")
+    language = Column(String(10), nullable=False, default="pt-BR", server_default="pt-BR")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"NotificationPreference(patient_id={self.patient_id}, user_id={self.user_id})"
+
+
+class ChatWorker(Base):
+    """Processo do servidor de chat em execução (batimento para limpeza de sessões órfãs)"""
+    __tablename__ = "chat_workers"
+
+    worker_id = Column(String(64), primary_key=True)
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"ChatWorker(worker_id={self.worker_id}, last_seen={self.last_seen})"
+
+
+class ChatSession(Base):
+    """Conexão Socket.IO ativa, compartilhada entre os processos do chat"""
+    __tablename__ = "chat_sessions"
+
+    sid = Column(String(64), primary_key=True)
+    worker_id = Column(String(64), ForeignKey("chat_workers.worker_id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(String(64), nullable=False, index=True)
+    role = Column(String(20), nullable=False)  # staff, patient
+    connected_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_beat = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Último sinal de atividade do cliente
+
+    def __repr__(self):
+        return f"ChatSession(sid={self.sid}, user_id={self.user_id}, role={self.role})"
+
+
+class StaffPresence(Base):
+    """Estado de presença agregado de um profissional (todas as conexões e dispositivos)"""
+    __tablename__ = "staff_presence"
+
+    user_id = Column(String(64), primary_key=True)
+    status = Column(String(10), nullable=False, default="offline")  # online, away, offline
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"StaffPresence(user_id={self.user_id}, status={self.status})"
+
+
+class ChatSessionRoom(Base):
+    """Sala em que uma conexão Socket.IO entrou"""
+    __tablename__ = "chat_session_rooms"
+
+    sid = Column(String(64), ForeignKey("chat_sessions.sid", ondelete="CASCADE"), primary_key=True)
+    room = Column(String(100), primary_key=True, index=True)
+
+    def __repr__(self):
+        return f"ChatSessionRoom(sid={self.sid}, room={self.room})"
+
+
+class ChatAttachment(Base):
+    """Arquivo anexado no chat, armazenado uma única vez por conteúdo (SHA-256)"""
+    __tablename__ = "chat_attachments"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(100), nullable=False)
+    path = Column(String(500), nullable=False)
+    thumbnail_path = Column(String(500), nullable=True)  # Gerada em segundo plano para imagens
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     def __repr__(self):
-        return f"Notification(id={self.id}, type={self.type}, title={self.title})"
\ No newline at end of file
+        return f"ChatAttachment(sha256={self.sha256}, size={self.size}, content_type={self.content_type})"
+
+
+class ChatUpload(Base):
+    """Envio em partes (retomável) de um anexo do chat"""
+    __tablename__ = "chat_uploads"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    owner_role = Column(String(10), nullable=False)  # patient, staff
+    owner_id = Column(Integer, nullable=False)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=False)  # Informado pelo cliente e conferido ao concluir
+    received = Column(BigInteger, nullable=False, default=0)
+    status = Column(String(20), nullable=False, default="uploading")  # uploading, complete, failed
+    attachment_sha256 = Column(String(64), ForeignKey("chat_attachments.sha256"), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_chat_uploads_owner", owner_role, owner_id),
+    )
+
+    def __repr__(self):
+        return f"ChatUpload(id={self.id}, filename={self.filename}, received={self.received}/{self.size})"
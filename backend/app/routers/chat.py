@@ -0,0 +1,341 @@
+import logging
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse
+from sqlalchemy import exists, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models import ChatAttachment, ChatUpload, Conversation, Message, MessageArchive
+from app.schemas import ChatAttachmentOut, ChatUploadCreate, ChatUploadOut, InboxPage
+from app.services import chat_attachments
+from app.services.chat_conversations import INBOX_PAGE_MAX, inbox_page
+from app.services.security import get_token_claims
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Criar router
+router = APIRouter(prefix="/chat", tags=["chat"])
+
+# URL de download de um anexo (informada em attachment_url no send_message)
+ATTACHMENT_URL = "/api/chat/attachments/{}"
+
+
+def _owner(claims: Dict[str, Any]) -> Tuple[str, int]:
+    """Papel (patient, staff) e ID do titular do token."""
+    role = "patient" if claims["role"] == "patient" else "staff"
+    return role, int(claims["id"])
+
+
+def _attachment_out(attachment: Optional[ChatAttachment]) -> Optional[ChatAttachmentOut]:
+    if attachment is None:
+        return None
+
+    url = ATTACHMENT_URL.format(attachment.sha256)
+    return ChatAttachmentOut(
+        sha256=attachment.sha256,
+        size=attachment.size,
+        content_type=attachment.content_type,
+        url=url,
+        thumbnail_url=f"{url}/thumbnail" if attachment.thumbnail_path else None,
+    )
+
+
+def _upload_out(upload: ChatUpload, attachment: Optional[ChatAttachment] = None) -> ChatUploadOut:
+    return ChatUploadOut(
+        id=upload.id,
+        filename=upload.filename,
+        content_type=upload.content_type,
+        size=upload.size,
+        received=upload.received,
+        status=upload.status,
+        chunk_size=chat_attachments.CHAT_UPLOAD_CHUNK_BYTES,
+        attachment=_attachment_out(attachment),
+    )
+
+
+async def _get_upload(db: AsyncSession, upload_id: uuid.UUID, claims: Dict[str, Any]) -> ChatUpload:
+    """
+    Busca um envio do titular do token.
+
+    Raises:
+        HTTPException: Se o envio não existir ou pertencer a outra pessoa
+    """
+    upload = await db.get(ChatUpload, upload_id)
+    if upload is None or (upload.owner_role, upload.owner_id) != _owner(claims):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Envio não encontrado"
+        )
+    return upload
+
+
+async def _get_attachment(db: AsyncSession, sha256: str, claims: Dict[str, Any]) -> ChatAttachment:
+    """
+    Busca um anexo que o titular do token pode ver.
+
+    Profissionais veem qualquer anexo; pacientes, os que enviaram ou os
+    anexados a mensagens das suas conversas.
+
+    Raises:
+        HTTPException: Se o anexo não existir ou não for acessível
+    """
+    attachment = await db.get(ChatAttachment, sha256.lower())
+    not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Anexo não encontrado"
+    )
+    if attachment is None:
+        raise not_found
+
+    role, owner_id = _owner(claims)
+    if role == "patient":
+        allowed = await db.scalar(select(or_(
+            exists().where(
+                ChatUpload.attachment_sha256 == attachment.sha256,
+                ChatUpload.owner_role == role,
+                ChatUpload.owner_id == owner_id,
+            ),
+            exists().where(
+                Message.patient_id == owner_id,
+                Message.attachment_url == ATTACHMENT_URL.format(attachment.sha256),
+            ),
+            exists().where(
+                Conversation.id == MessageArchive.conversation_id,
+                Conversation.patient_id == owner_id,
+                MessageArchive.messages.contains([{"attachment_url": ATTACHMENT_URL.format(attachment.sha256)}]),
+            ),
+        )))
+        if not allowed:
+            raise not_found
+
+    return attachment
+
+
+@router.get("/inbox", response_model=InboxPage)
+async def read_inbox(
+    limit: int = Query(20, ge=1, le=INBOX_PAGE_MAX),
+    cursor: Optional[str] = None,
+    assigned_only: bool = False,
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> dict:
+    """
+    Retorna uma página da caixa de entrada do chat, da conversa mais ativa para a menos ativa.
+
+    Pacientes veem suas conversas; a equipe vê a caixa compartilhada (ou só as
+    conversas atribuídas a si, com assigned_only).
+
+    Args:
+        limit: Número máximo de conversas na página
+        cursor: Cursor retornado em `next_cursor` pela página anterior
+        assigned_only: Para a equipe, apenas conversas atribuídas ao usuário
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Conversas com a última mensagem e as não lidas, e o cursor da próxima página
+
+    Raises:
+        HTTPException: Se o cursor for inválido
+    """
+    role, owner_id = _owner(claims)
+    try:
+        return await inbox_page(db, role, owner_id, limit, cursor, assigned_only)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.post("/uploads", response_model=ChatUploadOut, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload: ChatUploadCreate,
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> ChatUploadOut:
+    """
+    Inicia o envio em partes de um anexo do chat.
+
+    O cliente envia as partes com PUT /chat/uploads/{id}?offset=N (até
+    `chunk_size` bytes cada) e conclui com POST /chat/uploads/{id}/complete.
+    Após uma queda, GET /chat/uploads/{id} informa em `received` de onde retomar.
+
+    Args:
+        upload: Nome, tipo, tamanho e SHA-256 do arquivo
+        db: Sessão do banco de dados
+        claims: Declarações do token do paciente ou profissional
+
+    Returns:
+        Envio criado
+
+    Raises:
+        HTTPException: Se o arquivo exceder o tamanho máximo
+    """
+    owner_role, owner_id = _owner(claims)
+    try:
+        created = await chat_attachments.create_upload(
+            db, owner_role, owner_id, upload.filename, upload.content_type, upload.size, upload.sha256
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+
+    return _upload_out(created)
+
+
+@router.get("/uploads/{upload_id}", response_model=ChatUploadOut)
+async def read_upload(
+    upload_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> ChatUploadOut:
+    """
+    Retorna o progresso de um envio (para retomá-lo após uma queda).
+
+    Args:
+        upload_id: ID do envio
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Envio com os bytes já recebidos
+    """
+    upload = await _get_upload(db, upload_id, claims)
+    attachment = await db.get(ChatAttachment, upload.attachment_sha256) if upload.attachment_sha256 else None
+    return _upload_out(upload, attachment)
+
+
+@router.put("/uploads/{upload_id}", response_model=ChatUploadOut)
+async def upload_chunk(
+    upload_id: uuid.UUID,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> ChatUploadOut:
+    """
+    Recebe uma parte do arquivo (corpo binário da requisição) a partir de `offset`.
+
+    Args:
+        upload_id: ID do envio
+        request: Requisição, lida em fluxo
+        offset: Posição da parte no arquivo (deve ser igual a `received`)
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Envio com os bytes recebidos
+
+    Raises:
+        HTTPException: 409 se a parte estiver fora de ordem; 400 se exceder os limites
+    """
+    upload = await _get_upload(db, upload_id, claims)
+
+    try:
+        await chat_attachments.write_chunk(db, upload, offset, request.stream())
+    except chat_attachments.UploadOffsetError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+            headers={"Upload-Offset": str(e.received)}
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return _upload_out(upload)
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=ChatUploadOut)
+async def complete_upload(
+    upload_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> ChatUploadOut:
+    """
+    Conclui um envio, conferindo o SHA-256 do conteúdo.
+
+    A URL do anexo retornado é a que deve ser enviada em `attachment_url` no
+    evento send_message do chat.
+
+    Args:
+        upload_id: ID do envio
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Envio concluído, com o anexo
+
+    Raises:
+        HTTPException: Se o envio estiver incompleto ou o hash não conferir
+    """
+    upload = await _get_upload(db, upload_id, claims)
+
+    try:
+        attachment = await chat_attachments.complete_upload(db, upload)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+
+    return _upload_out(upload, attachment)
+
+
+@router.get("/attachments/{sha256}")
+async def download_attachment(
+    sha256: str,
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> FileResponse:
+    """
+    Baixa um anexo do chat.
+
+    Args:
+        sha256: Hash do anexo
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Arquivo do anexo
+    """
+    attachment = await _get_attachment(db, sha256, claims)
+    return FileResponse(attachment.path, media_type=attachment.content_type)
+
+
+@router.get("/attachments/{sha256}/thumbnail")
+async def download_thumbnail(
+    sha256: str,
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> FileResponse:
+    """
+    Baixa a miniatura de um anexo de imagem.
+
+    Args:
+        sha256: Hash do anexo
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Miniatura JPEG
+
+    Raises:
+        HTTPException: Se a miniatura ainda não tiver sido gerada
+    """
+    attachment = await _get_attachment(db, sha256, claims)
+    if not attachment.thumbnail_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Miniatura não disponível"
+        )
+    return FileResponse(attachment.thumbnail_path, media_type="image/jpeg")
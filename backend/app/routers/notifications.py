@@ -0,0 +1,182 @@
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.schemas import (
+    NotificationPage, NotificationPreferenceOut, NotificationPreferenceUpdate, UnreadCountOut
+)
+from app.services.notifications import NotificationService
+from app.services.security import get_token_claims
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Criar router
+router = APIRouter(prefix="/notifications", tags=["notifications"])
+
+
+def _recipient(claims: Dict[str, Any]) -> Dict[str, int]:
+    """Filtro do destinatário (patient_id ou user_id) a partir das declarações do token."""
+    if claims["role"] == "patient":
+        return {"patient_id": int(claims["id"])}
+    return {"user_id": int(claims["id"])}
+
+
+@router.get("/", response_model=NotificationPage)
+async def read_notifications(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> dict:
+    """
+    Retorna uma página de notificações do paciente ou usuário atual, da mais recente para a mais antiga.
+
+    Args:
+        limit: Número máximo de notificações na página
+        cursor: Cursor retornado em `next_cursor` pela página anterior
+        unread_only: Se deve retornar apenas notificações não lidas
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Página de notificações e cursor da próxima página
+
+    Raises:
+        HTTPException: Se o cursor for inválido
+    """
+    try:
+        # Uma linha a mais indica se há outra página
+        notifications = await NotificationService.get_notifications(
+            db,
+            limit=limit + 1,
+            unread_only=unread_only,
+            cursor=cursor,
+            **_recipient(claims)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    next_cursor = None
+    if len(notifications) > limit:
+        notifications = notifications[:limit]
+        next_cursor = NotificationService.encode_cursor(notifications[-1])
+
+    return {"items": notifications, "next_cursor": next_cursor}
+
+
+@router.get("/unread-count", response_model=UnreadCountOut)
+async def read_unread_count(
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> dict:
+    """
+    Retorna o número de notificações não lidas do paciente ou usuário atual (badge do app).
+
+    Args:
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Contagem de não lidas
+    """
+    unread = await NotificationService.get_unread_count(db, **_recipient(claims))
+    return {"unread": unread}
+
+
+@router.get("/preferences", response_model=NotificationPreferenceOut)
+async def read_preferences(
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+):
+    """
+    Retorna as preferências de entrega do paciente ou usuário atual.
+
+    Args:
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Canais por tipo, horário de silêncio e idioma (padrão se nunca configurados)
+    """
+    preference = await NotificationService.get_preferences(db, **_recipient(claims))
+    return preference or NotificationPreferenceOut()
+
+
+@router.put("/preferences", response_model=NotificationPreferenceOut)
+async def update_preferences(
+    preferences: NotificationPreferenceUpdate,
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+):
+    """
+    Atualiza as preferências de entrega do paciente ou usuário atual.
+
+    Args:
+        preferences: Canais por tipo, horário de silêncio e idioma
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Preferências gravadas
+    """
+    return await NotificationService.update_preferences(
+        db, preferences.dict(), **_recipient(claims)
+    )
+
+
+@router.post("/{notification_id}/read", response_model=dict)
+async def mark_notification_as_read(
+    notification_id: int,
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> dict:
+    """
+    Marca uma notificação do paciente ou usuário atual como lida.
+
+    Args:
+        notification_id: ID da notificação
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Mensagem de confirmação
+
+    Raises:
+        HTTPException: Se a notificação não for encontrada
+    """
+    marked = await NotificationService.mark_as_read(db, notification_id, **_recipient(claims))
+
+    if not marked:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Notificação com ID {notification_id} não encontrada"
+        )
+
+    return {"message": "Notificação marcada como lida"}
+
+
+@router.post("/read-all", response_model=dict)
+async def mark_all_notifications_as_read(
+    db: AsyncSession = Depends(get_db),
+    claims: Dict[str, Any] = Depends(get_token_claims)
+) -> dict:
+    """
+    Marca todas as notificações do paciente ou usuário atual como lidas.
+
+    Args:
+        db: Sessão do banco de dados
+        claims: Declarações do token
+
+    Returns:
+        Número de notificações marcadas
+    """
+    count = await NotificationService.mark_all_as_read(db, **_recipient(claims))
+    return {"message": "Notificações marcadas como lidas", "count": count}
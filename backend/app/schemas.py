@@ -1,6 +1,7 @@
-from datetime import datetime, date
+from datetime import datetime, date, time
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, EmailStr, Field, validator, UUID4, constr
+from zoneinfo import ZoneInfo
 import re
 
 
@@ -368,6 +369,68 @@ class MessageOut(MessageBase):
         orm_mode = True
 
 
+class ChatUploadCreate(BaseModel):
+    filename: str
+    content_type: str = "application/octet-stream"
+    size: int
+    sha256: str
+
+    @validator("size")
+    def validate_size(cls, v):
+        if v <= 0:
+            raise ValueError("Tamanho do arquivo deve ser positivo")
+        return v
+
+    @validator("sha256")
+    def validate_sha256(cls, v):
+        if not re.fullmatch(r"[0-9a-fA-F]{64}", v):
+            raise ValueError("Hash SHA-256 inválido")
+        return v.lower()
+
+
+class ChatAttachmentOut(BaseModel):
+    sha256: str
+    size: int
+    content_type: str
+    url: str
+    thumbnail_url: Optional[str] = None
+
+
+class ChatUploadOut(BaseModel):
+    id: UUID4
+    filename: str
+    content_type: str
+    size: int
+    received: int
+    status: str
+    chunk_size: int
+    attachment: Optional[ChatAttachmentOut] = None
+
+
+class InboxLastMessageOut(BaseModel):
+    id: int
+    sender_type: str
+    encrypted: bool
+    preview: Optional[str] = None
+    attachment_type: Optional[str] = None
+    timestamp: datetime
+
+
+class InboxItemOut(BaseModel):
+    conversation_id: UUID4
+    patient_id: int
+    patient_name: str
+    assigned_user_id: Optional[int] = None
+    last_activity: datetime
+    last_message: Optional[InboxLastMessageOut] = None
+    unread: int
+
+
+class InboxPage(BaseModel):
+    items: List[InboxItemOut]
+    next_cursor: Optional[str] = None
+
+
 class NotificationBase(BaseModel):
     title: str
     message: str
@@ -397,6 +460,43 @@ class NotificationOut(NotificationBase):
         orm_mode = True
 
 
+class NotificationPage(BaseModel):
+    items: List[NotificationOut]
+    next_cursor: Optional[str] = None
+
+
+class UnreadCountOut(BaseModel):
+    unread: int
+
+
+class NotificationChannels(BaseModel):
+    push: bool = True
+    email: bool = True
+
+
+class NotificationPreferenceBase(BaseModel):
+    channels: Dict[str, NotificationChannels] = {}  # Por tipo de notificação; "*" vale para os demais
+    quiet_start: Optional[time] = None
+    quiet_end: Optional[time] = None
+    timezone: str = "America/Sao_Paulo"
+    language: str = "pt-BR"
+
+
+class NotificationPreferenceUpdate(NotificationPreferenceBase):
+    @validator('timezone')
+    def validate_timezone(cls, v):
+        try:
+            ZoneInfo(v)
+        except Exception:
+            raise ValueError('Fuso horário inválido')
+        return v
+
+
+class NotificationPreferenceOut(NotificationPreferenceBase):
+    class Config:
+        orm_mode = True
+
+
 class AbsenceRuleBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -0,0 +1,161 @@
+import logging
+import os
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Union
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.models import Message, MessageArchive
+from app.services.partitions import add_months
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Mensagens por bloco do arquivo (cada bloco é lido e descomprimido inteiro)
+ARCHIVE_BLOCK_SIZE = 500
+
+# Meses completos mantidos nas partições quentes de messages, além do mês atual
+CHAT_MESSAGE_HOT_MONTHS = int(os.getenv("CHAT_MESSAGE_HOT_MONTHS", "6"))
+
+# Agrupa uma partição em blocos por conversa; datas como segundos desde a época
+ARCHIVE_PARTITION_SQL = """
+INSERT INTO message_archive (conversation_id, first_id, last_id, first_at, last_at, message_count, messages)
+SELECT conversation_id, min(id), max(id), min(created_at), max(created_at), count(*),
+       jsonb_agg(jsonb_strip_nulls(jsonb_build_object(
+           'id', id, 'patient_id', patient_id, 'user_id', user_id, 'sender_type', sender_type,
+           'content', content, 'encrypted', encrypted, 'read', read,
+           'read_at', extract(epoch FROM read_at),
+           'attachment_url', attachment_url, 'attachment_type', attachment_type,
+           'created_at', extract(epoch FROM created_at)
+       )) ORDER BY id)
+FROM (
+    SELECT *, (row_number() OVER (PARTITION BY conversation_id ORDER BY id) - 1) / :block_size AS block
+    FROM "{partition}"
+) m
+GROUP BY conversation_id, block
+ON CONFLICT (conversation_id, first_id) DO NOTHING
+"""
+
+
+async def archive_message_partition(conn: AsyncConnection, partition: str) -> None:
+    """
+    Copia uma partição de `messages` para o arquivo compactado (antes de removê-la).
+
+    Pode ser repetida com segurança: blocos já arquivados são ignorados.
+
+    Args:
+        conn: Conexão com o banco de dados (autocommit)
+        partition: Nome da partição de `messages`
+    """
+    result = await conn.execute(
+        text(ARCHIVE_PARTITION_SQL.format(partition=partition)),
+        {"block_size": ARCHIVE_BLOCK_SIZE},
+    )
+    logger.info(f"Partição {partition} arquivada em {result.rowcount} blocos")
+
+
+def may_have_archive(conversation_created_at: Optional[datetime]) -> bool:
+    """
+    Indica se uma conversa pode ter mensagens no arquivo.
+
+    Só partições de meses anteriores à retenção (CHAT_MESSAGE_HOT_MONTHS) são
+    arquivadas, então conversas criadas depois do início da retenção têm todas
+    as mensagens nas partições quentes e dispensam a consulta ao arquivo. O
+    teste não depende de cache: vale logo após cada execução do arquivamento.
+
+    Args:
+        conversation_created_at: Criação da conversa
+
+    Returns:
+        True se o arquivo deve ser consultado
+    """
+    if conversation_created_at is None:
+        return True
+
+    cutoff = add_months(date.today().replace(day=1), -CHAT_MESSAGE_HOT_MONTHS)
+    # Um dia de margem para a diferença de fuso entre o processo e os limites das partições
+    cutoff_at = datetime.combine(cutoff, time.min, tzinfo=timezone.utc) + timedelta(days=1)
+    return conversation_created_at < cutoff_at
+
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(float(value), tz=timezone.utc) if value is not None else None
+
+
+def _to_message(conversation_id: uuid.UUID, item: Dict[str, Any]) -> Message:
+    """Mensagem (transiente, fora da sessão) a partir de um item do bloco arquivado."""
+    return Message(
+        id=item["id"],
+        conversation_id=conversation_id,
+        patient_id=item["patient_id"],
+        user_id=item.get("user_id"),
+        sender_type=item["sender_type"],
+        content=item["content"],
+        encrypted=item.get("encrypted", True),
+        read=item.get("read", False),
+        read_at=_timestamp(item.get("read_at")),
+        attachment_url=item.get("attachment_url"),
+        attachment_type=item.get("attachment_type"),
+        created_at=_timestamp(item["created_at"]),
+    )
+
+
+async def archived_messages(
+    session: AsyncSession,
+    conversation_id: Union[str, uuid.UUID],
+    limit: int,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None
+) -> List[Message]:
+    """
+    Lê mensagens arquivadas de uma conversa, na mesma ordem do histórico.
+
+    Os blocos são percorridos pela chave primária (conversation_id, first_id),
+    um por vez, até completar `limit` mensagens.
+
+    Args:
+        session: Sessão do banco de dados
+        conversation_id: ID da conversa
+        limit: Número máximo de mensagens
+        before_id: Mensagens anteriores a este ID, da mais recente para a mais antiga
+        after_id: Mensagens posteriores a este ID, da mais antiga para a mais recente
+
+    Returns:
+        Lista de mensagens (objetos Message não associados à sessão)
+    """
+    conversation_id = conversation_id if isinstance(conversation_id, uuid.UUID) else uuid.UUID(str(conversation_id))
+    ascending = after_id is not None
+    messages: List[Message] = []
+    block_cursor: Optional[int] = None
+
+    while len(messages) < limit:
+        query = select(MessageArchive.first_id, MessageArchive.messages).where(
+            MessageArchive.conversation_id == conversation_id
+        )
+        if ascending:
+            query = query.where(MessageArchive.last_id > after_id)
+            if block_cursor is not None:
+                query = query.where(MessageArchive.first_id > block_cursor)
+            query = query.order_by(MessageArchive.first_id.asc())
+        else:
+            if before_id is not None:
+                query = query.where(MessageArchive.first_id < before_id)
+            if block_cursor is not None:
+                query = query.where(MessageArchive.first_id < block_cursor)
+            query = query.order_by(MessageArchive.first_id.desc())
+
+        block = (await session.execute(query.limit(1))).first()
+        if block is None:
+            break
+        block_cursor = block.first_id
+
+        items = block.messages
+        if ascending:
+            items = [item for item in items if item["id"] > after_id]
+        else:
+            items = [item for item in reversed(items) if before_id is None or item["id"] < before_id]
+        messages.extend(_to_message(conversation_id, item) for item in items[:limit - len(messages)])
+
+    return messages
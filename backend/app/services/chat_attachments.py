@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import SessionLocal
+from app.models import ChatAttachment, ChatUpload
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Diretórios dos anexos do chat (arquivos definitivos por hash e envios em andamento)
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads")
+CHAT_ATTACHMENTS_DIR = os.path.join(UPLOADS_DIR, "chat")
+CHAT_PARTS_DIR = os.path.join(CHAT_ATTACHMENTS_DIR, "parts")
+
+# Tamanho máximo de um anexo, de cada parte enviada e do buffer antes de gravar no disco
+CHAT_UPLOAD_MAX_BYTES = int(os.getenv("CHAT_UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+CHAT_UPLOAD_CHUNK_BYTES = int(os.getenv("CHAT_UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+CHAT_UPLOAD_BUFFER_BYTES = 256 * 1024
+
+# Miniaturas: lado maior em pixels e processos dedicados
+CHAT_THUMBNAIL_SIZE = int(os.getenv("CHAT_THUMBNAIL_SIZE", "320"))
+CHAT_THUMBNAIL_WORKERS = int(os.getenv("CHAT_THUMBNAIL_WORKERS", "2"))
+
+STATUS_UPLOADING = "uploading"
+STATUS_COMPLETE = "complete"
+STATUS_FAILED = "failed"
+
+# Tipos de imagem para os quais é gerada miniatura
+THUMBNAIL_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp", "image/tiff"}
+
+# Criar diretórios se não existirem
+os.makedirs(CHAT_PARTS_DIR, exist_ok=True)
+
+_thumbnail_pool: Optional[ProcessPoolExecutor] = None
+_thumbnail_tasks: set = set()
+
+
+class UploadOffsetError(ValueError):
+    """A parte enviada não começa onde o envio parou (o cliente deve retomar de `received`)."""
+
+    def __init__(self, received: int):
+        super().__init__(f"Parte fora de ordem; retomar a partir do byte {received}")
+        self.received = received
+
+
+def _part_path(upload_id: uuid.UUID) -> str:
+    return os.path.join(CHAT_PARTS_DIR, f"{upload_id}.part")
+
+
+def _attachment_path(sha256: str, filename: str, content_type: str) -> str:
+    extension = os.path.splitext(filename)[1].lower() or mimetypes.guess_extension(content_type) or ""
+    directory = os.path.join(CHAT_ATTACHMENTS_DIR, sha256[:2])
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, sha256 + extension)
+
+
+def _sha256_file(path: str) -> str:
+    """Calcula o SHA-256 de um arquivo em blocos (executado fora do laço de eventos)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _make_thumbnail(source: str, target: str, size: int) -> bool:
+    """
+    Gera a miniatura JPEG de uma imagem (executado em um processo do pool).
+
+    Returns:
+        True se a miniatura foi gerada
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # Reduzir na decodificação quando possível (JPEG) antes de redimensionar
+        image.draft("RGB", (size * 2, size * 2))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        image.convert("RGB").save(target, "JPEG", quality=80, optimize=True)
+    return True
+
+
+def thumbnail_pool() -> ProcessPoolExecutor:
+    """Pool de processos das miniaturas, criado no primeiro uso."""
+    global _thumbnail_pool
+    if _thumbnail_pool is None:
+        _thumbnail_pool = ProcessPoolExecutor(max_workers=CHAT_THUMBNAIL_WORKERS)
+    return _thumbnail_pool
+
+
+def shutdown_thumbnail_pool() -> None:
+    """Encerra o pool de processos das miniaturas (desligamento da aplicação)."""
+    global _thumbnail_pool
+    if _thumbnail_pool is not None:
+        _thumbnail_pool.shutdown(wait=False, cancel_futures=True)
+        _thumbnail_pool = None
+
+
+async def create_upload(
+    db: AsyncSession,
+    owner_role: str,
+    owner_id: int,
+    filename: str,
+    content_type: str,
+    size: int,
+    sha256: str
+) -> ChatUpload:
+    """
+    Inicia um envio em partes.
+
+    Args:
+        db: Sessão do banco de dados
+        owner_role: patient ou staff
+        owner_id: ID do paciente ou do usuário
+        filename: Nome original do arquivo
+        content_type: Tipo MIME
+        size: Tamanho total em bytes
+        sha256: Hash SHA-256 do conteúdo (hexadecimal), conferido ao concluir
+
+    Returns:
+        Envio criado
+
+    Raises:
+        ValueError: Se o arquivo exceder CHAT_UPLOAD_MAX_BYTES
+    """
+    if size > CHAT_UPLOAD_MAX_BYTES:
+        raise ValueError(f"Arquivo excede o limite de {CHAT_UPLOAD_MAX_BYTES} bytes")
+
+    upload = ChatUpload(
+        owner_role=owner_role,
+        owner_id=owner_id,
+        filename=os.path.basename(filename),
+        content_type=content_type,
+        size=size,
+        sha256=sha256.lower(),
+        received=0,
+        status=STATUS_UPLOADING,
+    )
+    db.add(upload)
+    await db.commit()
+    await db.refresh(upload)
+    return upload
+
+
+async def write_chunk(db: AsyncSession, upload: ChatUpload, offset: int, stream: AsyncIterator[bytes]) -> int:
+    """
+    Grava uma parte do envio, lendo o corpo da requisição em fluxo.
+
+    O corpo nunca é lido inteiro para a memória: os pedaços recebidos são
+    acumulados até CHAT_UPLOAD_BUFFER_BYTES e gravados em uma thread. Só após
+    a gravação o progresso (`received`) avança; bytes de uma parte interrompida
+    são descartados na próxima tentativa, que trunca o arquivo em `received`.
+
+    Args:
+        db: Sessão do banco de dados
+        upload: Envio em andamento
+        offset: Posição da parte no arquivo
+        stream: Corpo da requisição
+
+    Returns:
+        Total de bytes recebidos
+
+    Raises:
+        UploadOffsetError: Se a parte não começar em `received`
+        ValueError: Se o envio não estiver em andamento ou a parte exceder os limites
+    """
+    if upload.status != STATUS_UPLOADING:
+        raise ValueError("Envio já concluído ou cancelado")
+    if offset != upload.received:
+        raise UploadOffsetError(upload.received)
+
+    loop = asyncio.get_running_loop()
+    path = _part_path(upload.id)
+    written = 0
+    buffer = bytearray()
+
+    f = open(path, "r+b" if os.path.exists(path) else "wb")
+    try:
+        f.seek(offset)
+        f.truncate()
+        async for piece in stream:
+            written += len(piece)
+            if written > CHAT_UPLOAD_CHUNK_BYTES:
+                raise ValueError(f"Parte excede o limite de {CHAT_UPLOAD_CHUNK_BYTES} bytes")
+            if offset + written > upload.size:
+                raise ValueError("Parte ultrapassa o tamanho declarado do arquivo")
+
+            buffer += piece
+            if len(buffer) >= CHAT_UPLOAD_BUFFER_BYTES:
+                await loop.run_in_executor(None, f.write, bytes(buffer))
+                buffer.clear()
+
+        if buffer:
+            await loop.run_in_executor(None, f.write, bytes(buffer))
+        await loop.run_in_executor(None, f.flush)
+    finally:
+        f.close()
+
+    upload.received = offset + written
+    await db.commit()
+    return upload.received
+
+
+async def complete_upload(db: AsyncSession, upload: ChatUpload) -> ChatAttachment:
+    """
+    Conclui um envio: confere o hash e guarda o arquivo uma única vez por conteúdo.
+
+    Arquivos idênticos (mesmo SHA-256) compartilham o mesmo registro e o mesmo
+    arquivo em disco. Para imagens, a miniatura é gerada em segundo plano.
+
+    Args:
+        db: Sessão do banco de dados
+        upload: Envio com todos os bytes recebidos
+
+    Returns:
+        Anexo correspondente ao conteúdo
+
+    Raises:
+        ValueError: Se o envio estiver incompleto ou o hash não conferir
+    """
+    if upload.status == STATUS_COMPLETE:
+        return await db.get(ChatAttachment, upload.attachment_sha256)
+    if upload.status != STATUS_UPLOADING or upload.received != upload.size:
+        raise ValueError(f"Envio incompleto: {upload.received} de {upload.size} bytes")
+
+    loop = asyncio.get_running_loop()
+    part = _part_path(upload.id)
+    digest = await loop.run_in_executor(None, _sha256_file, part)
+
+    if digest != upload.sha256:
+        os.remove(part)
+        upload.status = STATUS_FAILED
+        await db.commit()
+        raise ValueError("Hash do conteúdo não confere com o informado")
+
+    attachment = await db.get(ChatAttachment, digest)
+    if attachment is not None:
+        # Conteúdo já armazenado
+        os.remove(part)
+    else:
+        # Mesmo conteúdo, mesmo destino: concluir dois envios iguais ao mesmo tempo é seguro
+        path = _attachment_path(digest, upload.filename, upload.content_type)
+        os.replace(part, path)
+        await db.execute(
+            pg_insert(ChatAttachment)
+            .values(sha256=digest, size=upload.size, content_type=upload.content_type, path=path)
+            .on_conflict_do_nothing(index_elements=[ChatAttachment.sha256])
+        )
+        attachment = await db.get(ChatAttachment, digest)
+
+    upload.status = STATUS_COMPLETE
+    upload.attachment_sha256 = digest
+    await db.commit()
+
+    if attachment.thumbnail_path is None and attachment.content_type in THUMBNAIL_TYPES:
+        task = asyncio.create_task(generate_thumbnail(attachment.sha256, attachment.path))
+        _thumbnail_tasks.add(task)
+        task.add_done_callback(_thumbnail_tasks.discard)
+
+    logger.info(f"Envio {upload.id} concluído: anexo {digest} ({upload.size} bytes)")
+    return attachment
+
+
+async def generate_thumbnail(sha256: str, path: str) -> Optional[str]:
+    """
+    Gera a miniatura de um anexo no pool de processos e grava o caminho.
+
+    Args:
+        sha256: Hash do anexo
+        path: Caminho do arquivo original
+
+    Returns:
+        Caminho da miniatura, ou None em caso de erro
+    """
+    target = os.path.join(os.path.dirname(path), f"{sha256}.thumb.jpg")
+    loop = asyncio.get_running_loop()
+
+    try:
+        await loop.run_in_executor(thumbnail_pool(), _make_thumbnail, path, target, CHAT_THUMBNAIL_SIZE)
+    except Exception as e:
+        logger.error(f"Erro ao gerar miniatura do anexo {sha256}: {e}")
+        return None
+
+    async with SessionLocal() as db:
+        await db.execute(
+            update(ChatAttachment).where(ChatAttachment.sha256 == sha256).values(thumbnail_path=target)
+        )
+        await db.commit()
+
+    return target
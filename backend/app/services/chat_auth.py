@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from jose import JWTError, jwt
+from sqlalchemy import select
+
+from app.models import Patient, User
+from app.services.security import ALGORITHM, JWT_SECRET_KEY
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Tokens verificados mantidos em cache por processo do chat
+CHAT_TOKEN_CACHE_SIZE = int(os.getenv("CHAT_TOKEN_CACHE_SIZE", "50000"))
+
+
+def chat_role(token_role: str) -> str:
+    """Papel no chat (patient, staff) a partir do papel do token (patient, staff, admin)."""
+    return "patient" if token_role == "patient" else "staff"
+
+
+class TokenCache:
+    """
+    Verificação dos tokens JWT das conexões do chat, com cache por hash do token.
+
+    Na primeira conexão com um token, ele é decodificado com o mesmo
+    JWT_SECRET_KEY/ALGORITHM da API e o titular é conferido no banco (existe e
+    está ativo); as declarações ficam em cache até o `exp` do token. Reconexões
+    com o mesmo token custam uma consulta ao dicionário, e verificações
+    simultâneas do mesmo token (várias abas, reconexão em massa) compartilham
+    uma única consulta ao banco.
+    """
+
+    def __init__(self, session_factory, max_size: int = CHAT_TOKEN_CACHE_SIZE):
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verifica um token e retorna as declarações do titular.
+
+        Args:
+            token: Token JWT (sem o prefixo Bearer)
+
+        Returns:
+            Declarações (id, role, exp, ...) ou None se o token for inválido,
+            expirado ou o titular não estiver ativo
+        """
+        key = hashlib.sha256(token.encode()).hexdigest()
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            claims, expires_at = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return claims
+            del self._entries[key]
+
+        self.misses += 1
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        claims = None
+        try:
+            claims = await self._verify(token)
+        finally:
+            # Em caso de erro, quem aguardava este token é recusado e nada fica em cache
+            del self._pending[key]
+            future.set_result(claims)
+
+        if claims is not None:
+            self._entries[key] = (claims, float(claims["exp"]))
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return claims
+
+    async def _verify(self, token: str) -> Optional[Dict[str, Any]]:
+        try:
+            claims = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as e:
+            logger.warning(f"Token do chat inválido: {e}")
+            return None
+
+        if claims.get("id") is None or not claims.get("role") or claims.get("exp") is None:
+            logger.warning("Token do chat sem id, role ou exp")
+            return None
+
+        model = Patient if chat_role(claims["role"]) == "patient" else User
+        async with self.session_factory() as db:
+            active = await db.scalar(select(model.is_active).where(model.id == int(claims["id"])))
+
+        if not active:
+            logger.warning(f"Titular do token inexistente ou inativo: {claims['role']} {claims['id']}")
+            return None
+
+        return claims
+
+    def invalidate(self, token: str) -> None:
+        """Descarta um token do cache (por exemplo, após logout)."""
+        self._entries.pop(hashlib.sha256(token.encode()).hexdigest(), None)
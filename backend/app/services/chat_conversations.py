@@ -0,0 +1,282 @@
+import base64
+import datetime
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import and_, case, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Conversation, Message, Patient, UnreadCounter
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Número máximo de conversas mantidas no cache de metadados
+CONVERSATION_CACHE_SIZE = int(os.getenv("CHAT_CONVERSATION_CACHE_SIZE", "10000"))
+
+# Caixa de entrada: tamanho máximo da página e da prévia de mensagens não criptografadas
+INBOX_PAGE_MAX = 100
+INBOX_PREVIEW_CHARS = 120
+
+# Última atividade da conversa (mesma expressão dos índices ix_conversations_*activity)
+conversation_activity = func.coalesce(Conversation.last_message_at, Conversation.created_at)
+
+
+def _to_uuid(conversation_id: Union[str, uuid.UUID]) -> uuid.UUID:
+    """
+    Normaliza o ID de uma conversa.
+
+    Raises:
+        ValueError: Se o ID não for um UUID válido
+    """
+    if isinstance(conversation_id, uuid.UUID):
+        return conversation_id
+    return uuid.UUID(str(conversation_id))
+
+
+def _metadata(conversation: Any) -> Dict[str, Any]:
+    return {
+        'conversation_id': str(conversation.id),
+        'patient_id': conversation.patient_id,
+        'staff_id': conversation.assigned_user_id,
+        'created_at': conversation.created_at,
+    }
+
+
+class ConversationCache:
+    """
+    Cache LRU dos metadados de conversa (paciente e profissional responsável).
+
+    O paciente de uma conversa nunca muda, então rotear uma mensagem não custa
+    consulta depois do primeiro acesso; a reatribuição do profissional deve
+    chamar `invalidate`.
+    """
+
+    def __init__(self, session_factory, max_size: int = CONVERSATION_CACHE_SIZE):
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self._entries: "OrderedDict[uuid.UUID, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: uuid.UUID, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        self._entries[key] = metadata
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return metadata
+
+    def _lookup(self, key: uuid.UUID) -> Optional[Dict[str, Any]]:
+        metadata = self._entries.get(key)
+        if metadata is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        return metadata
+
+    async def get(self, conversation_id: Union[str, uuid.UUID]) -> Optional[Dict[str, Any]]:
+        """
+        Retorna os metadados de uma conversa.
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            Dicionário com conversation_id, patient_id, staff_id e created_at, ou None se não existir
+
+        Raises:
+            ValueError: Se o ID não for um UUID válido
+        """
+        key = _to_uuid(conversation_id)
+        metadata = self._lookup(key)
+        if metadata is not None:
+            return metadata
+
+        async with self.session_factory() as session:
+            conversation = await session.scalar(select(Conversation).where(Conversation.id == key))
+
+        if conversation is None:
+            return None
+        return self._remember(key, _metadata(conversation))
+
+    async def get_or_create(
+        self,
+        conversation_id: Union[str, uuid.UUID],
+        patient_id: int,
+        assigned_user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Retorna os metadados de uma conversa, criando-a se ainda não existir.
+
+        Args:
+            conversation_id: ID da conversa (gerado pelo cliente na primeira mensagem)
+            patient_id: Paciente da conversa
+            assigned_user_id: Profissional responsável, se já conhecido
+
+        Returns:
+            Metadados da conversa
+
+        Raises:
+            ValueError: Se o ID não for um UUID válido
+        """
+        key = _to_uuid(conversation_id)
+        metadata = self._lookup(key)
+        if metadata is not None:
+            return metadata
+
+        async with self.session_factory() as session:
+            await session.execute(
+                pg_insert(Conversation)
+                .values(id=key, patient_id=patient_id, assigned_user_id=assigned_user_id)
+                .on_conflict_do_nothing(index_elements=[Conversation.id])
+            )
+            await session.commit()
+            conversation = await session.scalar(select(Conversation).where(Conversation.id == key))
+
+        return self._remember(key, _metadata(conversation))
+
+    def invalidate(self, conversation_id: Union[str, uuid.UUID]) -> None:
+        """Descarta os metadados em cache de uma conversa."""
+        try:
+            self._entries.pop(_to_uuid(conversation_id), None)
+        except ValueError:
+            pass
+
+
+def encode_inbox_cursor(activity: datetime.datetime, conversation_id: Union[str, uuid.UUID]) -> str:
+    """
+    Gera o cursor da caixa de entrada a partir da última conversa de uma página.
+
+    Returns:
+        Cursor opaco (base64) com a última atividade e o ID da conversa
+    """
+    raw = f"{activity.isoformat()}|{conversation_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_inbox_cursor(cursor: str) -> Tuple[datetime.datetime, uuid.UUID]:
+    """
+    Decodifica um cursor da caixa de entrada.
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        activity, conversation_id = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(activity), uuid.UUID(conversation_id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+async def inbox_page(
+    session: AsyncSession,
+    participant_type: str,
+    participant_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    assigned_only: bool = False
+) -> Dict[str, Any]:
+    """
+    Retorna uma página da caixa de entrada, da conversa mais ativa para a menos ativa.
+
+    Uma única consulta: a última mensagem vem pelas colunas desnormalizadas
+    last_message_id e last_message_at (chave primária da tabela particionada,
+    lida em uma só partição) e as não lidas pelo contador
+    do papel; a ordenação e o cursor usam os índices de atividade.
+
+    Args:
+        session: Sessão do banco de dados
+        participant_type: "patient" (suas conversas) ou "staff" (caixa compartilhada da equipe)
+        participant_id: ID do paciente ou do usuário
+        limit: Número máximo de conversas
+        cursor: Cursor `next_cursor` da página anterior
+        assigned_only: Para a equipe, apenas conversas atribuídas ao usuário
+
+    Returns:
+        Dicionário com items (lista de conversas) e next_cursor
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    limit = max(1, min(int(limit), INBOX_PAGE_MAX))
+    position = decode_inbox_cursor(cursor) if cursor else None
+
+    activity = conversation_activity.label("activity")
+    preview = case(
+        # Conteúdo criptografado só pode ser lido pelo cliente: enviar inteiro
+        (Message.encrypted, Message.content),
+        else_=func.left(Message.content, INBOX_PREVIEW_CHARS),
+    ).label("preview")
+
+    query = (
+        select(
+            Conversation.id,
+            Conversation.patient_id,
+            Patient.name.label("patient_name"),
+            Conversation.assigned_user_id,
+            activity,
+            Message.id.label("message_id"),
+            Message.sender_type,
+            Message.encrypted,
+            Message.attachment_type,
+            Message.created_at.label("message_at"),
+            preview,
+            func.coalesce(UnreadCounter.unread_count, 0).label("unread"),
+        )
+        .join(Patient, Patient.id == Conversation.patient_id)
+        # A data da última mensagem permite ao Postgres descartar as demais partições de messages
+        .outerjoin(Message, and_(
+            Message.id == Conversation.last_message_id,
+            Message.created_at == Conversation.last_message_at,
+        ))
+        .outerjoin(UnreadCounter, and_(
+            UnreadCounter.conversation_id == Conversation.id,
+            UnreadCounter.participant_role == participant_type,
+        ))
+    )
+
+    if participant_type == "patient":
+        query = query.where(Conversation.patient_id == participant_id)
+    elif assigned_only:
+        query = query.where(Conversation.assigned_user_id == participant_id)
+
+    if position:
+        query = query.where(tuple_(conversation_activity, Conversation.id) < tuple_(*position))
+
+    result = await session.execute(
+        query.order_by(conversation_activity.desc(), Conversation.id.desc()).limit(limit + 1)
+    )
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items: List[Dict[str, Any]] = []
+    for row in rows:
+        last_message = None
+        if row.message_id is not None:
+            last_message = {
+                "id": row.message_id,
+                "sender_type": row.sender_type,
+                "encrypted": row.encrypted,
+                "preview": row.preview,
+                "attachment_type": row.attachment_type,
+                "timestamp": row.message_at,
+            }
+        items.append({
+            "conversation_id": str(row.id),
+            "patient_id": row.patient_id,
+            "patient_name": row.patient_name,
+            "assigned_user_id": row.assigned_user_id,
+            "last_activity": row.activity,
+            "last_message": last_message,
+            "unread": row.unread,
+        })
+
+    next_cursor = encode_inbox_cursor(rows[-1].activity, rows[-1].id) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,106 @@
+import logging
+import os
+from typing import Dict, Optional
+
+from app.services.resilience import TokenBucket
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Fichas repostas por segundo e capacidade do balde de cada conexão
+CHAT_RATE_LIMIT_PER_SECOND = float(os.getenv("CHAT_RATE_LIMIT_PER_SECOND", "10"))
+CHAT_RATE_LIMIT_BURST = float(os.getenv("CHAT_RATE_LIMIT_BURST", "20"))
+
+# Eventos de uma conexão sendo processados ao mesmo tempo
+CHAT_MAX_INFLIGHT_PER_CONNECTION = int(os.getenv("CHAT_MAX_INFLIGHT_PER_CONNECTION", "4"))
+
+# Custo em fichas de cada evento, proporcional ao trabalho no banco
+EVENT_COSTS = {
+    "send_message": 1.0,
+    "mark_as_read": 1.0,
+    "join_conversation": 1.0,
+    "get_unread_count": 2.0,
+    "subscribe_presence": 2.0,
+    "get_inbox": 2.0,
+    "get_conversation_history": 5.0,
+}
+
+# Motivos informados no evento rate_limited
+REASON_RATE = "rate"
+REASON_BUSY = "busy"
+
+
+class _ConnectionBudget:
+    __slots__ = ("bucket", "inflight")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.inflight = 0
+
+
+class ConnectionLimiter:
+    """
+    Limite de taxa e de trabalho simultâneo por conexão do chat.
+
+    Cada conexão tem um balde de fichas (TokenBucket) e um número máximo de
+    eventos em processamento; o que passa disso é recusado na hora, sem
+    enfileirar, para que um cliente não ocupe o laço de eventos nem o pool de
+    conexões do banco à custa dos demais.
+    """
+
+    def __init__(
+        self,
+        rate: float = CHAT_RATE_LIMIT_PER_SECOND,
+        burst: float = CHAT_RATE_LIMIT_BURST,
+        max_inflight: int = CHAT_MAX_INFLIGHT_PER_CONNECTION,
+        costs: Optional[Dict[str, float]] = None
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_inflight = max_inflight
+        self.costs = costs if costs is not None else EVENT_COSTS
+        self._budgets: Dict[str, _ConnectionBudget] = {}
+
+    def _budget(self, sid: str) -> _ConnectionBudget:
+        budget = self._budgets.get(sid)
+        if budget is None:
+            budget = self._budgets[sid] = _ConnectionBudget(TokenBucket(self.rate, self.burst))
+        return budget
+
+    def close(self, sid: str) -> None:
+        """Descarta o estado de uma conexão encerrada."""
+        self._budgets.pop(sid, None)
+
+    def admit(self, sid: str, event: str) -> Optional[str]:
+        """
+        Decide se um evento de uma conexão pode ser processado agora.
+
+        Em caso de admissão, o chamador deve chamar `release` ao terminar.
+
+        Args:
+            sid: ID da sessão Socket.IO
+            event: Nome do evento
+
+        Returns:
+            None se admitido, ou o motivo da recusa (REASON_BUSY, REASON_RATE)
+        """
+        budget = self._budget(sid)
+        if budget.inflight >= self.max_inflight:
+            return REASON_BUSY
+        if not budget.bucket.try_acquire(self.costs.get(event, 1.0)):
+            return REASON_RATE
+
+        budget.inflight += 1
+        return None
+
+    def release(self, sid: str) -> None:
+        """Libera a vaga de um evento admitido."""
+        budget = self._budgets.get(sid)
+        if budget is not None and budget.inflight > 0:
+            budget.inflight -= 1
+
+    def retry_after(self, sid: str, event: str) -> float:
+        """Segundos até haver fichas para o evento (estimativa para o cliente)."""
+        bucket = self._budget(sid).bucket
+        missing = self.costs.get(event, 1.0) - bucket.tokens
+        return round(max(missing, 0.0) / bucket.rate, 2) if bucket.rate else 0.0
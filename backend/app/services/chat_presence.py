@@ -0,0 +1,211 @@
+import datetime
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import bindparam, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models import ChatSession, StaffPresence
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Tempo sem sinal de atividade de nenhum dispositivo até o profissional ficar ausente (segundos)
+CHAT_PRESENCE_TIMEOUT_SECONDS = int(os.getenv("CHAT_PRESENCE_TIMEOUT_SECONDS", "60"))
+
+STATUS_ONLINE = "online"
+STATUS_AWAY = "away"
+STATUS_OFFLINE = "offline"
+
+# Grava o último sinal de várias conexões em um único executemany
+sessions_table = ChatSession.__table__
+_touch_session = (
+    update(sessions_table)
+    .where(sessions_table.c.sid == bindparam("b_sid"))
+    .values(last_beat=bindparam("b_beat"))
+)
+
+# Chamado quando o estado agregado de um profissional muda: (user_id, status)
+PresenceCallback = Callable[[str, str], Awaitable[None]]
+
+
+def presence_room(user_id: str) -> str:
+    """Sala que recebe as mudanças de presença de um profissional."""
+    return f"presence:{user_id}"
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class PresenceTracker:
+    """
+    Presença dos profissionais, agregada entre dispositivos e processos do chat.
+
+    Cada conexão de profissional tem um último sinal de atividade (conexão,
+    evento presence_heartbeat ou mensagem enviada), mantido em memória e gravado
+    em lote em chat_sessions a cada varredura. O estado agregado (online se algum
+    dispositivo deu sinal dentro do prazo, ausente se há conexões sem sinal,
+    offline sem conexões) fica em staff_presence; a gravação é condicional, então
+    só o processo que efetivamente mudou o estado chama `on_change`, que publica
+    apenas na sala de presença do profissional (custo proporcional aos inscritos).
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        on_change: Optional[PresenceCallback] = None,
+        timeout: int = CHAT_PRESENCE_TIMEOUT_SECONDS
+    ):
+        self.session_factory = session_factory
+        self.on_change = on_change
+        self.timeout = datetime.timedelta(seconds=timeout)
+        self._beats: Dict[str, datetime.datetime] = {}
+        self._sid_user: Dict[str, str] = {}
+        self._user_sids: Dict[str, Set[str]] = {}
+        self._status: Dict[str, str] = {}
+        self._dirty: Set[str] = set()
+
+    async def connect(self, sid: str, user_id: str) -> None:
+        """
+        Registra a conexão de um profissional (após gravá-la em chat_sessions).
+
+        Args:
+            sid: ID da sessão Socket.IO
+            user_id: ID do profissional
+        """
+        user_id = str(user_id)
+        self._sid_user[sid] = user_id
+        self._user_sids.setdefault(user_id, set()).add(sid)
+        self._beats[sid] = _now()
+        await self._recompute(user_id)
+
+    async def beat(self, sid: str) -> None:
+        """Registra um sinal de atividade de uma conexão deste processo."""
+        user_id = self._sid_user.get(sid)
+        if user_id is None:
+            return
+
+        self._beats[sid] = _now()
+        self._dirty.add(sid)
+
+        # Só consulta o banco quando o profissional volta a ficar ativo
+        if self._status.get(user_id) != STATUS_ONLINE:
+            await self._recompute(user_id)
+
+    async def disconnect(self, sid: str) -> None:
+        """Remove uma conexão (após removê-la de chat_sessions) e recalcula o estado do profissional."""
+        user_id = self._sid_user.pop(sid, None)
+        self._beats.pop(sid, None)
+        self._dirty.discard(sid)
+        if user_id is None:
+            return
+
+        sids = self._user_sids.get(user_id, set())
+        sids.discard(sid)
+        if not sids:
+            self._user_sids.pop(user_id, None)
+
+        await self._recompute(user_id)
+        if user_id not in self._user_sids:
+            self._status.pop(user_id, None)
+
+    async def sweep(self) -> None:
+        """
+        Grava os sinais pendentes, marca como ausentes os profissionais sem
+        atividade recente e como offline os que ficaram sem conexões (por
+        exemplo, após a queda de outro processo).
+        """
+        beats = [{"b_sid": sid, "b_beat": self._beats[sid]} for sid in self._dirty if sid in self._beats]
+        self._dirty.clear()
+
+        async with self.session_factory() as db:
+            if beats:
+                await db.execute(_touch_session, beats)
+
+            result = await db.execute(
+                update(StaffPresence)
+                .where(
+                    StaffPresence.status != STATUS_OFFLINE,
+                    ~exists().where(ChatSession.user_id == StaffPresence.user_id, ChatSession.role == "staff"),
+                )
+                .values(status=STATUS_OFFLINE, updated_at=func.now())
+                .returning(StaffPresence.user_id)
+            )
+            offline = result.scalars().all()
+            await db.commit()
+
+        for user_id in offline:
+            await self._notify(user_id, STATUS_OFFLINE)
+
+        threshold = _now() - self.timeout
+        for user_id, sids in list(self._user_sids.items()):
+            if self._status.get(user_id) == STATUS_ONLINE and all(self._beats[sid] < threshold for sid in sids):
+                await self._recompute(user_id)
+
+    async def statuses(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Retorna o estado atual de vários profissionais em uma consulta.
+
+        Args:
+            user_ids: IDs dos profissionais
+
+        Returns:
+            Dicionário {user_id: status} (offline para quem nunca se conectou)
+        """
+        user_ids = [str(user_id) for user_id in user_ids]
+        if not user_ids:
+            return {}
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(StaffPresence.user_id, StaffPresence.status).where(StaffPresence.user_id.in_(user_ids))
+            )
+            found = dict(result.all())
+
+        return {user_id: found.get(user_id, STATUS_OFFLINE) for user_id in user_ids}
+
+    async def _recompute(self, user_id: str) -> None:
+        """Calcula o estado agregado de um profissional e grava-o se mudou."""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(func.count(ChatSession.sid), func.max(ChatSession.last_beat))
+                .where(ChatSession.user_id == user_id, ChatSession.role == "staff")
+            )
+            connections, last_beat = result.one()
+
+            # Os sinais deste processo podem ainda não ter sido gravados
+            local: List[datetime.datetime] = [self._beats[sid] for sid in self._user_sids.get(user_id, ())]
+            if local:
+                last_beat = max([last_beat] + local) if last_beat else max(local)
+
+            if not connections and not local:
+                status = STATUS_OFFLINE
+            elif last_beat and last_beat >= _now() - self.timeout:
+                status = STATUS_ONLINE
+            else:
+                status = STATUS_AWAY
+
+            stmt = pg_insert(StaffPresence).values(user_id=user_id, status=status)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[StaffPresence.user_id],
+                set_={"status": stmt.excluded.status, "updated_at": func.now()},
+                where=StaffPresence.status != stmt.excluded.status,
+            ).returning(StaffPresence.status)
+            changed = (await db.execute(stmt)).scalar_one_or_none()
+            await db.commit()
+
+        if user_id in self._user_sids:
+            self._status[user_id] = status
+
+        if changed is not None:
+            await self._notify(user_id, status)
+
+    async def _notify(self, user_id: str, status: str) -> None:
+        logger.info(f"Profissional {user_id} agora está {status}")
+        if self.on_change:
+            try:
+                await self.on_change(user_id, status)
+            except Exception as e:
+                logger.error(f"Erro ao publicar presença de {user_id}: {e}")
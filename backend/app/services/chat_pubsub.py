@@ -0,0 +1,204 @@
+import asyncio
+import base64
+import logging
+import os
+import pickle
+import time
+from typing import Awaitable, Callable, Optional
+
+import asyncpg
+import socketio
+from socketio.asyncio_pubsub_manager import AsyncPubSubManager
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Fila de mensagens entre os processos do chat:
+#   vazio     -> processo único, sem gerenciador compartilhado
+#   postgres  -> LISTEN/NOTIFY no próprio DATABASE_URL
+#   postgresql://..., redis://..., amqp://... -> backend correspondente
+SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE", "")
+SOCKETIO_CHANNEL = os.getenv("SOCKETIO_CHANNEL", "socketio")
+
+# O NOTIFY aceita até 8000 bytes; acima disso o conteúdo vai para a tabela de transbordo
+NOTIFY_PAYLOAD_LIMIT = 7500
+SPILL_PREFIX = "spill:"
+SPILL_RETENTION_SECONDS = 300
+
+
+def _asyncpg_dsn(url: str) -> str:
+    """Converte uma URL do SQLAlchemy (postgresql+asyncpg://) para o formato do asyncpg."""
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+class LocalFanoutMixin:
+    """
+    Permite ao processo complementar, só para os seus clientes, cada evento recebido da fila.
+
+    Após a entrega normal de um evento publicado para uma sala, `on_local_emit`
+    é chamado com (evento, dados, sala, skip_sid). O servidor do chat o usa para
+    enviar a cópia MessagePack apenas aos clientes locais que a negociaram, sem
+    publicar uma segunda mensagem na fila.
+    """
+
+    on_local_emit: Optional[Callable[..., Awaitable[None]]] = None
+
+    async def _handle_emit(self, message):
+        await super()._handle_emit(message)
+        if self.on_local_emit is not None and message.get("room") is not None:
+            await self.on_local_emit(
+                message["event"], message["data"], message["room"], message.get("skip_sid")
+            )
+
+
+class AsyncRedisFanoutManager(LocalFanoutMixin, socketio.AsyncRedisManager):
+    """AsyncRedisManager com a entrega local complementar (LocalFanoutMixin)."""
+
+
+class AsyncAioPikaFanoutManager(LocalFanoutMixin, socketio.AsyncAioPikaManager):
+    """AsyncAioPikaManager com a entrega local complementar (LocalFanoutMixin)."""
+
+
+class AsyncPostgresManager(LocalFanoutMixin, AsyncPubSubManager):
+    """
+    Gerenciador de clientes do Socket.IO sobre LISTEN/NOTIFY do PostgreSQL.
+
+    Cada processo escuta o canal e reemite localmente os eventos publicados pelos
+    demais, de modo que `emit(room=...)` alcança os clientes de todos os processos
+    sem infraestrutura além do banco. Conteúdos maiores que o limite do NOTIFY são
+    gravados em `socketio_spill` e apenas o ID trafega pelo canal.
+
+    Args:
+        url: URL do banco (aceita o formato do SQLAlchemy)
+        channel: Canal do LISTEN/NOTIFY
+        write_only: Se apenas publica (processos que não atendem clientes)
+        logger: Logger do gerenciador
+    """
+
+    name = "asyncpg"
+
+    def __init__(self, url: str, channel: str = SOCKETIO_CHANNEL, write_only: bool = False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.dsn = _asyncpg_dsn(url)
+        self._pool: Optional[asyncpg.Pool] = None
+        self._last_spill_cleanup = 0.0
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+        return self._pool
+
+    async def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, **kwargs):
+        # Destino é um cliente deste processo: entregar sem passar pela fila
+        if room is not None and self.is_connected(room, namespace or "/"):
+            kwargs["ignore_queue"] = True
+        return await super().emit(
+            event, data, namespace=namespace, room=room, skip_sid=skip_sid, callback=callback, **kwargs
+        )
+
+    async def _publish(self, data):
+        payload = base64.b64encode(pickle.dumps(data)).decode("ascii")
+        pool = await self._get_pool()
+
+        async with pool.acquire() as conn:
+            if len(payload) > NOTIFY_PAYLOAD_LIMIT:
+                spill_id = await conn.fetchval(
+                    "INSERT INTO socketio_spill (payload) VALUES ($1) RETURNING id", payload
+                )
+                payload = f"{SPILL_PREFIX}{spill_id}"
+                await self._cleanup_spill(conn)
+
+            await conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def _cleanup_spill(self, conn: asyncpg.Connection) -> None:
+        """Remove periodicamente os conteúdos de transbordo já entregues."""
+        now = time.monotonic()
+        if now - self._last_spill_cleanup < SPILL_RETENTION_SECONDS:
+            return
+        self._last_spill_cleanup = now
+        await conn.execute(
+            "DELETE FROM socketio_spill WHERE created_at < now() - make_interval(secs => $1)",
+            SPILL_RETENTION_SECONDS
+        )
+
+    async def _load(self, payload: str):
+        """Decodifica uma notificação recebida, buscando o conteúdo transbordado se necessário."""
+        if payload.startswith(SPILL_PREFIX):
+            pool = await self._get_pool()
+            payload = await pool.fetchval(
+                "SELECT payload FROM socketio_spill WHERE id = $1", int(payload[len(SPILL_PREFIX):])
+            )
+            if payload is None:
+                return None
+        return pickle.loads(base64.b64decode(payload))
+
+    async def _listen(self):
+        retry_delay = 1
+        while True:
+            queue: asyncio.Queue = asyncio.Queue()
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                await conn.add_listener(self.channel, lambda *args: queue.put_nowait(args[-1]))
+                retry_delay = 1
+
+                while not conn.is_closed():
+                    try:
+                        payload = await asyncio.wait_for(queue.get(), timeout=30)
+                    except asyncio.TimeoutError:
+                        continue
+
+                    try:
+                        message = await self._load(payload)
+                    except Exception as e:
+                        logger.error(f"Mensagem inválida no canal {self.channel}: {e}")
+                        continue
+
+                    if message is not None:
+                        yield message
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Conexão LISTEN do canal {self.channel} perdida: {e}")
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30)
+
+
+def create_client_manager(
+    message_queue: str = SOCKETIO_MESSAGE_QUEUE,
+    database_url: Optional[str] = None,
+    write_only: bool = False
+) -> Optional[socketio.AsyncManager]:
+    """
+    Cria o gerenciador de clientes conforme a fila de mensagens configurada.
+
+    Args:
+        message_queue: "postgres" ou URL do backend; vazio para processo único
+        database_url: URL do banco usada quando message_queue é "postgres"
+        write_only: Se o processo apenas publica eventos
+
+    Returns:
+        Gerenciador de clientes, ou None para o gerenciador local padrão
+
+    Raises:
+        ValueError: Se o esquema da URL não for suportado
+    """
+    if not message_queue:
+        return None
+
+    if message_queue == "postgres":
+        message_queue = database_url or os.getenv("DATABASE_URL", "")
+
+    if message_queue.startswith(("postgresql://", "postgresql+asyncpg://", "postgres://")):
+        return AsyncPostgresManager(message_queue, write_only=write_only)
+    if message_queue.startswith(("redis://", "rediss://")):
+        return AsyncRedisFanoutManager(message_queue, channel=SOCKETIO_CHANNEL, write_only=write_only)
+    if message_queue.startswith("amqp://"):
+        return AsyncAioPikaFanoutManager(message_queue, channel=SOCKETIO_CHANNEL, write_only=write_only)
+
+    raise ValueError(f"Fila de mensagens não suportada: {message_queue}")
@@ -0,0 +1,190 @@
+import logging
+import uuid
+from typing import Dict, Optional, Tuple, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Conversation, ConversationRead, Message, UnreadCounter
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Quem envia as mensagens que um participante tem para ler
+OTHER_SIDE = {"patient": "staff", "staff": "patient"}
+
+
+async def mark_read(
+    session: AsyncSession,
+    conversation_id: Union[str, uuid.UUID],
+    participant_type: str,
+    participant_id: int,
+    message_id: int
+) -> int:
+    """
+    Avança a marca de leitura de um participante com um único upsert.
+
+    A marca nunca retrocede (GREATEST) nem passa da última mensagem da conversa.
+    O contador de não lidas do papel é recalculado na mesma transação a partir
+    da maior marca do papel, percorrendo apenas as mensagens após ela (em geral
+    nenhuma); assim, qualquer divergência do contador é corrigida na leitura.
+
+    Args:
+        session: Sessão do banco de dados
+        conversation_id: ID da conversa
+        participant_type: "patient" ou "staff"
+        participant_id: ID do paciente ou do usuário
+        message_id: Última mensagem lida
+
+    Returns:
+        Marca de leitura resultante
+    """
+    last_message_id = (
+        select(Conversation.last_message_id)
+        .where(Conversation.id == conversation_id)
+        .scalar_subquery()
+    )
+
+    stmt = pg_insert(ConversationRead).values(
+        conversation_id=conversation_id,
+        participant_type=participant_type,
+        participant_id=participant_id,
+        last_read_message_id=func.least(message_id, last_message_id),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            ConversationRead.conversation_id,
+            ConversationRead.participant_type,
+            ConversationRead.participant_id,
+        ],
+        set_={
+            "last_read_message_id": func.greatest(
+                ConversationRead.last_read_message_id, stmt.excluded.last_read_message_id
+            ),
+            "updated_at": func.now(),
+        },
+    ).returning(ConversationRead.last_read_message_id)
+
+    watermark = await session.scalar(stmt)
+    await _reset_unread(session, conversation_id, participant_type)
+    await session.commit()
+    return watermark
+
+
+async def _reset_unread(
+    session: AsyncSession,
+    conversation_id: Union[str, uuid.UUID],
+    participant_role: str
+) -> None:
+    """Recalcula o contador de não lidas de um papel a partir da sua maior marca de leitura."""
+    role_watermark = (
+        select(func.coalesce(func.max(ConversationRead.last_read_message_id), 0))
+        .where(
+            ConversationRead.conversation_id == conversation_id,
+            ConversationRead.participant_type == participant_role,
+        )
+        .scalar_subquery()
+    )
+    remaining = (
+        select(func.count(Message.id))
+        .where(
+            Message.conversation_id == conversation_id,
+            Message.sender_type == OTHER_SIDE[participant_role],
+            Message.id > role_watermark,
+        )
+        .scalar_subquery()
+    )
+
+    stmt = pg_insert(UnreadCounter).values(
+        conversation_id=conversation_id, participant_role=participant_role, unread_count=remaining
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[UnreadCounter.conversation_id, UnreadCounter.participant_role],
+        set_={"unread_count": stmt.excluded.unread_count, "updated_at": func.now()},
+    ))
+
+
+async def increment_unread(session: AsyncSession, deltas: Dict[Tuple[uuid.UUID, str], int]) -> None:
+    """
+    Soma novas mensagens aos contadores de não lidas (sem commit; usar na transação do INSERT).
+
+    Args:
+        session: Sessão do banco de dados
+        deltas: Quantidade a somar por (conversation_id, papel de quem deve ler)
+    """
+    if not deltas:
+        return
+
+    table = UnreadCounter.__table__
+    stmt = pg_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.conversation_id, table.c.participant_role],
+        set_={"unread_count": table.c.unread_count + stmt.excluded.unread_count, "updated_at": func.now()},
+    )
+
+    # Ordem fixa das linhas evita deadlock entre processos gravando os mesmos contadores
+    rows = [
+        {"conversation_id": conversation_id, "participant_role": role, "unread_count": count}
+        for (conversation_id, role), count in sorted(deltas.items(), key=lambda item: (str(item[0][0]), item[0][1]))
+    ]
+    await session.execute(stmt, rows)
+
+
+async def read_watermarks(session: AsyncSession, conversation_id: Union[str, uuid.UUID]) -> Dict[str, int]:
+    """
+    Retorna a maior marca de leitura de cada lado de uma conversa.
+
+    Args:
+        session: Sessão do banco de dados
+        conversation_id: ID da conversa
+
+    Returns:
+        Dicionário {"patient": id, "staff": id} (0 se o lado nunca leu)
+    """
+    result = await session.execute(
+        select(ConversationRead.participant_type, func.max(ConversationRead.last_read_message_id))
+        .where(ConversationRead.conversation_id == conversation_id)
+        .group_by(ConversationRead.participant_type)
+    )
+    watermarks = {"patient": 0, "staff": 0}
+    watermarks.update({participant_type: value for participant_type, value in result.all()})
+    return watermarks
+
+
+async def unread_counts(
+    session: AsyncSession,
+    participant_type: str,
+    participant_id: int,
+    conversation_id: Optional[Union[str, uuid.UUID]] = None
+) -> Dict[str, int]:
+    """
+    Retorna as mensagens não lidas por conversa a partir dos contadores mantidos.
+
+    Os contadores são por papel: para a equipe, a caixa de entrada é compartilhada
+    e a consulta usa o índice parcial das conversas com não lidas.
+
+    Args:
+        session: Sessão do banco de dados
+        participant_type: "patient" ou "staff"
+        participant_id: ID do paciente ou do usuário
+        conversation_id: Restringe a contagem a uma conversa
+
+    Returns:
+        Dicionário {conversation_id: não lidas}, apenas com conversas que têm não lidas
+    """
+    query = select(UnreadCounter.conversation_id, UnreadCounter.unread_count).where(
+        UnreadCounter.participant_role == participant_type,
+        UnreadCounter.unread_count > 0,
+    )
+
+    if participant_type == "patient":
+        query = query.join(Conversation, Conversation.id == UnreadCounter.conversation_id).where(
+            Conversation.patient_id == participant_id
+        )
+
+    if conversation_id:
+        query = query.where(UnreadCounter.conversation_id == conversation_id)
+
+    result = await session.execute(query)
+    return {str(conv_id): count for conv_id, count in result.all()}
@@ -0,0 +1,180 @@
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models import ChatSession, ChatSessionRoom, ChatWorker
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Identificador deste processo do chat
+WORKER_ID = os.getenv("CHAT_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+# Batimento dos processos e prazo para considerar um processo morto (segundos)
+CHAT_WORKER_HEARTBEAT_SECONDS = int(os.getenv("CHAT_WORKER_HEARTBEAT_SECONDS", "15"))
+CHAT_WORKER_TIMEOUT_SECONDS = int(os.getenv("CHAT_WORKER_TIMEOUT_SECONDS", "60"))
+
+
+class ChatStateStore:
+    """
+    Sessões e salas das conexões do chat, compartilhadas entre os processos.
+
+    Os eventos de uma conexão sempre chegam ao processo que a atende, então as
+    leituras por sid usam o índice local (usuário -> conexões, conexão -> salas,
+    com operações O(1)); as escritas vão também para o banco para que qualquer
+    processo consulte as conexões dos demais. Cada dispositivo é uma conexão
+    própria: desconectar um não afeta as salas dos outros. Pacientes e
+    profissionais vêm de tabelas diferentes, então o índice por usuário usa
+    (papel, ID).
+    As linhas de um processo que parou de enviar batimentos são removidas em cascata.
+    """
+
+    def __init__(self, session_factory, worker_id: str = WORKER_ID):
+        self.session_factory = session_factory
+        self.worker_id = worker_id
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._rooms: Dict[str, Set[str]] = {}
+        self._user_sids: Dict[Tuple[str, str], Set[str]] = {}
+
+    async def start(self) -> None:
+        """Registra o processo e descarta linhas de uma execução anterior com o mesmo ID."""
+        async with self.session_factory() as db:
+            await db.execute(delete(ChatWorker).where(ChatWorker.worker_id == self.worker_id))
+            await db.execute(pg_insert(ChatWorker).values(worker_id=self.worker_id))
+            await db.commit()
+        logger.info(f"Processo do chat {self.worker_id} registrado")
+
+    async def stop(self) -> None:
+        """Remove o processo e, em cascata, suas sessões e salas."""
+        async with self.session_factory() as db:
+            await db.execute(delete(ChatWorker).where(ChatWorker.worker_id == self.worker_id))
+            await db.commit()
+        self._sessions.clear()
+        self._rooms.clear()
+        self._user_sids.clear()
+
+    async def heartbeat(self) -> int:
+        """
+        Atualiza o batimento deste processo e remove os processos sem batimento.
+
+        Returns:
+            Número de processos removidos
+        """
+        async with self.session_factory() as db:
+            stmt = pg_insert(ChatWorker).values(worker_id=self.worker_id)
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[ChatWorker.worker_id], set_={"last_seen": text("now()")}
+            ))
+            result = await db.execute(
+                delete(ChatWorker)
+                .where(ChatWorker.last_seen < text(f"now() - interval '{CHAT_WORKER_TIMEOUT_SECONDS} seconds'"))
+                .returning(ChatWorker.worker_id)
+            )
+            dead = result.scalars().all()
+            await db.commit()
+
+        for worker_id in dead:
+            logger.warning(f"Processo do chat {worker_id} sem batimento; sessões removidas")
+        return len(dead)
+
+    def get_session(self, sid: str) -> Optional[Dict[str, Any]]:
+        """Retorna os dados (user_id, role, wire_format) de uma conexão deste processo."""
+        return self._sessions.get(sid)
+
+    def in_room(self, sid: str, room: str) -> bool:
+        """Indica se uma conexão deste processo está em uma sala."""
+        return room in self._rooms.get(sid, ())
+
+    def user_sids(self, role: str, user_id: str) -> Set[str]:
+        """Retorna as conexões (dispositivos) de um usuário ou paciente neste processo."""
+        return set(self._user_sids.get((role, str(user_id)), ()))
+
+    async def add_session(self, sid: str, user_id: str, role: str, wire_format: str = "json") -> None:
+        """
+        Registra uma conexão autenticada.
+
+        Args:
+            sid: ID da sessão Socket.IO
+            user_id: ID do usuário ou paciente
+            role: Papel (staff, patient)
+            wire_format: Formato de transmissão negociado (só no cache local)
+        """
+        self._sessions[sid] = {"user_id": user_id, "role": role, "wire_format": wire_format}
+        self._rooms[sid] = set()
+        self._user_sids.setdefault((role, str(user_id)), set()).add(sid)
+
+        async with self.session_factory() as db:
+            await db.execute(
+                pg_insert(ChatSession)
+                .values(sid=sid, worker_id=self.worker_id, user_id=str(user_id), role=role)
+                .on_conflict_do_nothing()
+            )
+            await db.commit()
+
+    async def remove_session(self, sid: str) -> Set[str]:
+        """
+        Remove uma conexão e suas salas, mantendo as demais conexões do usuário.
+
+        Args:
+            sid: ID da sessão Socket.IO
+
+        Returns:
+            Salas em que a conexão estava
+        """
+        session = self._sessions.pop(sid, None)
+        rooms = self._rooms.pop(sid, set())
+
+        if session is not None:
+            key = (session["role"], str(session["user_id"]))
+            sids = self._user_sids.get(key)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._user_sids[key]
+
+        async with self.session_factory() as db:
+            await db.execute(delete(ChatSession).where(ChatSession.sid == sid))
+            await db.commit()
+
+        return rooms
+
+    async def add_room(self, sid: str, room: str) -> bool:
+        """
+        Registra a entrada de uma conexão em uma sala.
+
+        Returns:
+            False se a conexão já estava na sala (nada é gravado)
+        """
+        rooms = self._rooms.setdefault(sid, set())
+        if room in rooms:
+            return False
+        rooms.add(room)
+
+        async with self.session_factory() as db:
+            await db.execute(pg_insert(ChatSessionRoom).values(sid=sid, room=room).on_conflict_do_nothing())
+            await db.commit()
+        return True
+
+    async def remove_room(self, sid: str, room: str) -> bool:
+        """
+        Registra a saída de uma conexão de uma sala.
+
+        Returns:
+            False se a conexão não estava na sala (nada é gravado)
+        """
+        rooms = self._rooms.get(sid)
+        if not rooms or room not in rooms:
+            return False
+        rooms.discard(room)
+
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(ChatSessionRoom).where(ChatSessionRoom.sid == sid, ChatSessionRoom.room == room)
+            )
+            await db.commit()
+        return True
@@ -0,0 +1,107 @@
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre avisos de digitação de uma conexão em uma conversa (segundos)
+CHAT_TYPING_INTERVAL_SECONDS = float(os.getenv("CHAT_TYPING_INTERVAL_SECONDS", "3"))
+# Tempo sem eventos de digitação até considerar que o usuário parou (segundos)
+CHAT_TYPING_TIMEOUT_SECONDS = float(os.getenv("CHAT_TYPING_TIMEOUT_SECONDS", "5"))
+
+
+class _TypingState:
+    __slots__ = ("user_id", "last_emit", "expires_at")
+
+    def __init__(self, user_id: str, last_emit: float, expires_at: float):
+        self.user_id = user_id
+        self.last_emit = last_emit
+        self.expires_at = expires_at
+
+
+class TypingCoalescer:
+    """
+    Agrega os eventos de digitação por (sid, conversa).
+
+    O cliente envia um evento a cada tecla; a sala recebe no máximo um aviso de
+    "digitando" por intervalo enquanto houver atividade e um único aviso de
+    "parou de digitar" quando a atividade cessa, explicitamente (mensagem enviada,
+    desconexão) ou por expiração. A classe só decide o que emitir; quem emite é
+    o servidor do chat.
+    """
+
+    def __init__(
+        self,
+        interval: float = CHAT_TYPING_INTERVAL_SECONDS,
+        timeout: float = CHAT_TYPING_TIMEOUT_SECONDS
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self._states: Dict[Tuple[str, str], _TypingState] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def touch(self, sid: str, conversation_id: str, user_id: str, now: Optional[float] = None) -> bool:
+        """
+        Registra atividade de digitação.
+
+        Args:
+            sid: ID da sessão Socket.IO
+            conversation_id: ID da conversa
+            user_id: ID de quem está digitando
+            now: Instante atual (time.monotonic)
+
+        Returns:
+            True se um aviso de "digitando" deve ser emitido para a sala
+        """
+        now = time.monotonic() if now is None else now
+        key = (sid, conversation_id)
+        typing_state = self._states.get(key)
+
+        if typing_state is None:
+            self._states[key] = _TypingState(user_id, now, now + self.timeout)
+            return True
+
+        typing_state.expires_at = now + self.timeout
+        if now - typing_state.last_emit >= self.interval:
+            typing_state.last_emit = now
+            return True
+        return False
+
+    def stop(self, sid: str, conversation_id: str) -> Optional[str]:
+        """
+        Encerra a digitação de uma conexão em uma conversa.
+
+        Returns:
+            ID de quem digitava, se um aviso de "parou de digitar" deve ser emitido
+        """
+        typing_state = self._states.pop((sid, conversation_id), None)
+        return typing_state.user_id if typing_state else None
+
+    def drop_sid(self, sid: str) -> List[Tuple[str, str]]:
+        """
+        Encerra todas as digitações de uma conexão (desconexão).
+
+        Returns:
+            Lista de (conversation_id, user_id) que precisam do aviso de parada
+        """
+        keys = [key for key in self._states if key[0] == sid]
+        return [(key[1], self._states.pop(key).user_id) for key in keys]
+
+    def expire(self, now: Optional[float] = None) -> List[Tuple[str, str, str]]:
+        """
+        Remove as digitações sem atividade dentro do prazo.
+
+        Args:
+            now: Instante atual (time.monotonic)
+
+        Returns:
+            Lista de (sid, conversation_id, user_id) que precisam do aviso de parada
+        """
+        now = time.monotonic() if now is None else now
+        expired = [key for key, typing_state in self._states.items() if typing_state.expires_at <= now]
+        return [(sid, conversation_id, self._states.pop((sid, conversation_id)).user_id)
+                for sid, conversation_id in expired]
@@ -0,0 +1,163 @@
+import datetime
+import logging
+from typing import Any, Dict
+from urllib.parse import parse_qs
+
+try:
+    import msgpack
+except ImportError:  # Sem o pacote, todos os clientes recebem JSON
+    msgpack = None
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Formatos de transmissão dos eventos do chat
+WIRE_JSON = "json"
+WIRE_MSGPACK = "msgpack"
+
+# Códigos curtos dos campos no formato compacto (campos ausentes mantêm o nome)
+FIELD_CODES = {
+    "id": "i",
+    "temp_id": "ti",
+    "conversation_id": "c",
+    "patient_id": "p",
+    "user_id": "u",
+    "sender_type": "s",
+    "content": "m",
+    "encrypted": "e",
+    "read": "r",
+    "attachment_url": "a",
+    "attachment_type": "at",
+    "timestamp": "t",
+    "messages": "ms",
+    "total": "n",
+    "count": "k",
+    "has_more": "h",
+    "next_before_id": "nb",
+    "next_after_id": "na",
+    "last_id": "l",
+    "last_read_message_id": "lr",
+    "read_watermarks": "rw",
+    "by_conversation": "bc",
+    "status": "st",
+    "statuses": "ss",
+    "items": "it",
+    "next_cursor": "nc",
+    "last_message": "lm",
+    "last_activity": "la",
+    "unread": "un",
+    "patient_name": "pn",
+    "assigned_user_id": "au",
+    "preview": "pv",
+}
+
+# Campos de data/hora, transmitidos como milissegundos desde a época
+TIMESTAMP_FIELDS = {"timestamp", "created_at", "last_activity"}
+
+# Campos cujo valor é um dicionário indexado por dados (IDs), sem códigos nas chaves
+OPAQUE_KEY_FIELDS = {"by_conversation", "read_watermarks", "statuses"}
+
+
+def msgpack_available() -> bool:
+    """Indica se o formato MessagePack pode ser oferecido aos clientes."""
+    return msgpack is not None
+
+
+def negotiate(environ: Dict[str, Any]) -> str:
+    """
+    Escolhe o formato de transmissão pedido pelo cliente na conexão.
+
+    O cliente pede o formato compacto com `?format=msgpack` na URL ou com o
+    cabeçalho `X-Chat-Format: msgpack`; clientes antigos não pedem nada e
+    continuam recebendo JSON.
+
+    Args:
+        environ: Ambiente da conexão
+
+    Returns:
+        WIRE_MSGPACK ou WIRE_JSON
+    """
+    requested = environ.get("HTTP_X_CHAT_FORMAT", "")
+    if not requested:
+        query = parse_qs(environ.get("QUERY_STRING", ""))
+        requested = (query.get("format") or [""])[0]
+
+    if requested.lower() != WIRE_MSGPACK:
+        return WIRE_JSON
+
+    if not msgpack_available():
+        logger.warning("Cliente pediu MessagePack, mas o pacote msgpack não está instalado; usando JSON")
+        return WIRE_JSON
+
+    return WIRE_MSGPACK
+
+
+def room_for(room: str, wire_format: str) -> str:
+    """
+    Retorna a sala Socket.IO equivalente para um formato de transmissão.
+
+    Os clientes de cada formato ficam em salas separadas para que um evento seja
+    codificado uma única vez por formato, e não uma vez por cliente.
+    """
+    if wire_format == WIRE_MSGPACK:
+        return f"{room}#{WIRE_MSGPACK}"
+    return room
+
+
+def _epoch_ms(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if isinstance(value, datetime.datetime):
+        return int(value.timestamp() * 1000)
+    return value
+
+
+def compact(value: Any, opaque_keys: bool = False) -> Any:
+    """
+    Converte um payload para o formato compacto: códigos curtos nos campos
+    conhecidos e datas como inteiros (milissegundos desde a época).
+
+    Args:
+        value: Payload do evento
+        opaque_keys: Não codificar as chaves deste nível (dicionários indexados por ID)
+
+    Returns:
+        Payload compacto
+    """
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if opaque_keys:
+                result[key] = compact(item)
+            elif key in TIMESTAMP_FIELDS:
+                result[FIELD_CODES.get(key, key)] = _epoch_ms(item)
+            else:
+                result[FIELD_CODES.get(key, key)] = compact(item, key in OPAQUE_KEY_FIELDS)
+        return result
+
+    if isinstance(value, (list, tuple)):
+        return [compact(item) for item in value]
+
+    if isinstance(value, datetime.datetime):
+        return _epoch_ms(value)
+
+    return value
+
+
+def encode(payload: Any, wire_format: str) -> Any:
+    """
+    Codifica o payload de um evento no formato do cliente.
+
+    Args:
+        payload: Payload do evento (dicionário em JSON)
+        wire_format: WIRE_JSON ou WIRE_MSGPACK
+
+    Returns:
+        O próprio payload (JSON) ou bytes MessagePack, enviados como anexo binário
+    """
+    if wire_format == WIRE_MSGPACK:
+        return msgpack.packb(compact(payload), use_bin_type=True)
+    return payload
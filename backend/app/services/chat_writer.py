@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, func, insert, update
+
+from app.models import Conversation, Message
+from app.services.chat_reads import OTHER_SIDE, increment_unread
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Gravação em lote: intervalo máximo entre gravações e tamanho máximo do lote
+CHAT_FLUSH_INTERVAL_MS = int(os.getenv("CHAT_FLUSH_INTERVAL_MS", "50"))
+CHAT_FLUSH_MAX_BATCH = int(os.getenv("CHAT_FLUSH_MAX_BATCH", "200"))
+
+# Tentativas de gravação de um lote antes de descartá-lo
+CHAT_FLUSH_MAX_ATTEMPTS = 3
+
+# Colunas de Message gravadas a partir dos dados da mensagem
+MESSAGE_COLUMNS = (
+    "conversation_id", "patient_id", "user_id", "sender_type", "content",
+    "encrypted", "attachment_url", "attachment_type",
+)
+
+# Tamanho máximo das colunas de texto limitadas de Message
+ATTACHMENT_URL_MAX = Message.__table__.c.attachment_url.type.length
+ATTACHMENT_TYPE_MAX = Message.__table__.c.attachment_type.type.length
+
+# Atualiza a última mensagem da conversa (executado uma vez por conversa do lote);
+# ID e data vêm sempre da mesma mensagem, pois formam a chave usada na caixa de entrada
+conversations_table = Conversation.__table__
+_is_newer = bindparam("b_message_id") > func.coalesce(conversations_table.c.last_message_id, 0)
+_touch_conversation = (
+    update(conversations_table)
+    .where(conversations_table.c.id == bindparam("b_id"))
+    .values(
+        last_message_at=case((_is_newer, bindparam("b_at")), else_=conversations_table.c.last_message_at),
+        last_message_id=case((_is_newer, bindparam("b_message_id")), else_=conversations_table.c.last_message_id)
+    )
+)
+
+# Chamado após gravar um lote: lista de {message, id, created_at} com o ID definitivo
+PersistedCallback = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+# Chamado com as mensagens descartadas após esgotar as tentativas
+FailedCallback = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+def validate_message(message_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Confere se uma mensagem pode ser gravada, antes de enfileirá-la.
+
+    Uma linha inválida faria falhar o INSERT de todo o lote, junto com as
+    mensagens das demais conversas.
+
+    Args:
+        message_data: Dados da mensagem (colunas de MESSAGE_COLUMNS)
+
+    Returns:
+        Mensagem de erro, ou None se a mensagem é válida
+    """
+    if not isinstance(message_data.get("content"), str):
+        return "Conteúdo da mensagem inválido"
+    if not isinstance(message_data.get("encrypted", True), bool):
+        return "Campo encrypted inválido"
+    if not isinstance(message_data.get("patient_id"), int):
+        return "Paciente da mensagem inválido"
+    if message_data.get("user_id") is not None and not isinstance(message_data["user_id"], int):
+        return "Usuário da mensagem inválido"
+
+    attachment_url = message_data.get("attachment_url")
+    if attachment_url is not None and (not isinstance(attachment_url, str) or len(attachment_url) > ATTACHMENT_URL_MAX):
+        return "URL do anexo inválida"
+    attachment_type = message_data.get("attachment_type")
+    if attachment_type is not None and (not isinstance(attachment_type, str) or len(attachment_type) > ATTACHMENT_TYPE_MAX):
+        return "Tipo do anexo inválido"
+
+    return None
+
+
+class ChatMessageWriter:
+    """
+    Fila de gravação posterior (write-behind) das mensagens do chat.
+
+    As mensagens são repassadas aos clientes imediatamente com um ID temporário e
+    gravadas em lote a cada CHAT_FLUSH_INTERVAL_MS ou quando o lote atinge
+    CHAT_FLUSH_MAX_BATCH, com um único INSERT de várias linhas por transação. Os
+    IDs definitivos voltam pelo RETURNING e são entregues a `on_persisted`.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        on_persisted: Optional[PersistedCallback] = None,
+        on_failed: Optional[FailedCallback] = None,
+        flush_interval_ms: int = CHAT_FLUSH_INTERVAL_MS,
+        max_batch: int = CHAT_FLUSH_MAX_BATCH
+    ):
+        self.session_factory = session_factory
+        self.on_persisted = on_persisted
+        self.on_failed = on_failed
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self._buffer: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Número de mensagens aguardando gravação."""
+        return len(self._buffer)
+
+    def start(self) -> None:
+        """Inicia a tarefa de gravação periódica."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Interrompe a tarefa periódica e grava o que restou na fila."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Cada falha consome uma tentativa, então o laço termina
+        while self._buffer:
+            await self.flush()
+
+    def submit(self, message_data: Dict[str, Any]) -> None:
+        """
+        Enfileira uma mensagem para gravação.
+
+        Args:
+            message_data: Dados da mensagem, incluindo o ID temporário em `id`
+        """
+        message_data.setdefault("_attempts", 0)
+        self._buffer.append(message_data)
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # Uma falha inesperada não pode encerrar a tarefa de gravação
+                logger.error(f"Erro na tarefa de gravação das mensagens: {e}")
+
+    async def flush(self) -> bool:
+        """
+        Grava um lote da fila.
+
+        Returns:
+            True se todo o lote foi gravado (ou a fila estava vazia)
+        """
+        async with self._flush_lock:
+            if not self._buffer:
+                return True
+
+            batch = self._buffer[:self.max_batch]
+            del self._buffer[:self.max_batch]
+            size = len(batch)
+
+            try:
+                persisted = await self._write(batch)
+            except Exception as e:
+                logger.error(f"Erro ao gravar lote de {len(batch)} mensagens: {e}")
+                if len(batch) == 1:
+                    await self._retry_or_fail(batch)
+                    return False
+                # Regravar uma a uma, para que uma linha inválida não derrube as demais
+                persisted, batch = await self._write_each(batch)
+                if not batch:
+                    return False
+
+            acks = []
+            for message, row in zip(batch, persisted):
+                message.pop("_attempts", None)
+                acks.append({"message": message, "id": row.id, "created_at": row.created_at})
+
+            logger.debug(f"Lote de {len(acks)} mensagens gravado")
+
+            if self.on_persisted:
+                try:
+                    await self.on_persisted(acks)
+                except Exception as e:
+                    logger.error(f"Erro ao confirmar mensagens gravadas: {e}")
+
+            return len(acks) == size
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Grava um lote em uma transação.
+
+        Returns:
+            Linhas (id, created_at) na ordem do lote
+        """
+        rows = [{column: message.get(column) for column in MESSAGE_COLUMNS} for message in batch]
+        for row in rows:
+            row["conversation_id"] = uuid.UUID(str(row["conversation_id"]))
+            if row["encrypted"] is None:
+                row["encrypted"] = True
+
+        async with self.session_factory() as session:
+            stmt = insert(Message).returning(
+                Message.id, Message.created_at, sort_by_parameter_order=True
+            )
+            result = await session.execute(stmt, rows)
+            persisted = result.all()
+
+            # Última mensagem e novas não lidas de cada conversa do lote, na mesma transação
+            latest: Dict[Any, Any] = {}
+            unread: Dict[Tuple[uuid.UUID, str], int] = {}
+            for row, values in zip(persisted, rows):
+                latest[values["conversation_id"]] = row
+                recipient = OTHER_SIDE.get(values["sender_type"])
+                if recipient:
+                    key = (values["conversation_id"], recipient)
+                    unread[key] = unread.get(key, 0) + 1
+            await session.execute(
+                _touch_conversation,
+                [
+                    {"b_id": conversation_id, "b_at": row.created_at, "b_message_id": row.id}
+                    for conversation_id, row in latest.items()
+                ]
+            )
+            await increment_unread(session, unread)
+            await session.commit()
+
+        return persisted
+
+    async def _write_each(self, batch: List[Dict[str, Any]]) -> Tuple[List[Any], List[Dict[str, Any]]]:
+        """
+        Grava as mensagens de um lote que falhou, cada uma em sua transação.
+
+        Returns:
+            Linhas gravadas e as mensagens correspondentes, na ordem do lote
+        """
+        persisted = []
+        written = []
+        failed = []
+        for message in batch:
+            try:
+                persisted.extend(await self._write([message]))
+                written.append(message)
+            except Exception as e:
+                logger.error(f"Erro ao gravar a mensagem {message.get('id')}: {e}")
+                failed.append(message)
+
+        if failed:
+            await self._retry_or_fail(failed)
+        return persisted, written
+
+    async def _retry_or_fail(self, messages: List[Dict[str, Any]]) -> None:
+        """Devolve as mensagens à fila ou as descarta após esgotar as tentativas."""
+        retry = []
+        failed = []
+        for message in messages:
+            message["_attempts"] += 1
+            (retry if message["_attempts"] < CHAT_FLUSH_MAX_ATTEMPTS else failed).append(message)
+
+        # Devolver ao início da fila, preservando a ordem das mensagens
+        self._buffer[:0] = retry
+        if failed and self.on_failed:
+            try:
+                await self.on_failed(failed)
+            except Exception as e:
+                logger.error(f"Erro ao notificar mensagens descartadas: {e}")
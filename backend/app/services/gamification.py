@@ -5,7 +5,7 @@ from sqlalchemy import func, select, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Patient, Presence, Absence, Badge, PatientBadge
-from app.services.notifications import send_patient_notification
+from app.services.notification_coalescer import queue_patient_notification
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -262,8 +262,8 @@ class GamificationService:
                 title = f"Nova conquista: {badge.name}"
                 message = message or badge.description or "Parabéns por sua nova conquista!"
                 
-                await send_patient_notification(
-                    db, 
+                # Badges costumam sair em rajadas (job noturno): agrupar em resumo
+                await queue_patient_notification(
                     patient_id, 
                     title, 
                     message, 
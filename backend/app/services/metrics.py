@@ -0,0 +1,113 @@
+import logging
+import time
+from typing import Callable, Optional
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Faixas dos histogramas (em segundos)
+DELIVERY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+PROVIDER_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# ====== Notificações ======
+NOTIFICATIONS_ENQUEUED = Counter(
+    "ceriv_notifications_enqueued_total",
+    "Notificações aceitas para entrega",
+    ["notification_type"],
+)
+NOTIFICATION_DELIVERIES = Counter(
+    "ceriv_notification_deliveries_total",
+    "Entregas por canal, tipo e resultado",
+    ["channel", "notification_type", "status"],
+)
+NOTIFICATION_FAILURES = Counter(
+    "ceriv_notification_failures_total",
+    "Falhas de entrega por canal, tipo e motivo",
+    ["channel", "notification_type", "reason"],
+)
+NOTIFICATION_DELIVERY_SECONDS = Histogram(
+    "ceriv_notification_delivery_seconds",
+    "Tempo entre a notificação ser aceita e ser entregue ao provedor",
+    ["channel", "notification_type"],
+    buckets=DELIVERY_BUCKETS,
+)
+PROVIDER_LATENCY_SECONDS = Histogram(
+    "ceriv_notification_provider_latency_seconds",
+    "Latência de cada chamada ao provedor (FCM, SendGrid)",
+    ["channel", "outcome"],
+    buckets=PROVIDER_BUCKETS,
+)
+NOTIFICATION_QUEUE_DEPTH = Gauge(
+    "ceriv_notification_queue_depth",
+    "Notificações aguardando entrega por fila",
+    ["queue"],
+)
+
+
+def record_delivery(
+    channel: str,
+    notification_type: str,
+    enqueued_at: Optional[float],
+    failure_reason: Optional[str] = None
+) -> None:
+    """
+    Registra o resultado de uma entrega.
+
+    Args:
+        channel: Canal de entrega (push, email)
+        notification_type: Tipo de notificação
+        enqueued_at: Instante (time.monotonic) em que a notificação foi aceita
+        failure_reason: Motivo da falha, ou None se a entrega foi bem-sucedida
+    """
+    if failure_reason:
+        NOTIFICATION_DELIVERIES.labels(channel, notification_type, "failed").inc()
+        NOTIFICATION_FAILURES.labels(channel, notification_type, failure_reason).inc()
+        return
+
+    NOTIFICATION_DELIVERIES.labels(channel, notification_type, "sent").inc()
+    if enqueued_at is not None:
+        NOTIFICATION_DELIVERY_SECONDS.labels(channel, notification_type).observe(
+            time.monotonic() - enqueued_at
+        )
+
+
+def provider_observer(channel: str) -> Callable[[str, float], None]:
+    """
+    Cria o observador de latência de um canal de entrega (ver ResilientChannel).
+
+    Args:
+        channel: Canal de entrega (push, email)
+
+    Returns:
+        Função que recebe o resultado da tentativa e sua duração
+    """
+    def observe(outcome: str, seconds: float) -> None:
+        PROVIDER_LATENCY_SECONDS.labels(channel, outcome).observe(seconds)
+
+    return observe
+
+
+def start_metrics_server(port: int) -> bool:
+    """
+    Expõe as métricas do processo na porta interna informada.
+
+    Com vários workers no mesmo host (uvicorn --workers, gunicorn) ou o app
+    iniciado mais de uma vez no mesmo processo, só o primeiro consegue a porta;
+    os demais registram o aviso e seguem sem exportador próprio.
+
+    Args:
+        port: Porta do servidor HTTP de métricas
+
+    Returns:
+        True se o servidor foi iniciado
+    """
+    try:
+        start_http_server(port)
+    except OSError as e:
+        logger.warning(f"Métricas não expostas na porta {port}: {e}")
+        return False
+
+    logger.info(f"Métricas expostas na porta {port}")
+    return True
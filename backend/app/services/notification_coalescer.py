@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from app.database import SessionLocal
+from app.services.metrics import NOTIFICATIONS_ENQUEUED, NOTIFICATION_QUEUE_DEPTH
+from app.services.notifications import NotificationService
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Janela de agrupamento (em segundos); 0 desativa o agrupamento
+COALESCE_WINDOW_SECONDS = float(os.getenv("NOTIFICATION_COALESCE_WINDOW_SECONDS", "120"))
+
+# Chave de agrupamento: (user_id, patient_id, notification_type)
+BufferKey = Tuple[Optional[int], Optional[int], str]
+
+
+class NotificationCoalescer:
+    """
+    Agrupa a entrega de notificações por destinatário e tipo durante uma janela de tempo.
+
+    Cada notificação é gravada (com o contador de não lidas) assim que aceita,
+    então a lista no app não espera a janela e nada se perde se o processo cair.
+    Só o push/email é retido: ao final da janela o lote é entregue como um
+    único resumo, reduzindo chamadas aos provedores em rajadas (job noturno de
+    badges, detecção de faltas, etc.).
+    """
+
+    def __init__(self, session_factory=SessionLocal, window_seconds: float = COALESCE_WINDOW_SECONDS):
+        self.session_factory = session_factory
+        self.window_seconds = window_seconds
+        self._buffers: Dict[BufferKey, List[Dict[str, Any]]] = {}
+        self._channels: Dict[BufferKey, Dict[str, bool]] = {}
+        self._timers: Dict[BufferKey, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Número de notificações com a entrega aguardando o fim da janela."""
+        return sum(len(items) for items in self._buffers.values())
+
+    async def enqueue(
+        self,
+        title: str,
+        message: str,
+        notification_type: str,
+        data: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
+        patient_id: Optional[int] = None,
+        send_push: bool = True,
+        send_email: bool = True
+    ) -> None:
+        """
+        Grava uma notificação e adiciona sua entrega ao buffer do destinatário.
+
+        Args:
+            title: Título da notificação
+            message: Mensagem da notificação
+            notification_type: Tipo de notificação (appointment, absence, badge, system)
+            data: Dados adicionais para a notificação
+            user_id: ID do usuário (se destinado a um usuário)
+            patient_id: ID do paciente (se destinado a um paciente)
+            send_push: Se deve enviar notificação push
+            send_email: Se deve enviar email
+        """
+        if not user_id and not patient_id:
+            logger.error("Erro ao enfileirar notificação: user_id ou patient_id devem ser fornecidos")
+            return
+
+        # Agrupamento desativado: enviar imediatamente
+        if self.window_seconds <= 0:
+            async with self.session_factory() as db:
+                await NotificationService.send_notification(
+                    db, title, message, notification_type, data, user_id, patient_id, send_push, send_email
+                )
+            return
+
+        NOTIFICATIONS_ENQUEUED.labels(notification_type).inc()
+
+        item = {"title": title, "message": message, "data": data, "enqueued_at": time.monotonic()}
+        try:
+            async with self.session_factory() as db:
+                notifications = await NotificationService.create_notifications(
+                    db, notification_type, [item], user_id=user_id, patient_id=patient_id
+                )
+        except Exception as e:
+            logger.error(f"Erro ao gravar notificação '{notification_type}': {e}")
+            return
+        item["notification_id"] = notifications[0].id
+
+        key = (user_id, patient_id, notification_type)
+        self._buffers.setdefault(key, []).append(item)
+
+        # O resumo usa um canal se qualquer notificação do lote o solicitou
+        channels = self._channels.setdefault(key, {"send_push": False, "send_email": False})
+        channels["send_push"] = channels["send_push"] or send_push
+        channels["send_email"] = channels["send_email"] or send_email
+
+        if key not in self._timers:
+            loop = asyncio.get_running_loop()
+            self._timers[key] = loop.call_later(self.window_seconds, self._schedule_flush, key)
+
+    def _schedule_flush(self, key: BufferKey) -> None:
+        """Dispara o envio do lote ao fim da janela, mantendo referência à tarefa."""
+        task = asyncio.ensure_future(self.flush(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self, key: BufferKey) -> None:
+        """
+        Entrega o resumo do lote acumulado de um destinatário e tipo.
+
+        Args:
+            key: Chave (user_id, patient_id, notification_type)
+        """
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+        items = self._buffers.pop(key, None)
+        channels = self._channels.pop(key, {"send_push": True, "send_email": True})
+        if not items:
+            return
+
+        user_id, patient_id, notification_type = key
+        try:
+            async with self.session_factory() as db:
+                await NotificationService.send_digest(
+                    db,
+                    notification_type,
+                    items,
+                    user_id=user_id,
+                    patient_id=patient_id,
+                    send_push=channels["send_push"],
+                    send_email=channels["send_email"],
+                    enqueued_at=min(item["enqueued_at"] for item in items)
+                )
+        except Exception as e:
+            logger.error(f"Erro ao enviar lote de notificações {key}: {e}")
+
+    async def flush_all(self) -> None:
+        """Entrega todos os lotes pendentes (usado ao desligar o processo)."""
+        for key in list(self._buffers.keys()):
+            await self.flush(key)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Instância compartilhada pelo processo
+coalescer = NotificationCoalescer()
+NOTIFICATION_QUEUE_DEPTH.labels("coalescer").set_function(lambda: coalescer.pending)
+
+
+# Funções de conveniência para uso direto
+async def queue_notification(
+    title: str,
+    message: str,
+    notification_type: str,
+    data: Optional[Dict[str, Any]] = None,
+    user_id: Optional[int] = None,
+    patient_id: Optional[int] = None,
+    send_push: bool = True,
+    send_email: bool = True
+) -> None:
+    """Wrapper para enfileirar uma notificação no modo resumo."""
+    await coalescer.enqueue(
+        title, message, notification_type, data, user_id, patient_id, send_push, send_email
+    )
+
+
+async def queue_patient_notification(
+    patient_id: int,
+    title: str,
+    message: str,
+    notification_type: str,
+    data: Optional[Dict[str, Any]] = None,
+    send_push: bool = True,
+    send_email: bool = True
+) -> None:
+    """Wrapper para enfileirar uma notificação de paciente no modo resumo."""
+    await coalescer.enqueue(
+        title, message, notification_type, data, None, patient_id, send_push, send_email
+    )
@@ -0,0 +1,232 @@
+import logging
+import os
+import time
+from datetime import datetime, time as dt_time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Patient, User, NotificationPreference
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Validade das preferências e contatos em cache (segundos)
+PREFERENCE_CACHE_TTL_SECONDS = float(os.getenv("NOTIFICATION_PREFERENCE_CACHE_TTL_SECONDS", "300"))
+
+DEFAULT_TIMEZONE = "America/Sao_Paulo"
+DEFAULT_LANGUAGE = "pt-BR"
+
+# Campos do paciente/usuário guardados no perfil em cache
+CONTACT_FIELDS = ("name", "email", "fcm_token")
+
+# Chave do cache: ("patient" | "user", id)
+RecipientKey = Tuple[str, int]
+
+
+class RecipientProfile:
+    """Contato e preferências de entrega de um destinatário."""
+
+    def __init__(
+        self,
+        name: str,
+        email: Optional[str],
+        fcm_token: Optional[str],
+        channels: Optional[Dict[str, Dict[str, bool]]] = None,
+        quiet_start: Optional[dt_time] = None,
+        quiet_end: Optional[dt_time] = None,
+        timezone: str = DEFAULT_TIMEZONE,
+        language: str = DEFAULT_LANGUAGE
+    ):
+        self.name = name
+        self.email = email
+        self.fcm_token = fcm_token
+        self.channels = channels or {}
+        self.quiet_start = quiet_start
+        self.quiet_end = quiet_end
+        self.timezone = timezone
+        self.language = language
+
+    def allows(self, channel: str, notification_type: str) -> bool:
+        """
+        Verifica se o destinatário aceita o canal para o tipo de notificação.
+
+        Sem preferência para o tipo, vale a chave "*"; sem nenhuma, o canal é aceito.
+
+        Args:
+            channel: "push" ou "email"
+            notification_type: Tipo de notificação
+
+        Returns:
+            True se o canal está habilitado
+        """
+        settings = self.channels.get(notification_type) or self.channels.get("*") or {}
+        return bool(settings.get(channel, True))
+
+    def quiet_until(self, now: datetime) -> Optional[datetime]:
+        """
+        Retorna o fim do horário de silêncio em curso.
+
+        Args:
+            now: Instante atual (com fuso horário)
+
+        Returns:
+            Instante em que o silêncio termina, ou None se não estiver em silêncio
+        """
+        if not self.quiet_start or not self.quiet_end or self.quiet_start == self.quiet_end:
+            return None
+
+        try:
+            zone = ZoneInfo(self.timezone)
+        except Exception:
+            zone = ZoneInfo(DEFAULT_TIMEZONE)
+
+        local = now.astimezone(zone)
+        current = local.time()
+
+        if self.quiet_start < self.quiet_end:
+            quiet = self.quiet_start <= current < self.quiet_end
+        else:
+            # Intervalo que atravessa a meia-noite (ex.: 22:00 às 07:00)
+            quiet = current >= self.quiet_start or current < self.quiet_end
+
+        if not quiet:
+            return None
+
+        end = local.replace(
+            hour=self.quiet_end.hour, minute=self.quiet_end.minute, second=0, microsecond=0
+        )
+        if end <= local:
+            end += timedelta(days=1)
+        return end
+
+
+class PreferenceCache:
+    """
+    Cache com validade (TTL) de contatos e preferências de entrega.
+
+    Paciente/usuário e preferências são lidos em uma única consulta por tipo de
+    destinatário, para vários IDs de uma vez, e reutilizados pelos envios de
+    push e email seguintes.
+    """
+
+    def __init__(self, ttl_seconds: float = PREFERENCE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[RecipientKey, Tuple[float, Optional[RecipientProfile]]] = {}
+
+    def _cached(self, key: RecipientKey, now: float) -> Tuple[bool, Optional[RecipientProfile]]:
+        entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            return True, entry[1]
+        return False, None
+
+    async def load(
+        self,
+        db: AsyncSession,
+        patient_ids: Iterable[int] = (),
+        user_ids: Iterable[int] = ()
+    ) -> Dict[RecipientKey, Optional[RecipientProfile]]:
+        """
+        Retorna os perfis dos destinatários, consultando o banco apenas para os ausentes ou expirados.
+
+        Args:
+            db: Sessão do banco de dados
+            patient_ids: IDs de pacientes
+            user_ids: IDs de usuários
+
+        Returns:
+            Dicionário de (tipo, id) para o perfil (None se o destinatário não existe)
+        """
+        now = time.monotonic()
+        profiles: Dict[RecipientKey, Optional[RecipientProfile]] = {}
+        missing: Dict[str, set] = {"patient": set(), "user": set()}
+
+        for kind, ids in (("patient", patient_ids), ("user", user_ids)):
+            for recipient_id in ids:
+                hit, profile = self._cached((kind, recipient_id), now)
+                if hit:
+                    profiles[(kind, recipient_id)] = profile
+                else:
+                    missing[kind].add(recipient_id)
+
+        for kind, model, column in (
+            ("patient", Patient, NotificationPreference.patient_id),
+            ("user", User, NotificationPreference.user_id),
+        ):
+            if not missing[kind]:
+                continue
+
+            query = (
+                select(model.id, model.name, model.email, model.fcm_token, NotificationPreference)
+                .outerjoin(NotificationPreference, column == model.id)
+                .where(model.id.in_(missing[kind]))
+            )
+            result = await db.execute(query)
+
+            found = {}
+            for row in result.all():
+                preference = row.NotificationPreference
+                found[row.id] = RecipientProfile(
+                    row.name,
+                    row.email,
+                    row.fcm_token,
+                    preference.channels if preference else None,
+                    preference.quiet_start if preference else None,
+                    preference.quiet_end if preference else None,
+                    preference.timezone if preference else DEFAULT_TIMEZONE,
+                    preference.language if preference else DEFAULT_LANGUAGE,
+                )
+
+            expires_at = now + self.ttl_seconds
+            for recipient_id in missing[kind]:
+                profile = found.get(recipient_id)
+                self._entries[(kind, recipient_id)] = (expires_at, profile)
+                profiles[(kind, recipient_id)] = profile
+
+        self._prune(now)
+        return profiles
+
+    async def get(self, db: AsyncSession, kind: str, recipient_id: int) -> Optional[RecipientProfile]:
+        """
+        Retorna o perfil de um destinatário.
+
+        Args:
+            db: Sessão do banco de dados
+            kind: "patient" ou "user"
+            recipient_id: ID do paciente ou usuário
+
+        Returns:
+            Perfil do destinatário ou None se não existir
+        """
+        if kind == "patient":
+            profiles = await self.load(db, patient_ids=[recipient_id])
+        else:
+            profiles = await self.load(db, user_ids=[recipient_id])
+        return profiles.get((kind, recipient_id))
+
+    def invalidate(self, kind: str, recipient_id: int) -> None:
+        """Descarta o perfil em cache (após alterar preferências, email ou token)."""
+        self._entries.pop((kind, recipient_id), None)
+
+    def _prune(self, now: float) -> None:
+        """Remove as entradas expiradas quando o cache cresce."""
+        if len(self._entries) < 10000:
+            return
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+
+
+# Cache do processo
+preference_cache = PreferenceCache()
+
+
+@event.listens_for(Patient, "after_update")
+@event.listens_for(User, "after_update")
+def _invalidate_contact(mapper, connection, target) -> None:
+    """Descarta o perfil em cache quando o email ou o token FCM do destinatário é gravado."""
+    attrs = inspect(target).attrs
+    if any(attrs[field].history.has_changes() for field in CONTACT_FIELDS):
+        kind = "patient" if isinstance(target, Patient) else "user"
+        preference_cache.invalidate(kind, target.id)
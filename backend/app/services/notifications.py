@@ -1,17 +1,26 @@
+import base64
 import logging
 import os
 import json
-from typing import Dict, Any, List, Optional, Union
-from datetime import datetime
+import time
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple, Union
+from datetime import datetime, timezone
 
 import firebase_admin
 from firebase_admin import credentials, messaging
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Content, Email
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, func, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
-from app.models import Patient, User, Notification
+from app.models import Notification, NotificationCounter, NotificationPreference, ScheduledNotification
+from app.services.metrics import (
+    NOTIFICATIONS_ENQUEUED, NOTIFICATION_QUEUE_DEPTH, provider_observer, record_delivery
+)
+from app.services.notification_preferences import DEFAULT_LANGUAGE, RecipientProfile, preference_cache
+from app.services.resilience import CircuitOpenError, ResilientChannel
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -27,6 +36,134 @@ try:
 except Exception as e:
     logger.error(f"Erro ao inicializar Firebase: {e}")
 
+# Status HTTP e códigos do Firebase que indicam falha transitória do provedor
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_FIREBASE_CODES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "INTERNAL", "DEADLINE_EXCEEDED", "UNKNOWN"}
+
+
+def _classify_provider_error(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    Classifica um erro do FCM ou do SendGrid.
+    
+    Args:
+        exc: Exceção lançada pelo SDK do provedor
+        
+    Returns:
+        Tupla (se deve tentar novamente, segundos de Retry-After)
+    """
+    status_code = getattr(exc, "status_code", None)
+    headers = getattr(exc, "headers", None)
+    
+    # Erros do firebase_admin expõem a resposta HTTP original
+    http_response = getattr(exc, "http_response", None)
+    if http_response is not None:
+        status_code = status_code or http_response.status_code
+        headers = http_response.headers
+    
+    retry_after = None
+    if headers:
+        value = headers.get("Retry-After")
+        if value and str(value).isdigit():
+            retry_after = float(value)
+    
+    retryable = (
+        status_code in RETRYABLE_STATUS_CODES
+        or getattr(exc, "code", None) in RETRYABLE_FIREBASE_CODES
+        or isinstance(exc, (ConnectionError, TimeoutError))
+    )
+    return retryable, retry_after
+
+
+def _failure_reason(exc: BaseException) -> str:
+    """
+    Resume um erro de entrega em um rótulo de baixa cardinalidade para as métricas.
+    
+    Args:
+        exc: Exceção lançada na entrega
+        
+    Returns:
+        Motivo da falha (ex.: circuit_open, throttled, http_500, unregistered)
+    """
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    
+    code = getattr(exc, "code", None)
+    if isinstance(code, str):
+        return code.lower()
+    
+    status_code = getattr(exc, "status_code", None)
+    http_response = getattr(exc, "http_response", None)
+    if status_code is None and http_response is not None:
+        status_code = http_response.status_code
+    if status_code:
+        return "throttled" if status_code == 429 else f"http_{status_code}"
+    
+    return type(exc).__name__
+
+
+def as_utc(value: datetime) -> datetime:
+    """Garante fuso horário em uma data; datas sem fuso são tratadas como UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+# Canais de entrega com limite de taxa, novas tentativas e disjuntor
+push_channel = ResilientChannel(
+    "push",
+    rate_per_second=float(os.getenv("FCM_RATE_LIMIT_PER_SECOND", "100")),
+    max_retries=int(os.getenv("NOTIFICATION_MAX_RETRIES", "3")),
+    classify=_classify_provider_error,
+    observer=provider_observer("push"),
+)
+email_channel = ResilientChannel(
+    "email",
+    rate_per_second=float(os.getenv("SENDGRID_RATE_LIMIT_PER_SECOND", "50")),
+    max_retries=int(os.getenv("NOTIFICATION_MAX_RETRIES", "3")),
+    classify=_classify_provider_error,
+    observer=provider_observer("email"),
+)
+
+# Chamadas em andamento (aguardando limite de taxa, novas tentativas ou o provedor)
+NOTIFICATION_QUEUE_DEPTH.labels("push").set_function(lambda: push_channel.in_flight)
+NOTIFICATION_QUEUE_DEPTH.labels("email").set_function(lambda: email_channel.in_flight)
+
+# Cliente SendGrid reutilizado entre envios (mantém a conexão HTTP)
+_sendgrid_client: Optional[SendGridAPIClient] = None
+
+
+def _get_sendgrid_client() -> Optional[SendGridAPIClient]:
+    """Retorna o cliente SendGrid do processo, criando-o na primeira chamada."""
+    global _sendgrid_client
+    
+    if _sendgrid_client is None:
+        sg_api_key = os.getenv("SENDGRID_API_KEY")
+        if not sg_api_key:
+            return None
+        _sendgrid_client = SendGridAPIClient(
+            sg_api_key, host=os.getenv("SENDGRID_API_HOST", "https://api.sendgrid.com")
+        )
+    
+    return _sendgrid_client
+
+
+# Texto fixo do email por idioma (a mensagem em si vem pronta de quem envia)
+EMAIL_STRINGS = {
+    "pt-BR": {
+        "greeting": "Olá",
+        "signature": "Atenciosamente,<br>Equipe do CER IV",
+        "automatic": "Esta é uma mensagem automática. Por favor, não responda a este email.",
+    },
+    "en": {
+        "greeting": "Hello",
+        "signature": "Best regards,<br>CER IV Team",
+        "automatic": "This is an automated message. Please do not reply to this email.",
+    },
+    "es": {
+        "greeting": "Hola",
+        "signature": "Atentamente,<br>Equipo del CER IV",
+        "automatic": "Este es un mensaje automático. Por favor, no responda a este correo.",
+    },
+}
+
 
 class NotificationService:
     """Serviço para envio de notificações (push, email e banco de dados)."""
@@ -41,7 +178,8 @@ class NotificationService:
         user_id: Optional[int] = None,
         patient_id: Optional[int] = None,
         send_push: bool = True,
-        send_email: bool = True
+        send_email: bool = True,
+        send_at: Optional[datetime] = None
     ) -> Optional[Notification]:
         """
         Envia uma notificação para um usuário ou paciente.
@@ -56,16 +194,30 @@ class NotificationService:
             patient_id: ID do paciente (se destinado a um paciente)
             send_push: Se deve enviar notificação push
             send_email: Se deve enviar email
+            send_at: Instante de envio; se estiver no futuro, a notificação é agendada
             
         Returns:
-            Objeto de notificação criado ou None em caso de erro
+            Objeto de notificação criado, ou None em caso de erro ou quando agendada
         """
+        if send_at:
+            send_at = as_utc(send_at)
+        if send_at and send_at > datetime.now(timezone.utc):
+            await NotificationService.schedule_notification(
+                db, title, message, notification_type, send_at, data, user_id, patient_id,
+                send_push, send_email
+            )
+            return None
+        
+        enqueued_at = time.monotonic()
+        
         try:
             # Validar parâmetros
             if not user_id and not patient_id:
                 logger.error("Erro ao enviar notificação: user_id ou patient_id devem ser fornecidos")
                 return None
             
+            NOTIFICATIONS_ENQUEUED.labels(notification_type).inc()
+            
             # Criar registro no banco de dados
             notification = Notification(
                 title=title,
@@ -77,22 +229,20 @@ class NotificationService:
             )
             
             db.add(notification)
+            
+            # Atualizar contadores de não lidas na mesma transação
+            if patient_id:
+                await db.execute(NotificationService._counter_upsert("patient_id", patient_id, 1))
+            if user_id:
+                await db.execute(NotificationService._counter_upsert("user_id", user_id, 1))
+            
             await db.commit()
             await db.refresh(notification)
             
-            # Enviar notificação push
-            if send_push:
-                if patient_id:
-                    await NotificationService._send_patient_push(db, patient_id, title, message, data)
-                if user_id:
-                    await NotificationService._send_user_push(db, user_id, title, message, data)
-            
-            # Enviar email
-            if send_email:
-                if patient_id:
-                    await NotificationService._send_patient_email(db, patient_id, title, message, notification_type)
-                if user_id:
-                    await NotificationService._send_user_email(db, user_id, title, message, notification_type)
+            await NotificationService._deliver(
+                db, title, message, notification_type, data, user_id, patient_id, send_push, send_email,
+                enqueued_at, notification.id
+            )
             
             logger.info(f"Notificação {notification.id} enviada com sucesso")
             return notification
@@ -102,90 +252,384 @@ class NotificationService:
             return None
 
     @staticmethod
-    async def _send_patient_push(
+    async def schedule_notification(
         db: AsyncSession,
-        patient_id: int, 
-        title: str, 
-        message: str, 
-        data: Optional[Dict[str, Any]] = None
-    ) -> bool:
+        title: str,
+        message: str,
+        notification_type: str,
+        send_at: datetime,
+        data: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
+        patient_id: Optional[int] = None,
+        send_push: bool = True,
+        send_email: bool = True,
+        notification_id: Optional[int] = None
+    ) -> Optional[ScheduledNotification]:
         """
-        Envia notificação push para um paciente.
+        Agenda uma notificação para envio futuro.
+        
+        A notificação é persistida em `scheduled_notifications` e disparada pelo
+        scheduler (ver app.services.scheduled_notifications).
         
         Args:
             db: Sessão do banco de dados
-            patient_id: ID do paciente
             title: Título da notificação
             message: Mensagem da notificação
+            notification_type: Tipo de notificação
+            send_at: Instante de envio (com fuso horário)
             data: Dados adicionais para a notificação
+            user_id: ID do usuário (se destinado a um usuário)
+            patient_id: ID do paciente (se destinado a um paciente)
+            send_push: Se deve enviar notificação push
+            send_email: Se deve enviar email
+            notification_id: Notificação já persistida cuja entrega está sendo adiada
             
         Returns:
-            True se a notificação foi enviada com sucesso
+            Notificação agendada ou None em caso de erro
         """
         try:
-            # Buscar o token FCM do paciente
-            query = select(Patient).where(Patient.id == patient_id)
-            result = await db.execute(query)
-            patient = result.scalars().first()
+            if not user_id and not patient_id:
+                logger.error("Erro ao agendar notificação: user_id ou patient_id devem ser fornecidos")
+                return None
+            
+            send_at = as_utc(send_at)
+            
+            scheduled = ScheduledNotification(
+                title=title,
+                message=message,
+                type=notification_type,
+                data=data,
+                user_id=user_id,
+                patient_id=patient_id,
+                send_push=send_push,
+                send_email=send_email,
+                send_at=send_at,
+                status="pending",
+                notification_id=notification_id
+            )
+            
+            db.add(scheduled)
+            await db.commit()
+            await db.refresh(scheduled)
             
-            if not patient or not patient.fcm_token:
-                logger.warning(f"Paciente {patient_id} não tem token FCM")
+            logger.info(f"Notificação {scheduled.id} agendada para {send_at.isoformat()}")
+            return scheduled
+            
+        except Exception as e:
+            logger.error(f"Erro ao agendar notificação: {e}")
+            return None
+
+    @staticmethod
+    async def cancel_scheduled_notification(db: AsyncSession, scheduled_id: int) -> bool:
+        """
+        Cancela uma notificação agendada que ainda não foi enviada.
+        
+        Args:
+            db: Sessão do banco de dados
+            scheduled_id: ID da notificação agendada
+            
+        Returns:
+            True se a notificação foi cancelada
+        """
+        try:
+            stmt = (
+                update(ScheduledNotification)
+                .where(ScheduledNotification.id == scheduled_id, ScheduledNotification.status == "pending")
+                .values(status="canceled")
+                .returning(ScheduledNotification.id)
+                .execution_options(synchronize_session=False)
+            )
+            canceled = await db.scalar(stmt)
+            await db.commit()
+            return canceled is not None
+            
+        except Exception as e:
+            logger.error(f"Erro ao cancelar notificação agendada: {e}")
+            return False
+
+    @staticmethod
+    async def get_preferences(
+        db: AsyncSession,
+        user_id: Optional[int] = None,
+        patient_id: Optional[int] = None
+    ) -> Optional[NotificationPreference]:
+        """
+        Retorna as preferências de entrega de um usuário ou paciente.
+        
+        Args:
+            db: Sessão do banco de dados
+            user_id: ID do usuário
+            patient_id: ID do paciente
+            
+        Returns:
+            Preferências gravadas ou None se o destinatário usa o padrão
+        """
+        if patient_id:
+            condition = NotificationPreference.patient_id == patient_id
+        else:
+            condition = NotificationPreference.user_id == user_id
+        
+        return await db.scalar(select(NotificationPreference).where(condition))
+
+    @staticmethod
+    async def update_preferences(
+        db: AsyncSession,
+        values: Dict[str, Any],
+        user_id: Optional[int] = None,
+        patient_id: Optional[int] = None
+    ) -> NotificationPreference:
+        """
+        Grava as preferências de entrega de um usuário ou paciente e descarta o cache.
+        
+        Args:
+            db: Sessão do banco de dados
+            values: Campos de NotificationPreference a gravar
+            user_id: ID do usuário
+            patient_id: ID do paciente
+            
+        Returns:
+            Preferências gravadas
+        """
+        column = "patient_id" if patient_id else "user_id"
+        recipient_id = patient_id or user_id
+        
+        stmt = (
+            pg_insert(NotificationPreference)
+            .values(**{column: recipient_id}, **values)
+            .on_conflict_do_update(index_elements=[column], set_={**values, "updated_at": func.now()})
+            .returning(NotificationPreference)
+        )
+        preference = await db.scalar(stmt)
+        await db.commit()
+        
+        preference_cache.invalidate("patient" if patient_id else "user", recipient_id)
+        return preference
+
+    @staticmethod
+    async def create_notifications(
+        db: AsyncSession,
+        notification_type: str,
+        items: List[Dict[str, Any]],
+        user_id: Optional[int] = None,
+        patient_id: Optional[int] = None
+    ) -> List[Notification]:
+        """
+        Persiste notificações do mesmo destinatário e tipo, sem entregá-las.
+        
+        As linhas são gravadas em um único INSERT, com o contador de não lidas na
+        mesma transação; a entrega por push/email fica a cargo de `send_digest`.
+        
+        Args:
+            db: Sessão do banco de dados
+            notification_type: Tipo de notificação comum ao lote
+            items: Lista de dicionários com title, message e data
+            user_id: ID do usuário (se destinado a um usuário)
+            patient_id: ID do paciente (se destinado a um paciente)
+            
+        Returns:
+            Lista de notificações criadas, na ordem dos itens
+        """
+        if not items or (not user_id and not patient_id):
+            return []
+        
+        rows = [
+            {
+                "title": item["title"],
+                "message": item["message"],
+                "type": notification_type,
+                "user_id": user_id,
+                "patient_id": patient_id,
+                "data": item.get("data"),
+            }
+            for item in items
+        ]
+        result = await db.scalars(
+            insert(Notification).returning(Notification, sort_by_parameter_order=True), rows
+        )
+        notifications = list(result.all())
+        
+        if patient_id:
+            await db.execute(NotificationService._counter_upsert("patient_id", patient_id, len(rows)))
+        if user_id:
+            await db.execute(NotificationService._counter_upsert("user_id", user_id, len(rows)))
+        
+        await db.commit()
+        return notifications
+
+    @staticmethod
+    async def send_digest(
+        db: AsyncSession,
+        notification_type: str,
+        items: List[Dict[str, Any]],
+        user_id: Optional[int] = None,
+        patient_id: Optional[int] = None,
+        send_push: bool = True,
+        send_email: bool = True,
+        enqueued_at: Optional[float] = None
+    ) -> bool:
+        """
+        Entrega um único push/email de resumo para notificações já persistidas.
+        
+        Cada item já tem sua linha em `notifications` (gravada por
+        `create_notifications` ao ser aceito); apenas a entrega é consolidada.
+        
+        Args:
+            db: Sessão do banco de dados
+            notification_type: Tipo de notificação comum ao lote
+            items: Lista de dicionários com title, message, data e notification_id
+            user_id: ID do usuário (se destinado a um usuário)
+            patient_id: ID do paciente (se destinado a um paciente)
+            send_push: Se deve enviar notificação push
+            send_email: Se deve enviar email
+            enqueued_at: Instante (time.monotonic) em que o item mais antigo do lote foi aceito
+            
+        Returns:
+            True se o resumo foi entregue (ou adiado pelas preferências)
+        """
+        try:
+            if not items or (not user_id and not patient_id):
                 return False
             
-            # Preparar mensagem
-            push_message = messaging.Message(
-                notification=messaging.Notification(
-                    title=title,
-                    body=message
-                ),
-                data={
-                    "type": data.get("type", "notification"),
-                    "timestamp": datetime.now().isoformat(),
-                    **{k: str(v) for k, v in (data or {}).items()}
-                },
-                token=patient.fcm_token,
+            if len(items) == 1:
+                title = items[0]["title"]
+                message = items[0]["message"]
+                data = items[0].get("data")
+                push_message = None
+            else:
+                title = f"Você tem {len(items)} novas notificações"
+                message = "<br>".join(f"<b>{item['title']}</b>: {item['message']}" for item in items)
+                data = {
+                    "type": "digest",
+                    "notification_type": notification_type,
+                    "count": len(items),
+                    "notification_ids": ",".join(str(item["notification_id"]) for item in items),
+                }
+                # O push não suporta HTML: resumir apenas pelos títulos
+                push_message = "; ".join(item["title"] for item in items)
+            
+            await NotificationService._deliver(
+                db, title, message, notification_type, data, user_id, patient_id, send_push, send_email,
+                enqueued_at, items[0]["notification_id"], push_message
             )
             
-            # Enviar notificação
-            response = messaging.send(push_message)
-            logger.info(f"Notificação push enviada para paciente {patient_id}: {response}")
+            logger.info(
+                f"Resumo de {len(items)} notificações '{notification_type}' enviado "
+                f"(paciente={patient_id}, usuário={user_id})"
+            )
             return True
             
         except Exception as e:
-            logger.error(f"Erro ao enviar notificação push para paciente {patient_id}: {e}")
+            logger.error(f"Erro ao enviar resumo de notificações: {e}")
             return False
 
     @staticmethod
-    async def _send_user_push(
+    async def _deliver(
         db: AsyncSession,
-        user_id: int, 
-        title: str, 
-        message: str, 
-        data: Optional[Dict[str, Any]] = None
-    ) -> bool:
+        title: str,
+        message: str,
+        notification_type: str,
+        data: Optional[Dict[str, Any]],
+        user_id: Optional[int],
+        patient_id: Optional[int],
+        send_push: bool,
+        send_email: bool,
+        enqueued_at: Optional[float] = None,
+        notification_id: Optional[int] = None,
+        push_message: Optional[str] = None
+    ) -> None:
         """
-        Envia notificação push para um usuário.
+        Entrega uma notificação já persistida pelos canais solicitados.
+        
+        Contato e preferências de cada destinatário vêm do cache (uma consulta por
+        envio no máximo). Os canais pedidos são filtrados pelas preferências do tipo,
+        e a entrega em horário de silêncio é reagendada para o fim do silêncio.
         
         Args:
             db: Sessão do banco de dados
+            title: Título da notificação
+            message: Mensagem da notificação
+            notification_type: Tipo de notificação
+            data: Dados adicionais para a notificação
             user_id: ID do usuário
+            patient_id: ID do paciente
+            send_push: Se deve enviar notificação push
+            send_email: Se deve enviar email
+            enqueued_at: Instante (time.monotonic) em que a notificação foi aceita
+            notification_id: ID da notificação persistida (usado ao adiar a entrega)
+            push_message: Texto do push, quando diferente da mensagem (resumo em HTML)
+        """
+        if not send_push and not send_email:
+            return
+        
+        profiles = await preference_cache.load(
+            db,
+            patient_ids=[patient_id] if patient_id else [],
+            user_ids=[user_id] if user_id else []
+        )
+        now = datetime.now(timezone.utc)
+        
+        for kind, recipient_id in (("patient", patient_id), ("user", user_id)):
+            if not recipient_id:
+                continue
+            
+            recipient = f"paciente {recipient_id}" if kind == "patient" else f"usuário {recipient_id}"
+            profile = profiles.get((kind, recipient_id))
+            if not profile:
+                logger.warning(f"Destinatário {recipient} não encontrado")
+                continue
+            
+            push = send_push and profile.allows("push", notification_type)
+            email = send_email and profile.allows("email", notification_type)
+            if not push and not email:
+                continue
+            
+            # Horário de silêncio: adiar a entrega em vez de descartá-la
+            quiet_end = profile.quiet_until(now)
+            if quiet_end:
+                await NotificationService.schedule_notification(
+                    db, title, message, notification_type, quiet_end, data,
+                    recipient_id if kind == "user" else None,
+                    recipient_id if kind == "patient" else None,
+                    push, email, notification_id
+                )
+                logger.info(f"Entrega para {recipient} adiada até {quiet_end.isoformat()} (horário de silêncio)")
+                continue
+            
+            if push:
+                await NotificationService._send_push(
+                    profile, title, push_message or message, data, notification_type, enqueued_at, recipient
+                )
+            if email:
+                await NotificationService._send_email(
+                    profile, title, message, notification_type, enqueued_at, recipient
+                )
+
+    @staticmethod
+    async def _push(
+        token: str,
+        title: str,
+        message: str,
+        data: Optional[Dict[str, Any]],
+        notification_type: str,
+        enqueued_at: Optional[float],
+        recipient: str
+    ) -> bool:
+        """
+        Envia uma notificação push para um token FCM e registra as métricas da entrega.
+        
+        Args:
+            token: Token FCM do dispositivo
             title: Título da notificação
             message: Mensagem da notificação
             data: Dados adicionais para a notificação
+            notification_type: Tipo de notificação
+            enqueued_at: Instante (time.monotonic) em que a notificação foi aceita
+            recipient: Descrição do destinatário para os logs
             
         Returns:
             True se a notificação foi enviada com sucesso
         """
         try:
-            # Buscar o token FCM do usuário
-            query = select(User).where(User.id == user_id)
-            result = await db.execute(query)
-            user = result.scalars().first()
-            
-            if not user or not user.fcm_token:
-                logger.warning(f"Usuário {user_id} não tem token FCM")
-                return False
-            
             # Preparar mensagem
             push_message = messaging.Message(
                 notification=messaging.Notification(
@@ -193,146 +637,157 @@ class NotificationService:
                     body=message
                 ),
                 data={
-                    "type": data.get("type", "notification"),
+                    "type": (data or {}).get("type", "notification"),
                     "timestamp": datetime.now().isoformat(),
                     **{k: str(v) for k, v in (data or {}).items()}
                 },
-                token=user.fcm_token,
+                token=token,
             )
             
             # Enviar notificação
-            response = messaging.send(push_message)
-            logger.info(f"Notificação push enviada para usuário {user_id}: {response}")
+            response = await push_channel.call(messaging.send, push_message)
+            record_delivery("push", notification_type, enqueued_at)
+            logger.info(f"Notificação push enviada para {recipient}: {response}")
             return True
             
         except Exception as e:
-            logger.error(f"Erro ao enviar notificação push para usuário {user_id}: {e}")
+            record_delivery("push", notification_type, enqueued_at, _failure_reason(e))
+            logger.error(f"Erro ao enviar notificação push para {recipient}: {e}")
             return False
 
     @staticmethod
-    async def _send_patient_email(
-        db: AsyncSession,
-        patient_id: int, 
-        title: str, 
-        message: str, 
-        notification_type: str
+    async def _email(
+        address: str,
+        recipient_name: str,
+        title: str,
+        message: str,
+        notification_type: str,
+        enqueued_at: Optional[float],
+        recipient: str,
+        language: str = DEFAULT_LANGUAGE
     ) -> bool:
         """
-        Envia email para um paciente.
+        Envia um email pelo SendGrid e registra as métricas da entrega.
         
         Args:
-            db: Sessão do banco de dados
-            patient_id: ID do paciente
+            address: Endereço de email do destinatário
+            recipient_name: Nome do destinatário
             title: Título do email
             message: Conteúdo do email
             notification_type: Tipo de notificação
+            enqueued_at: Instante (time.monotonic) em que a notificação foi aceita
+            recipient: Descrição do destinatário para os logs
+            language: Idioma do texto fixo do email
             
         Returns:
             True se o email foi enviado com sucesso
         """
         try:
-            # Buscar o paciente
-            query = select(Patient).where(Patient.id == patient_id)
-            result = await db.execute(query)
-            patient = result.scalars().first()
-            
-            if not patient or not patient.email:
-                logger.warning(f"Paciente {patient_id} não tem email")
-                return False
-            
             # Configurar SendGrid
-            sg_api_key = os.getenv("SENDGRID_API_KEY")
-            if not sg_api_key:
+            sg = _get_sendgrid_client()
+            if not sg:
+                record_delivery("email", notification_type, enqueued_at, "not_configured")
                 logger.error("API key do SendGrid não configurada")
                 return False
             
             from_email = Email(os.getenv("EMAIL_FROM", "noreply@ceriv.org.br"))
-            from_name = os.getenv("EMAIL_NAME", "CER IV App")
-            to_email = patient.email
             
             # Criar email
             content = Content("text/html", NotificationService._generate_email_html(
-                title, message, patient.name, notification_type
+                title, message, recipient_name, notification_type, language
             ))
             
-            mail = Mail(from_email, to_email, title, content)
+            mail = Mail(from_email, address, title, content)
             
             # Enviar email
-            sg = SendGridAPIClient(sg_api_key)
-            response = sg.client.mail.send.post(request_body=mail.get())
+            response = await email_channel.call(sg.client.mail.send.post, request_body=mail.get())
             
-            logger.info(f"Email enviado para paciente {patient_id}: {response.status_code}")
-            return response.status_code == 202
+            sent = response.status_code == 202
+            record_delivery(
+                "email", notification_type, enqueued_at, None if sent else f"http_{response.status_code}"
+            )
+            logger.info(f"Email enviado para {recipient}: {response.status_code}")
+            return sent
             
         except Exception as e:
-            logger.error(f"Erro ao enviar email para paciente {patient_id}: {e}")
+            record_delivery("email", notification_type, enqueued_at, _failure_reason(e))
+            logger.error(f"Erro ao enviar email para {recipient}: {e}")
             return False
 
     @staticmethod
-    async def _send_user_email(
-        db: AsyncSession,
-        user_id: int, 
-        title: str, 
-        message: str, 
-        notification_type: str
+    async def _send_push(
+        profile: RecipientProfile,
+        title: str,
+        message: str,
+        data: Optional[Dict[str, Any]],
+        notification_type: str,
+        enqueued_at: Optional[float],
+        recipient: str
     ) -> bool:
         """
-        Envia email para um usuário.
+        Envia notificação push para um destinatário.
         
         Args:
-            db: Sessão do banco de dados
-            user_id: ID do usuário
+            profile: Contato e preferências do destinatário
+            title: Título da notificação
+            message: Mensagem da notificação
+            data: Dados adicionais para a notificação
+            notification_type: Tipo de notificação
+            enqueued_at: Instante (time.monotonic) em que a notificação foi aceita
+            recipient: Descrição do destinatário para os logs
+            
+        Returns:
+            True se a notificação foi enviada com sucesso
+        """
+        if not profile.fcm_token:
+            record_delivery("push", notification_type, enqueued_at, "no_token")
+            logger.warning(f"Destinatário {recipient} não tem token FCM")
+            return False
+        
+        return await NotificationService._push(
+            profile.fcm_token, title, message, data, notification_type, enqueued_at, recipient
+        )
+
+    @staticmethod
+    async def _send_email(
+        profile: RecipientProfile,
+        title: str,
+        message: str,
+        notification_type: str,
+        enqueued_at: Optional[float],
+        recipient: str
+    ) -> bool:
+        """
+        Envia email para um destinatário, no idioma de sua preferência.
+        
+        Args:
+            profile: Contato e preferências do destinatário
             title: Título do email
             message: Conteúdo do email
             notification_type: Tipo de notificação
+            enqueued_at: Instante (time.monotonic) em que a notificação foi aceita
+            recipient: Descrição do destinatário para os logs
             
         Returns:
             True se o email foi enviado com sucesso
         """
-        try:
-            # Buscar o usuário
-            query = select(User).where(User.id == user_id)
-            result = await db.execute(query)
-            user = result.scalars().first()
-            
-            if not user or not user.email:
-                logger.warning(f"Usuário {user_id} não tem email")
-                return False
-            
-            # Configurar SendGrid
-            sg_api_key = os.getenv("SENDGRID_API_KEY")
-            if not sg_api_key:
-                logger.error("API key do SendGrid não configurada")
-                return False
-            
-            from_email = Email(os.getenv("EMAIL_FROM", "noreply@ceriv.org.br"))
-            from_name = os.getenv("EMAIL_NAME", "CER IV App")
-            to_email = user.email
-            
-            # Criar email
-            content = Content("text/html", NotificationService._generate_email_html(
-                title, message, user.name, notification_type
-            ))
-            
-            mail = Mail(from_email, to_email, title, content)
-            
-            # Enviar email
-            sg = SendGridAPIClient(sg_api_key)
-            response = sg.client.mail.send.post(request_body=mail.get())
-            
-            logger.info(f"Email enviado para usuário {user_id}: {response.status_code}")
-            return response.status_code == 202
-            
-        except Exception as e:
-            logger.error(f"Erro ao enviar email para usuário {user_id}: {e}")
+        if not profile.email:
+            record_delivery("email", notification_type, enqueued_at, "no_email")
+            logger.warning(f"Destinatário {recipient} não tem email")
             return False
+        
+        return await NotificationService._email(
+            profile.email, profile.name, title, message, notification_type, enqueued_at, recipient,
+            profile.language
+        )
 
     @staticmethod
     def _generate_email_html(
         title: str, 
         message: str, 
         recipient_name: str, 
-        notification_type: str
+        notification_type: str,
+        language: str = DEFAULT_LANGUAGE
     ) -> str:
         """
         Gera o HTML para um email de notificação.
@@ -342,10 +797,17 @@ class NotificationService:
             message: Conteúdo do email
             recipient_name: Nome do destinatário
             notification_type: Tipo de notificação
+            language: Idioma do texto fixo (saudação, assinatura e rodapé)
             
         Returns:
             HTML do email
         """
+        strings = (
+            EMAIL_STRINGS.get(language)
+            or EMAIL_STRINGS.get(language.split("-")[0])
+            or EMAIL_STRINGS[DEFAULT_LANGUAGE]
+        )
+        
         # Cor do cabeçalho conforme o tipo
         header_color = "#005A9C"  # Padrão azul
         
@@ -359,7 +821,7 @@ class NotificationService:
         # Template básico HTML
         html = f"""
         <!DOCTYPE html>
-        <html>
+        <html lang="{language}">
         <head>
             <meta charset="UTF-8">
             <meta name="viewport" content="width=device-width, initial-scale=1.0">
@@ -401,12 +863,12 @@ class NotificationService:
                     <h1>{title}</h1>
                 </div>
                 <div class="content">
-                    <p>Olá, {recipient_name},</p>
+                    <p>{strings["greeting"]}, {recipient_name},</p>
                     <p>{message}</p>
-                    <p>Atenciosamente,<br>Equipe do CER IV</p>
+                    <p>{strings["signature"]}</p>
                 </div>
                 <div class="footer">
-                    <p>Esta é uma mensagem automática. Por favor, não responda a este email.</p>
+                    <p>{strings["automatic"]}</p>
                     <p>© {datetime.now().year} Centro Especializado em Reabilitação - CER IV</p>
                 </div>
             </div>
@@ -416,6 +878,41 @@ class NotificationService:
         
         return html
 
+    @staticmethod
+    def encode_cursor(notification: Notification) -> str:
+        """
+        Gera o cursor de paginação a partir da última notificação de uma página.
+        
+        Args:
+            notification: Última notificação retornada
+            
+        Returns:
+            Cursor opaco (base64) com created_at e id
+        """
+        raw = f"{notification.created_at.isoformat()}|{notification.id}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        """
+        Decodifica um cursor de paginação.
+        
+        Args:
+            cursor: Cursor gerado por encode_cursor
+            
+        Returns:
+            Tupla (created_at, id)
+            
+        Raises:
+            ValueError: Se o cursor for inválido
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+            created_at, notification_id = raw.rsplit("|", 1)
+            return datetime.fromisoformat(created_at), int(notification_id)
+        except Exception as e:
+            raise ValueError(f"Cursor inválido: {cursor}") from e
+
     @staticmethod
     async def get_notifications(
         db: AsyncSession,
@@ -423,22 +920,32 @@ class NotificationService:
         patient_id: Optional[int] = None,
         limit: int = 20,
         offset: int = 0,
-        unread_only: bool = False
+        unread_only: bool = False,
+        cursor: Optional[str] = None
     ) -> List[Notification]:
         """
         Retorna as notificações de um usuário ou paciente.
         
+        A paginação por cursor (created_at, id) usa os índices compostos e tem custo
+        constante por página; o offset é mantido apenas por compatibilidade.
+        
         Args:
             db: Sessão do banco de dados
             user_id: ID do usuário
             patient_id: ID do paciente
             limit: Número máximo de notificações
-            offset: Número de notificações a pular
+            offset: Número de notificações a pular (ignorado quando há cursor)
             unread_only: Se deve retornar apenas notificações não lidas
+            cursor: Cursor da página anterior (ver encode_cursor)
             
         Returns:
             Lista de notificações
+            
+        Raises:
+            ValueError: Se o cursor for inválido
         """
+        position = NotificationService.decode_cursor(cursor) if cursor else None
+        
         try:
             query = select(Notification)
             
@@ -451,7 +958,13 @@ class NotificationService:
             if unread_only:
                 query = query.where(Notification.read == False)
             
-            query = query.order_by(Notification.created_at.desc()).limit(limit).offset(offset)
+            if position:
+                query = query.where(tuple_(Notification.created_at, Notification.id) < tuple_(*position))
+            
+            query = query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit)
+            
+            if offset and not position:
+                query = query.offset(offset)
             
             result = await db.execute(query)
             notifications = result.scalars().all()
@@ -462,10 +975,150 @@ class NotificationService:
             logger.error(f"Erro ao buscar notificações: {e}")
             return []
 
+    @staticmethod
+    def _counter_upsert(column: str, recipient_id: int, delta: int, reset: bool = False):
+        """
+        Monta o upsert do contador de não lidas de um paciente ou usuário.
+        
+        Args:
+            column: Coluna do destinatário ("patient_id" ou "user_id")
+            recipient_id: ID do paciente ou usuário
+            delta: Valor a somar ao contador (negativo para decrementar)
+            reset: Se deve zerar o contador em vez de somar
+            
+        Returns:
+            Instrução INSERT ... ON CONFLICT DO UPDATE
+        """
+        new_value = 0 if reset else func.greatest(NotificationCounter.unread_count + delta, 0)
+        stmt = pg_insert(NotificationCounter).values(
+            **{column: recipient_id, "unread_count": 0 if reset else max(delta, 0)}
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[column],
+            set_={"unread_count": new_value, "updated_at": func.now()}
+        )
+
+    @staticmethod
+    async def _apply_read_rows(db: AsyncSession, rows: List[Any]) -> None:
+        """
+        Decrementa os contadores dos destinatários das notificações marcadas como lidas.
+        
+        Args:
+            db: Sessão do banco de dados
+            rows: Linhas (user_id, patient_id) retornadas pelo UPDATE ... RETURNING
+        """
+        users = Counter(row.user_id for row in rows if row.user_id)
+        patients = Counter(row.patient_id for row in rows if row.patient_id)
+        await NotificationService._decrement_counters(db, users, patients)
+
+    @staticmethod
+    async def _decrement_counters(
+        db: Union[AsyncSession, AsyncConnection],
+        users: Counter,
+        patients: Counter
+    ) -> None:
+        """
+        Decrementa os contadores de não lidas.
+        
+        Args:
+            db: Sessão ou conexão do banco de dados
+            users: Quantidade a descontar por user_id
+            patients: Quantidade a descontar por patient_id
+        """
+        for user_id, count in users.items():
+            await db.execute(NotificationService._counter_upsert("user_id", user_id, -count))
+        for patient_id, count in patients.items():
+            await db.execute(NotificationService._counter_upsert("patient_id", patient_id, -count))
+
+    @staticmethod
+    async def recount_partition_unread(conn: AsyncConnection, partition: str) -> None:
+        """
+        Recalcula os contadores dos destinatários de uma partição já desanexada.
+        
+        Descontar as não lidas antes do DETACH (em autocommit) disputava com as
+        marcações de leitura concorrentes, que também decrementam o contador.
+        Aqui os contadores dos destinatários são bloqueados e recontados a partir
+        da tabela, que não contém mais a partição: uma marcação em andamento
+        espera o bloqueio e decrementa o valor já recontado.
+        
+        Args:
+            conn: Conexão do banco de dados (autocommit)
+            partition: Nome da partição de `notifications`, já desanexada
+        """
+        result = await conn.execute(text(
+            f'SELECT DISTINCT user_id, patient_id FROM "{partition}" WHERE read = false'
+        ))
+        rows = result.all()
+        recipients = {
+            "user_id": sorted({row.user_id for row in rows if row.user_id}),
+            "patient_id": sorted({row.patient_id for row in rows if row.patient_id}),
+        }
+        
+        async with conn.engine.begin() as tx:
+            for column, ids in recipients.items():
+                if not ids:
+                    continue
+                # Bloqueio em ordem de ID para não entrar em impasse com outras recontagens
+                await tx.execute(
+                    text(
+                        f"SELECT 1 FROM notification_counters WHERE {column} = ANY(:ids) "
+                        f"ORDER BY {column} FOR UPDATE"
+                    ),
+                    {"ids": ids}
+                )
+                await tx.execute(
+                    text(
+                        f"UPDATE notification_counters c SET updated_at = now(), unread_count = ("
+                        f"SELECT count(*) FROM notifications n WHERE n.{column} = c.{column} AND n.read = false"
+                        f") WHERE c.{column} = ANY(:ids)"
+                    ),
+                    {"ids": ids}
+                )
+        
+        logger.info(
+            f"Contadores recalculados após remover {partition}: "
+            f"{len(recipients['user_id'])} usuários, {len(recipients['patient_id'])} pacientes"
+        )
+
+    @staticmethod
+    async def get_unread_count(
+        db: AsyncSession,
+        user_id: Optional[int] = None,
+        patient_id: Optional[int] = None
+    ) -> int:
+        """
+        Retorna o número de notificações não lidas a partir do contador mantido.
+        
+        Args:
+            db: Sessão do banco de dados
+            user_id: ID do usuário
+            patient_id: ID do paciente
+            
+        Returns:
+            Número de notificações não lidas
+        """
+        try:
+            if patient_id:
+                condition = NotificationCounter.patient_id == patient_id
+            elif user_id:
+                condition = NotificationCounter.user_id == user_id
+            else:
+                return 0
+            
+            query = select(NotificationCounter.unread_count).where(condition)
+            count = await db.scalar(query)
+            return count or 0
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar contador de notificações: {e}")
+            return 0
+
     @staticmethod
     async def mark_as_read(
         db: AsyncSession,
-        notification_id: int
+        notification_id: int,
+        user_id: Optional[int] = None,
+        patient_id: Optional[int] = None
     ) -> bool:
         """
         Marca uma notificação como lida.
@@ -473,21 +1126,36 @@ class NotificationService:
         Args:
             db: Sessão do banco de dados
             notification_id: ID da notificação
+            user_id: Se informado, exige que a notificação pertença ao usuário
+            patient_id: Se informado, exige que a notificação pertença ao paciente
             
         Returns:
             True se a notificação foi marcada como lida
         """
         try:
-            query = select(Notification).where(Notification.id == notification_id)
-            result = await db.execute(query)
-            notification = result.scalars().first()
+            conditions = [Notification.id == notification_id]
+            if user_id:
+                conditions.append(Notification.user_id == user_id)
+            if patient_id:
+                conditions.append(Notification.patient_id == patient_id)
             
-            if not notification:
-                return False
+            # Atualizar apenas se ainda não lida, retornando os destinatários
+            stmt = (
+                update(Notification)
+                .where(*conditions, Notification.read == False)
+                .values(read=True, read_at=func.now())
+                .returning(Notification.user_id, Notification.patient_id)
+                .execution_options(synchronize_session=False)
+            )
+            result = await db.execute(stmt)
+            rows = result.all()
             
-            notification.read = True
-            notification.read_at = datetime.now()
+            if not rows:
+                # Nenhuma linha alterada: a notificação já estava lida ou não existe
+                query = select(Notification.id).where(*conditions)
+                return await db.scalar(query) is not None
             
+            await NotificationService._apply_read_rows(db, rows)
             await db.commit()
             return True
             
@@ -516,29 +1184,26 @@ class NotificationService:
             if not user_id and not patient_id:
                 return 0
             
-            # Buscar notificações não lidas
-            query = select(Notification).where(Notification.read == False)
+            # Marcar como lidas em uma única instrução
+            stmt = update(Notification).where(Notification.read == False)
             
             if user_id:
-                query = query.where(Notification.user_id == user_id)
+                stmt = stmt.where(Notification.user_id == user_id)
             
             if patient_id:
-                query = query.where(Notification.patient_id == patient_id)
+                stmt = stmt.where(Notification.patient_id == patient_id)
             
-            result = await db.execute(query)
-            notifications = result.scalars().all()
-            
-            # Marcar como lidas
-            now = datetime.now()
-            count = 0
-            
-            for notification in notifications:
-                notification.read = True
-                notification.read_at = now
-                count += 1
+            stmt = (
+                stmt.values(read=True, read_at=func.now())
+                .returning(Notification.user_id, Notification.patient_id)
+                .execution_options(synchronize_session=False)
+            )
+            result = await db.execute(stmt)
+            rows = result.all()
             
+            await NotificationService._apply_read_rows(db, rows)
             await db.commit()
-            return count
+            return len(rows)
             
         except Exception as e:
             logger.error(f"Erro ao marcar todas notificações como lidas: {e}")
@@ -555,11 +1220,12 @@ async def send_notification(
     user_id: Optional[int] = None,
     patient_id: Optional[int] = None,
     send_push: bool = True,
-    send_email: bool = True
+    send_email: bool = True,
+    send_at: Optional[datetime] = None
 ) -> Optional[Notification]:
     """Wrapper para enviar uma notificação."""
     return await NotificationService.send_notification(
-        db, title, message, notification_type, data, user_id, patient_id, send_push, send_email
+        db, title, message, notification_type, data, user_id, patient_id, send_push, send_email, send_at
     )
 
 
@@ -571,11 +1237,12 @@ async def send_patient_notification(
     notification_type: str,
     data: Optional[Dict[str, Any]] = None,
     send_push: bool = True,
-    send_email: bool = True
+    send_email: bool = True,
+    send_at: Optional[datetime] = None
 ) -> Optional[Notification]:
     """Wrapper para enviar uma notificação para um paciente."""
     return await NotificationService.send_notification(
-        db, title, message, notification_type, data, None, patient_id, send_push, send_email
+        db, title, message, notification_type, data, None, patient_id, send_push, send_email, send_at
     )
 
 
@@ -587,9 +1254,10 @@ async def send_user_notification(
     notification_type: str,
     data: Optional[Dict[str, Any]] = None,
     send_push: bool = True,
-    send_email: bool = True
+    send_email: bool = True,
+    send_at: Optional[datetime] = None
 ) -> Optional[Notification]:
     """Wrapper para enviar uma notificação para um usuário."""
     return await NotificationService.send_notification(
-        db, title, message, notification_type, data, user_id, None, send_push, send_email
+        db, title, message, notification_type, data, user_id, None, send_push, send_email, send_at
     )
\ No newline at end of file
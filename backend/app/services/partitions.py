@@ -0,0 +1,175 @@
+import logging
+import re
+from datetime import date
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Partições mensais seguem o padrão <tabela>_yAAAAmMM
+PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+# Esquema para onde vão as partições arquivadas
+ARCHIVE_SCHEMA = "archive"
+
+
+def add_months(month: date, count: int) -> date:
+    """Soma `count` meses ao primeiro dia de `month`."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Nome da partição mensal de uma tabela."""
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[Tuple[str, date]]:
+    """
+    Lista as partições mensais anexadas a uma tabela.
+
+    Args:
+        conn: Conexão com o banco de dados
+        table: Nome da tabela particionada
+
+    Returns:
+        Lista de (nome da partição, primeiro dia do mês), em ordem cronológica
+    """
+    result = await conn.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+            """
+        ),
+        {"table": table},
+    )
+
+    partitions = []
+    for (name,) in result.all():
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+
+    return sorted(partitions, key=lambda p: p[1])
+
+
+async def ensure_monthly_partitions(conn: AsyncConnection, table: str, months_ahead: int) -> List[str]:
+    """
+    Cria as partições do mês atual e dos próximos `months_ahead` meses que ainda não existem.
+
+    Args:
+        conn: Conexão com o banco de dados
+        table: Nome da tabela particionada
+        months_ahead: Quantidade de meses futuros a manter criados
+
+    Returns:
+        Nomes das partições criadas
+    """
+    existing = {name for name, _ in await list_partitions(conn, table)}
+    current = date.today().replace(day=1)
+    created = []
+
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(table, month)
+        if name in existing:
+            continue
+
+        await conn.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+        )
+        created.append(name)
+        logger.info(f"Partição {name} criada")
+
+    return created
+
+
+async def remove_expired_partitions(
+    conn: AsyncConnection,
+    table: str,
+    retention_months: int,
+    mode: str = "archive",
+    before_remove: Optional[Callable[[AsyncConnection, str], Awaitable[None]]] = None,
+    after_detach: Optional[Callable[[AsyncConnection, str], Awaitable[None]]] = None
+) -> List[str]:
+    """
+    Desanexa as partições mais antigas que a retenção e as arquiva ou remove.
+
+    A conexão deve estar em autocommit: DETACH PARTITION CONCURRENTLY não roda em transação.
+
+    Args:
+        conn: Conexão com o banco de dados (autocommit)
+        table: Nome da tabela particionada
+        retention_months: Meses completos a manter, além do mês atual
+        mode: "archive" (move para o esquema de arquivo) ou "drop" (remove a partição)
+        before_remove: Função chamada com cada partição antes de desanexá-la
+        after_detach: Função chamada com cada partição já desanexada, antes de arquivá-la ou removê-la
+
+    Returns:
+        Nomes das partições removidas da tabela
+    """
+    if mode not in ("archive", "drop"):
+        raise ValueError(f"Modo de retenção inválido: {mode}")
+
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+    removed = []
+
+    for name, month in await list_partitions(conn, table):
+        if month >= cutoff:
+            break
+
+        if before_remove:
+            await before_remove(conn, name)
+
+        await conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}" CONCURRENTLY'))
+
+        if after_detach:
+            await after_detach(conn, name)
+
+        if mode == "drop":
+            await conn.execute(text(f'DROP TABLE "{name}"'))
+        else:
+            await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{ARCHIVE_SCHEMA}"'))
+            await conn.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{ARCHIVE_SCHEMA}"'))
+
+        removed.append(name)
+        logger.info(f"Partição {name} removida de {table} (modo {mode})")
+
+    return removed
+
+
+async def maintain_monthly_partitions(
+    engine: AsyncEngine,
+    table: str,
+    months_ahead: int,
+    retention_months: int,
+    mode: str = "archive",
+    before_remove: Optional[Callable[[AsyncConnection, str], Awaitable[None]]] = None,
+    after_detach: Optional[Callable[[AsyncConnection, str], Awaitable[None]]] = None
+) -> None:
+    """
+    Rotina de manutenção: cria partições futuras e remove as expiradas.
+
+    Args:
+        engine: Engine assíncrona do banco de dados
+        table: Nome da tabela particionada
+        months_ahead: Quantidade de meses futuros a manter criados
+        retention_months: Meses completos a manter, além do mês atual
+        mode: "archive" ou "drop"
+        before_remove: Função chamada com cada partição antes de desanexá-la
+        after_detach: Função chamada com cada partição já desanexada
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await ensure_monthly_partitions(conn, table, months_ahead)
+        await remove_expired_partitions(conn, table, retention_months, mode, before_remove, after_detach)
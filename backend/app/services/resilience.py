@@ -0,0 +1,262 @@
+import asyncio
+import functools
+import logging
+import random
+import time
+from typing import Any, Callable, Optional, Tuple
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Erro lançado quando o circuito de um canal está aberto e a chamada é descartada."""
+
+
+class TokenBucket:
+    """
+    Limitador de taxa por balde de fichas.
+
+    Repõe `rate` fichas por segundo até `capacity`. `acquire` aguarda até haver
+    ficha disponível; `try_acquire` responde imediatamente.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Repõe as fichas proporcionalmente ao tempo decorrido."""
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Tenta consumir fichas sem aguardar.
+
+        Args:
+            tokens: Número de fichas a consumir
+
+        Returns:
+            True se as fichas foram consumidas
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return False
+
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Consome fichas, aguardando a reposição quando necessário.
+
+        Args:
+            tokens: Número de fichas a consumir
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Suspende a emissão de fichas (ex.: provedor respondeu 429 com Retry-After).
+
+        Args:
+            seconds: Duração da pausa em segundos
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class CircuitBreaker:
+    """
+    Disjuntor simples com estados fechado, aberto e semiaberto.
+
+    Abre após `failure_threshold` falhas consecutivas e, passado
+    `recovery_timeout`, libera uma única chamada de teste.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Indica se uma chamada pode ser feita agora."""
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+            logger.info(f"Circuito '{self.name}' semiaberto: testando provedor")
+
+        # Semiaberto: apenas uma chamada de teste por vez
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        """Registra uma chamada bem-sucedida."""
+        if self.state != self.CLOSED:
+            logger.info(f"Circuito '{self.name}' fechado: provedor recuperado")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Registra uma falha do provedor."""
+        self.failures += 1
+        self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuito '{self.name}' aberto após {self.failures} falhas")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Atraso exponencial com jitter completo para a tentativa informada (a partir de 0)."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def _never_retry(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """Classificador padrão: nenhuma exceção é considerada transitória."""
+    return False, None
+
+
+class ResilientChannel:
+    """
+    Envolve um canal de entrega (push, email) com limite de taxa,
+    novas tentativas com backoff exponencial e jitter, e disjuntor.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_second: float,
+        burst: Optional[float] = None,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        classify: Callable[[BaseException], Tuple[bool, Optional[float]]] = _never_retry,
+        observer: Optional[Callable[[str, float], None]] = None
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.breaker = CircuitBreaker(name, failure_threshold, recovery_timeout)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.classify = classify
+        self.observer = observer
+        self.in_flight = 0
+
+    def _backoff(self, attempt: int) -> float:
+        """Atraso exponencial com jitter completo para a tentativa informada."""
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+    async def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Executa uma chamada bloqueante ao provedor em uma thread, respeitando os limites do canal.
+
+        Args:
+            func: Função do SDK do provedor
+            *args: Argumentos posicionais da função
+            **kwargs: Argumentos nomeados da função
+
+        Returns:
+            Retorno da função
+
+        Raises:
+            CircuitOpenError: Se o circuito estiver aberto
+            Exception: Última exceção do provedor, se as tentativas se esgotarem
+        """
+        self.in_flight += 1
+        try:
+            return await self._call(functools.partial(func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+
+    def _observe(self, outcome: str, started_at: float) -> None:
+        """Informa ao observador a duração de uma tentativa."""
+        if self.observer:
+            self.observer(outcome, time.monotonic() - started_at)
+
+    async def _call(self, call: Callable[[], Any]) -> Any:
+        """Laço de tentativas de `call`."""
+        attempt = 0
+
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Canal '{self.name}' indisponível (circuito aberto)")
+
+            await self.bucket.acquire()
+
+            started_at = time.monotonic()
+            try:
+                result = await asyncio.to_thread(call)
+            except Exception as e:
+                self._observe("error", started_at)
+                retryable, retry_after = self.classify(e)
+
+                if not retryable:
+                    # Erro da requisição (token inválido, email inválido): o provedor está saudável
+                    self.breaker.record_success()
+                    raise
+
+                self.breaker.record_failure()
+
+                if retry_after:
+                    # Provedor pediu para aguardar: pausar todo o canal, não só esta chamada
+                    self.bucket.pause(retry_after)
+
+                if attempt >= self.max_retries:
+                    raise
+
+                delay = max(retry_after or 0.0, self._backoff(attempt))
+                attempt += 1
+                logger.warning(
+                    f"Falha transitória no canal '{self.name}' ({e}); "
+                    f"tentativa {attempt}/{self.max_retries} em {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            self._observe("ok", started_at)
+            self.breaker.record_success()
+            return result
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import select, update
+
+from app.database import SessionLocal
+from app.models import ScheduledNotification
+from app.services.metrics import NOTIFICATION_FAILURES, NOTIFICATION_QUEUE_DEPTH
+from app.services.notification_preferences import preference_cache
+from app.services.notifications import NotificationService
+from app.services.resilience import backoff_delay
+from app.services.timer_wheel import HierarchicalTimerWheel
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Janela carregada do banco a cada ciclo e intervalo entre as cargas (segundos)
+SCHEDULED_LOAD_WINDOW_SECONDS = int(os.getenv("SCHEDULED_NOTIFICATION_WINDOW_SECONDS", "300"))
+SCHEDULED_LOAD_INTERVAL_SECONDS = int(os.getenv("SCHEDULED_NOTIFICATION_LOAD_INTERVAL_SECONDS", "30"))
+
+# Máximo de notificações reivindicadas por instrução
+SCHEDULED_DISPATCH_BATCH = 100
+
+# Novas tentativas de envios que falharam: mesma política de backoff dos canais, em escala de minutos
+SCHEDULED_MAX_RETRIES = int(os.getenv("NOTIFICATION_MAX_RETRIES", "3"))
+SCHEDULED_RETRY_BASE_SECONDS = 30.0
+SCHEDULED_RETRY_MAX_SECONDS = 1800.0
+
+
+class ScheduledNotificationDispatcher:
+    """
+    Dispara as notificações agendadas no horário.
+
+    A cada ciclo de carga, as notificações pendentes com `send_at` dentro da
+    próxima janela são lidas pelo índice parcial de pendentes e colocadas em
+    uma roda de temporizadores em memória; o tique de 1s apenas avança a roda,
+    sem consultar a tabela. As vencidas são reivindicadas (pending -> sending)
+    com UPDATE ... RETURNING, o que evita envio duplicado se houver mais de um
+    scheduler, e então enviadas por NotificationService.send_notification.
+    """
+
+    def __init__(self, session_factory=SessionLocal, window_seconds: int = SCHEDULED_LOAD_WINDOW_SECONDS):
+        self.session_factory = session_factory
+        self.window_seconds = window_seconds
+        self.wheel = HierarchicalTimerWheel(start=time.time())
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Número de notificações carregadas aguardando o horário de envio."""
+        return len(self.wheel)
+
+    async def recover(self) -> int:
+        """
+        Devolve para pendentes as notificações que ficaram em envio (processo interrompido).
+
+        Deve ser chamado apenas na inicialização do scheduler.
+
+        Returns:
+            Número de notificações recuperadas
+        """
+        async with self.session_factory() as db:
+            stmt = (
+                update(ScheduledNotification)
+                .where(ScheduledNotification.status == "sending")
+                .values(status="pending")
+                .returning(ScheduledNotification.id)
+                .execution_options(synchronize_session=False)
+            )
+            recovered = (await db.scalars(stmt)).all()
+            await db.commit()
+
+        if recovered:
+            logger.warning(f"{len(recovered)} notificações agendadas voltaram para pendentes")
+        return len(recovered)
+
+    async def load_window(self) -> int:
+        """
+        Carrega na roda as notificações pendentes que vencem até o fim da próxima janela.
+
+        Returns:
+            Número de notificações adicionadas à roda
+        """
+        horizon = datetime.now(timezone.utc) + timedelta(seconds=self.window_seconds)
+
+        async with self.session_factory() as db:
+            query = (
+                select(ScheduledNotification.id, ScheduledNotification.send_at)
+                .where(ScheduledNotification.status == "pending", ScheduledNotification.send_at < horizon)
+                .order_by(ScheduledNotification.send_at)
+            )
+            rows = (await db.execute(query)).all()
+
+        added = 0
+        for row in rows:
+            if row.id not in self.wheel:
+                self.wheel.schedule(row.id, row.send_at.timestamp())
+                added += 1
+
+        if added:
+            logger.info(f"{added} notificações agendadas carregadas até {horizon.isoformat()}")
+        return added
+
+    async def tick(self) -> None:
+        """Avança a roda até o instante atual e dispara as notificações vencidas."""
+        due = self.wheel.advance(time.time())
+
+        for start in range(0, len(due), SCHEDULED_DISPATCH_BATCH):
+            task = asyncio.create_task(self.dispatch(due[start:start + SCHEDULED_DISPATCH_BATCH]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def dispatch(self, scheduled_ids: List[int]) -> int:
+        """
+        Reivindica e envia um lote de notificações agendadas.
+
+        Args:
+            scheduled_ids: IDs das notificações vencidas
+
+        Returns:
+            Número de notificações enviadas
+        """
+        sent = 0
+
+        try:
+            async with self.session_factory() as db:
+                # Canceladas ou já reivindicadas por outro processo não retornam
+                stmt = (
+                    update(ScheduledNotification)
+                    .where(ScheduledNotification.id.in_(scheduled_ids), ScheduledNotification.status == "pending")
+                    .values(status="sending")
+                    .returning(ScheduledNotification)
+                    .execution_options(synchronize_session=False)
+                )
+                claimed = (await db.scalars(stmt)).all()
+                await db.commit()
+                # Fora da sessão, um rollback após falha no envio não expira os demais do lote
+                db.expunge_all()
+
+                # Contatos e preferências do lote inteiro em uma consulta por tipo de destinatário
+                await preference_cache.load(
+                    db,
+                    patient_ids={s.patient_id for s in claimed if s.patient_id},
+                    user_ids={s.user_id for s in claimed if s.user_id}
+                )
+
+                for scheduled in claimed:
+                    scheduled_id, attempts, notification_type = scheduled.id, scheduled.attempts, scheduled.type
+                    
+                    try:
+                        if scheduled.notification_id:
+                            # Notificação já persistida: apenas a entrega havia sido adiada
+                            await NotificationService._deliver(
+                                db, scheduled.title, scheduled.message, scheduled.type, scheduled.data,
+                                scheduled.user_id, scheduled.patient_id, scheduled.send_push, scheduled.send_email,
+                                notification_id=scheduled.notification_id
+                            )
+                            notification_id = scheduled.notification_id
+                        else:
+                            notification = await NotificationService.send_notification(
+                                db, scheduled.title, scheduled.message, scheduled.type, scheduled.data,
+                                scheduled.user_id, scheduled.patient_id, scheduled.send_push, scheduled.send_email
+                            )
+                            notification_id = notification.id if notification else None
+                    except Exception as e:
+                        logger.error(f"Erro ao enviar notificação agendada {scheduled_id}: {e}")
+                        await db.rollback()
+                        notification_id = None
+                    
+                    if notification_id:
+                        values = {
+                            "status": "sent",
+                            "notification_id": notification_id,
+                            "sent_at": datetime.now(timezone.utc),
+                        }
+                        sent += 1
+                    else:
+                        values = self._failure_values(scheduled_id, attempts, notification_type)
+                    
+                    await db.execute(
+                        update(ScheduledNotification)
+                        .where(ScheduledNotification.id == scheduled_id)
+                        .values(**values)
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+
+        except Exception as e:
+            logger.error(f"Erro ao disparar notificações agendadas: {e}")
+
+        return sent
+
+    def _failure_values(self, scheduled_id: int, attempts: int, notification_type: str) -> Dict[str, Any]:
+        """
+        Decide o destino de um envio agendado que falhou.
+
+        Até SCHEDULED_MAX_RETRIES novas tentativas, a notificação volta para
+        pendente com `send_at` adiado por backoff exponencial com jitter (e entra
+        na roda se couber na janela atual); depois disso, fica como falha.
+
+        Returns:
+            Valores a gravar em ScheduledNotification
+        """
+        if attempts < SCHEDULED_MAX_RETRIES:
+            delay = backoff_delay(attempts, SCHEDULED_RETRY_BASE_SECONDS, SCHEDULED_RETRY_MAX_SECONDS)
+            send_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            if delay < self.window_seconds:
+                self.wheel.schedule(scheduled_id, send_at.timestamp())
+            
+            NOTIFICATION_FAILURES.labels("scheduled", notification_type, "retrying").inc()
+            logger.warning(
+                f"Falha no envio da notificação agendada {scheduled_id}; "
+                f"tentativa {attempts + 1}/{SCHEDULED_MAX_RETRIES} em {delay:.0f}s"
+            )
+            return {"status": "pending", "attempts": attempts + 1, "send_at": send_at}
+        
+        NOTIFICATION_FAILURES.labels("scheduled", notification_type, "exhausted").inc()
+        logger.error(f"Notificação agendada {scheduled_id} falhou após {attempts + 1} tentativas")
+        return {"status": "failed", "attempts": attempts + 1, "sent_at": datetime.now(timezone.utc)}
+    
+    async def drain(self) -> None:
+        """Aguarda os disparos em andamento."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Instância do processo do scheduler
+dispatcher = ScheduledNotificationDispatcher()
+NOTIFICATION_QUEUE_DEPTH.labels("scheduled").set_function(lambda: dispatcher.pending)
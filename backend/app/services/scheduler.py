@@ -1,22 +1,119 @@
-import time
+import asyncio
 import logging
+import os
+import signal
 from datetime import datetime
 
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from app.database import engine
+from app.services.chat_archive import CHAT_MESSAGE_HOT_MONTHS, archive_message_partition
+from app.services.metrics import start_metrics_server
+from app.services.notification_coalescer import coalescer
+from app.services.notifications import NotificationService
+from app.services.partitions import maintain_monthly_partitions
+from app.services.scheduled_notifications import SCHEDULED_LOAD_INTERVAL_SECONDS, dispatcher
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def main():
+# Partições da tabela de notificações
+NOTIFICATION_PARTITION_MONTHS_AHEAD = int(os.getenv("NOTIFICATION_PARTITION_MONTHS_AHEAD", "3"))
+NOTIFICATION_RETENTION_MONTHS = int(os.getenv("NOTIFICATION_RETENTION_MONTHS", "24"))
+NOTIFICATION_RETENTION_MODE = os.getenv("NOTIFICATION_RETENTION_MODE", "archive")  # archive, drop
+
+# Partições futuras das mensagens do chat (a retenção é CHAT_MESSAGE_HOT_MONTHS, de chat_archive)
+CHAT_MESSAGE_PARTITION_MONTHS_AHEAD = int(os.getenv("CHAT_MESSAGE_PARTITION_MONTHS_AHEAD", "3"))
+
+# Porta das métricas do processo do scheduler
+SCHEDULER_METRICS_PORT = int(os.getenv("SCHEDULER_METRICS_PORT", "9101"))
+
+
+async def maintain_notification_partitions():
+    """Cria as partições futuras de notificações e remove as que passaram da retenção."""
+    try:
+        await maintain_monthly_partitions(
+            engine,
+            "notifications",
+            NOTIFICATION_PARTITION_MONTHS_AHEAD,
+            NOTIFICATION_RETENTION_MONTHS,
+            NOTIFICATION_RETENTION_MODE,
+            after_detach=NotificationService.recount_partition_unread,
+        )
+    except Exception as e:
+        logger.error(f'Erro na manutenção das partições de notificações: {e}')
+
+
+async def maintain_message_partitions():
+    """Cria as partições futuras de mensagens e move as frias para o arquivo compactado."""
+    try:
+        # A partição só é removida depois de copiada para message_archive
+        await maintain_monthly_partitions(
+            engine,
+            "messages",
+            CHAT_MESSAGE_PARTITION_MONTHS_AHEAD,
+            CHAT_MESSAGE_HOT_MONTHS,
+            "drop",
+            before_remove=archive_message_partition,
+        )
+    except Exception as e:
+        logger.error(f'Erro na manutenção das partições de mensagens: {e}')
+
+
+async def load_scheduled_notifications():
+    """Carrega na roda de temporizadores as notificações agendadas da próxima janela."""
+    try:
+        await dispatcher.load_window()
+    except Exception as e:
+        logger.error(f'Erro ao carregar notificações agendadas: {e}')
+
+
+async def run():
     logger.info('Scheduler service started')
-    
-    while True:
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        logger.info(f'Scheduler running at {current_time}')
-        
-        # Adicione aqui a lógica que o scheduler precisa executar
-        # Por exemplo, verificação de tarefas pendentes, alertas, etc.
-        
-        # Espera 60 segundos antes da próxima execução
-        time.sleep(60)
+    start_metrics_server(SCHEDULER_METRICS_PORT)
+
+    await dispatcher.recover()
+
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(
+        load_scheduled_notifications, 'interval', seconds=SCHEDULED_LOAD_INTERVAL_SECONDS,
+        id='scheduled_notifications_load', next_run_time=datetime.now()
+    )
+    # O tique só avança a roda em memória; não consulta o banco
+    scheduler.add_job(dispatcher.tick, 'interval', seconds=1, id='scheduled_notifications_tick')
+    # Diariamente de madrugada e também na inicialização
+    scheduler.add_job(
+        maintain_notification_partitions, 'cron', hour=3, minute=0,
+        id='notification_partitions', next_run_time=datetime.now()
+    )
+    scheduler.add_job(
+        maintain_message_partitions, 'cron', hour=3, minute=30,
+        id='message_partitions', next_run_time=datetime.now()
+    )
+    scheduler.start()
+
+    # docker stop envia SIGTERM: encerrar pelo finally para não perder o que está agrupado
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await stop.wait()
+        logger.info('Scheduler service stopping')
+    finally:
+        scheduler.shutdown(wait=False)
+        await dispatcher.drain()
+        # Enviar notificações ainda agrupadas na janela de resumo
+        await coalescer.flush_all()
+
+
+def main():
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, SystemExit):
+        logger.info('Scheduler service stopped')
+
 
 if __name__ == '__main__':
     main()
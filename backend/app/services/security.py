@@ -152,6 +152,40 @@ async def get_current_user(
     return user
 
 
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    """
+    Valida o token JWT e retorna suas declarações, sem consultar o banco.
+    
+    Usado pelas rotas acessadas tanto por pacientes quanto por profissionais
+    (o token do paciente não corresponde a um registro de User).
+    
+    Args:
+        token: Token JWT
+        
+    Returns:
+        Declarações do token (sub, id, role, exp)
+        
+    Raises:
+        HTTPException: Se o token for inválido ou não identificar o titular
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Credenciais inválidas",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    try:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as e:
+        logger.error(f"Erro ao decodificar token: {e}")
+        raise credentials_exception
+    
+    if payload.get("id") is None or not payload.get("role"):
+        raise credentials_exception
+    
+    return payload
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
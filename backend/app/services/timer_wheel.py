@@ -0,0 +1,138 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+class HierarchicalTimerWheel:
+    """
+    Roda de temporizadores hierárquica (Varghese & Lauck).
+
+    Cada nível tem `size` posições com granularidade igual ao alcance do nível
+    anterior; com os tamanhos padrão (60, 60, 24) e tique de 1s, os níveis cobrem
+    1 minuto, 1 hora e 1 dia. Agendar e disparar custam O(1) amortizado: um item
+    desce de nível quando a posição do nível superior é alcançada. Itens além do
+    alcance total ficam em uma lista de espera reavaliada a cada volta do último nível.
+    """
+
+    def __init__(self, start: float, tick_seconds: float = 1.0, level_sizes: Sequence[int] = (60, 60, 24)):
+        self.tick_seconds = tick_seconds
+        self.level_sizes = tuple(level_sizes)
+        self.current = int(start // tick_seconds)
+
+        # Granularidade (em tiques) de cada nível
+        self.granularities = []
+        granularity = 1
+        for size in self.level_sizes:
+            self.granularities.append(granularity)
+            granularity *= size
+        self.horizon = granularity
+
+        self.levels: List[List[Dict[Hashable, int]]] = [
+            [{} for _ in range(size)] for size in self.level_sizes
+        ]
+        self.overflow: Dict[Hashable, int] = {}
+        self.due: List[Hashable] = []
+        self._positions: Dict[Hashable, Optional[Tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def schedule(self, key: Hashable, when: float) -> None:
+        """
+        Agenda um item (reagenda se já existir).
+
+        Args:
+            key: Identificador do item
+            when: Instante de disparo (segundos desde a época)
+        """
+        self.cancel(key)
+        self._place(key, int(when // self.tick_seconds))
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Remove um item agendado.
+
+        Args:
+            key: Identificador do item
+
+        Returns:
+            True se o item estava agendado
+        """
+        if key not in self._positions:
+            return False
+
+        position = self._positions.pop(key)
+        if position is None:
+            self.overflow.pop(key, None)
+            if key in self.due:
+                self.due.remove(key)
+        else:
+            level, slot = position
+            self.levels[level][slot].pop(key, None)
+        return True
+
+    def _place(self, key: Hashable, tick: int) -> None:
+        """Coloca o item no nível mais baixo cujo alcance cobre o seu tique."""
+        delta = tick - self.current
+        if delta <= 0:
+            self.due.append(key)
+            self._positions[key] = None
+            return
+
+        for level, (size, granularity) in enumerate(zip(self.level_sizes, self.granularities)):
+            if delta < size * granularity:
+                slot = (tick // granularity) % size
+                self.levels[level][slot][key] = tick
+                self._positions[key] = (level, slot)
+                return
+
+        self.overflow[key] = tick
+        self._positions[key] = None
+
+    def _cascade(self, level: int) -> None:
+        """Redistribui a posição atual de um nível entre os níveis inferiores."""
+        slot = (self.current // self.granularities[level]) % self.level_sizes[level]
+        items = self.levels[level][slot]
+        self.levels[level][slot] = {}
+        for key, tick in items.items():
+            self._place(key, tick)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """
+        Avança a roda até `now` e retorna os itens vencidos.
+
+        Args:
+            now: Instante atual (segundos desde a época)
+
+        Returns:
+            Identificadores dos itens cujo instante de disparo chegou
+        """
+        target = int(now // self.tick_seconds)
+
+        while self.current < target:
+            self.current += 1
+
+            # Níveis superiores descem antes de disparar o nível 0
+            for level in range(len(self.level_sizes) - 1, 0, -1):
+                if self.current % self.granularities[level] == 0:
+                    self._cascade(level)
+
+            if self.current % self.horizon == 0 and self.overflow:
+                waiting = self.overflow
+                self.overflow = {}
+                for key, tick in waiting.items():
+                    self._place(key, tick)
+
+            slot = self.current % self.level_sizes[0]
+            fired = self.levels[0][slot]
+            if fired:
+                self.levels[0][slot] = {}
+                for key in fired:
+                    self.due.append(key)
+                    self._positions[key] = None
+
+        due, self.due = self.due, []
+        for key in due:
+            self._positions.pop(key, None)
+        return due
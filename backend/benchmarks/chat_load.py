@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""
+Teste de carga do servidor de chat (app/services/chat_server.py) com clientes
+Socket.IO simulados.
+
+Cada conversa tem um paciente simulado; os profissionais simulados atendem
+--conversations-per-staff conversas cada. Os clientes se conectam, entram nas
+salas e enviam mensagens em intervalos exponenciais (--patient-rate e
+--staff-rate, mensagens por segundo por conversa). Ao final são informados:
+
+- latência de entrega (envio até o new_message chegar ao outro participante);
+- atraso de gravação (envio até o message_ack com o ID definitivo);
+- mensagens perdidas e erros recebidos;
+- memória residente do servidor (--server-pid, lida de /proc).
+
+O servidor deve estar em execução, com o mesmo JWT_SECRET_KEY deste processo,
+e os pacientes e profissionais de --patient-id-start / --staff-id-start em
+diante devem existir no banco (as conversas referenciam patients e users).
+
+Uso:
+    python -m benchmarks.chat_load --url http://127.0.0.1:8001 --conversations 2000 \\
+        --conversations-per-staff 20 --patient-rate 0.2 --staff-rate 0.2 --duration 60 \\
+        --server-pid $(pgrep -f chat_server)
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import socketio
+
+# Adicionar diretório do projeto ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.notification_throughput import percentile
+from app.services.chat_wire import FIELD_CODES, OPAQUE_KEY_FIELDS, WIRE_MSGPACK
+from app.services.security import create_access_token
+
+logger = logging.getLogger("chat_load")
+
+# Campos do formato compacto de volta para os nomes originais
+FIELD_NAMES = {code: name for name, code in FIELD_CODES.items()}
+OPAQUE_KEY_CODES = {FIELD_CODES.get(name, name) for name in OPAQUE_KEY_FIELDS}
+
+
+def expand(value: Any, opaque_keys: bool = False) -> Any:
+    """Desfaz os códigos curtos de um payload no formato compacto."""
+    if isinstance(value, dict):
+        if opaque_keys:
+            return {key: expand(item) for key, item in value.items()}
+        return {FIELD_NAMES.get(key, key): expand(item, key in OPAQUE_KEY_CODES) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item) for item in value]
+    return value
+
+
+def decode(payload: Any) -> Any:
+    """Decodifica um evento recebido em JSON ou MessagePack."""
+    if isinstance(payload, (bytes, bytearray)):
+        import msgpack
+        return expand(msgpack.unpackb(payload, raw=False))
+    return payload
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Memória residente de um processo em MB (Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+@dataclass
+class LoadStats:
+    """Métricas agregadas de todos os clientes simulados."""
+
+    sent_at: Dict[str, float] = field(default_factory=dict)  # conteúdo -> instante do envio
+    delivery: List[float] = field(default_factory=list)
+    persistence: List[float] = field(default_factory=list)
+    counts: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    memory: List[float] = field(default_factory=list)
+
+
+class SimulatedClient:
+    """Paciente ou profissional conectado ao chat."""
+
+    def __init__(self, role: str, user_id: int, wire_format: str, stats: LoadStats):
+        self.role = role
+        self.user_id = user_id
+        self.key = f"{role}-{user_id}"
+        self.wire_format = wire_format
+        self.stats = stats
+        self.conversations: List[str] = []
+        self.active: set = set()  # Conversas já criadas (o profissional só responde depois)
+        self._pending_acks: Dict[str, float] = {}
+
+        self.token = create_access_token(
+            {"sub": f"bench-{self.key}@example.org", "id": user_id, "role": role},
+        )
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on("new_message", self._on_new_message)
+        self.sio.on("message_ack", self._on_message_ack)
+        self.sio.on("message_error", self._on_error("message_error"))
+        self.sio.on("rate_limited", self._on_rate_limited)
+        self.sio.on("error", self._on_error("error"))
+
+    async def connect(self, url: str) -> None:
+        query = f"?format={WIRE_MSGPACK}" if self.wire_format == WIRE_MSGPACK else ""
+        await self.sio.connect(
+            url + query,
+            headers={"Authorization": f"Bearer {self.token}"},
+            transports=["websocket"],
+        )
+
+    async def join(self) -> None:
+        for conversation_id in self.conversations:
+            await self.sio.emit("join_conversation", {"conversation_id": conversation_id})
+
+    async def send(self, conversation_id: str, seq: int) -> None:
+        content = f"bench|{self.key}|{conversation_id}|{seq}"
+        self.stats.sent_at[content] = time.monotonic()
+        self.stats.counts["sent"] += 1
+        await self.sio.emit("send_message", {
+            "conversation_id": conversation_id,
+            "content": content,
+            "encrypted": False,
+        })
+
+    async def _on_new_message(self, payload: Any) -> None:
+        message = decode(payload)
+        now = time.monotonic()
+        content = message.get("content", "")
+        if not content.startswith("bench|"):
+            return
+
+        sent_at = self.stats.sent_at.get(content)
+        if sent_at is None:
+            return
+
+        if content.split("|")[1] == self.key:
+            # Eco da própria mensagem: aguardar a confirmação da gravação
+            self._pending_acks[message["id"]] = sent_at
+        else:
+            self.stats.delivery.append(now - sent_at)
+            self.stats.counts["delivered"] += 1
+            self.active.add(message["conversation_id"])
+
+    async def _on_message_ack(self, payload: Any) -> None:
+        now = time.monotonic()
+        for item in decode(payload).get("messages", []):
+            sent_at = self._pending_acks.pop(item["temp_id"], None)
+            if sent_at is not None:
+                self.stats.persistence.append(now - sent_at)
+                self.stats.counts["persisted"] += 1
+
+    async def _on_rate_limited(self, payload: Any) -> None:
+        payload = decode(payload)
+        self.stats.errors[f"rate_limited: {payload.get('event')} ({payload.get('reason')})"] += 1
+
+    def _on_error(self, event: str):
+        async def handler(payload: Any = None) -> None:
+            payload = decode(payload) or {}
+            self.stats.errors[f"{event}: {payload.get('message', '')}"] += 1
+        return handler
+
+
+async def send_loop(client: SimulatedClient, conversation_id: str, rate: float, deadline: float) -> None:
+    """Envia mensagens com intervalos exponenciais (processo de Poisson) até o prazo."""
+    seq = 0
+    while True:
+        await asyncio.sleep(random.expovariate(rate))
+        if time.monotonic() >= deadline:
+            return
+        # O profissional só escreve em conversas que o paciente já criou
+        if client.role == "staff" and conversation_id not in client.active:
+            continue
+        try:
+            await client.send(conversation_id, seq)
+        except socketio.exceptions.SocketIOError as e:
+            client.stats.errors[f"send: {e}"] += 1
+            return
+        seq += 1
+
+
+async def sample_memory(pid: int, stats: LoadStats, stop: asyncio.Event) -> None:
+    """Amostra a memória do servidor a cada segundo."""
+    while not stop.is_set():
+        value = rss_mb(pid)
+        if value is not None:
+            stats.memory.append(value)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def connect_all(clients: List[SimulatedClient], url: str, rate: float, stats: LoadStats) -> None:
+    """Conecta os clientes a --connect-rate conexões por segundo."""
+    tasks = []
+    for client in clients:
+        tasks.append(asyncio.create_task(client.connect(url)))
+        await asyncio.sleep(1 / rate)
+
+    for client, result in zip(clients, await asyncio.gather(*tasks, return_exceptions=True)):
+        if isinstance(result, Exception):
+            stats.errors[f"connect: {result}"] += 1
+        else:
+            stats.counts["connected"] += 1
+
+
+async def run(args: argparse.Namespace) -> None:
+    stats = LoadStats()
+
+    # Um paciente por conversa; cada profissional atende até --conversations-per-staff
+    conversation_ids = [str(uuid.uuid4()) for _ in range(args.conversations)]
+    patients = [
+        SimulatedClient("patient", args.patient_id_start + i, args.format, stats)
+        for i in range(args.conversations)
+    ]
+    staff = [
+        SimulatedClient("staff", args.staff_id_start + j, args.format, stats)
+        for j in range(math.ceil(args.conversations / args.conversations_per_staff))
+    ]
+    for i, conversation_id in enumerate(conversation_ids):
+        patients[i].conversations.append(conversation_id)
+        staff[i // args.conversations_per_staff].conversations.append(conversation_id)
+
+    clients = staff + patients
+    stop_sampling = asyncio.Event()
+    sampler = None
+    if args.server_pid:
+        sampler = asyncio.create_task(sample_memory(args.server_pid, stats, stop_sampling))
+
+    logger.info(f"Conectando {len(patients)} pacientes e {len(staff)} profissionais a {args.url}")
+    started = time.monotonic()
+    await connect_all(clients, args.url, args.connect_rate, stats)
+    connected = [client for client in clients if client.sio.connected]
+    await asyncio.gather(*(client.join() for client in connected))
+    logger.info(f"{len(connected)} clientes conectados em {time.monotonic() - started:.1f}s")
+
+    logger.info(f"Enviando mensagens por {args.duration}s")
+    started = time.monotonic()
+    deadline = started + args.duration
+    loops = []
+    for client in connected:
+        rate = args.patient_rate if client.role == "patient" else args.staff_rate
+        if rate > 0:
+            loops.extend(send_loop(client, conversation_id, rate, deadline) for conversation_id in client.conversations)
+    await asyncio.gather(*loops)
+    elapsed = time.monotonic() - started
+
+    # Aguardar entregas e confirmações em trânsito
+    await asyncio.sleep(args.drain)
+
+    stop_sampling.set()
+    if sampler:
+        await sampler
+    await asyncio.gather(*(client.sio.disconnect() for client in connected), return_exceptions=True)
+
+    delivery = sorted(stats.delivery)
+    persistence = sorted(stats.persistence)
+    sent = stats.counts["sent"]
+
+    def summary(values: List[float]) -> str:
+        return (
+            f"p50={percentile(values, 50) * 1000:.1f} "
+            f"p95={percentile(values, 95) * 1000:.1f} "
+            f"p99={percentile(values, 99) * 1000:.1f} "
+            f"max={(values[-1] if values else 0) * 1000:.1f}"
+        )
+
+    print()
+    print(f"Clientes:            {stats.counts['connected']}/{len(clients)} conectados ({args.format})")
+    print(f"Conversas:           {args.conversations} ({args.conversations_per_staff} por profissional)")
+    print(f"Mensagens enviadas:  {sent} em {elapsed:.1f}s ({sent / elapsed:.1f}/s)")
+    print(f"Entregues / gravadas: {stats.counts['delivered']} / {stats.counts['persisted']} "
+          f"(perdidas: {sent - stats.counts['delivered']})")
+    print(f"Entrega (ms):        {summary(delivery)}")
+    print(f"Gravação (ms):       {summary(persistence)}")
+    if stats.memory:
+        print(f"Memória do servidor: início={stats.memory[0]:.0f}MB pico={max(stats.memory):.0f}MB "
+              f"fim={stats.memory[-1]:.0f}MB")
+    if stats.errors:
+        print("Erros:")
+        for error, count in stats.errors.most_common(10):
+            print(f"  {count:6d}  {error}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logger.setLevel(logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de chat")
+    parser.add_argument("--url", default="http://127.0.0.1:8001", help="URL do servidor Socket.IO")
+    parser.add_argument("--conversations", type=int, default=1000, help="Conversas (um paciente por conversa)")
+    parser.add_argument("--conversations-per-staff", type=int, default=20)
+    parser.add_argument("--patient-rate", type=float, default=0.1, help="Mensagens/s de cada paciente")
+    parser.add_argument("--staff-rate", type=float, default=0.1, help="Mensagens/s por conversa de cada profissional")
+    parser.add_argument("--duration", type=float, default=60.0, help="Duração do envio (segundos)")
+    parser.add_argument("--drain", type=float, default=5.0, help="Espera final por entregas e confirmações")
+    parser.add_argument("--connect-rate", type=float, default=200.0, help="Novas conexões por segundo")
+    parser.add_argument("--format", choices=("json", WIRE_MSGPACK), default="json", help="Formato de transmissão")
+    parser.add_argument("--patient-id-start", type=int, default=1, help="Primeiro ID de paciente existente")
+    parser.add_argument("--staff-id-start", type=int, default=1, help="Primeiro ID de profissional existente")
+    parser.add_argument("--server-pid", type=int, help="PID do servidor para medir a memória")
+
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+"""
+Servidores HTTP locais que imitam o FCM (envio e batch) e o SendGrid (mail send).
+
+Permitem testar a vazão do NotificationService sem acessar os provedores reais,
+com latência, taxa de erros e limitação (429) configuráveis.
+
+Uso isolado:
+    python -m benchmarks.fake_providers --fcm-port 9901 --sendgrid-port 9902 --rate-limit 500
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+from aiohttp import web
+
+# Configuração de logging
+logger = logging.getLogger("fake_providers")
+
+
+@dataclass
+class ProviderBehavior:
+    """Comportamento simulado de um provedor."""
+
+    latency_ms: float = 50.0           # Latência média por requisição
+    jitter: float = 0.5                # Variação relativa da latência (0.5 = ±50%)
+    error_rate: float = 0.0            # Fração de requisições que falham com 500/503
+    rate_limit: Optional[float] = None  # Requisições por segundo antes de responder 429
+    retry_after: int = 1               # Valor do cabeçalho Retry-After nas respostas 429
+    stats: Counter = field(default_factory=Counter)
+
+    def __post_init__(self):
+        self._tokens = self.rate_limit or 0.0
+        self._updated_at = time.monotonic()
+
+    def _throttled(self) -> bool:
+        """Balde de fichas do provedor: True se a requisição excede o limite."""
+        if not self.rate_limit:
+            return False
+
+        now = time.monotonic()
+        self._tokens = min(self.rate_limit, self._tokens + (now - self._updated_at) * self.rate_limit)
+        self._updated_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return False
+        return True
+
+    async def outcome(self) -> Tuple[int, float]:
+        """
+        Simula uma requisição.
+
+        Returns:
+            Tupla (status HTTP, latência simulada em segundos)
+        """
+        if self._throttled():
+            self.stats["429"] += 1
+            return 429, 0.0
+
+        latency = self.latency_ms / 1000 * random.uniform(1 - self.jitter, 1 + self.jitter)
+        await asyncio.sleep(latency)
+
+        if random.random() < self.error_rate:
+            status = random.choice((500, 503))
+            self.stats[str(status)] += 1
+            return status, latency
+
+        self.stats["ok"] += 1
+        return 200, latency
+
+
+# ====== FCM ======
+
+FCM_STATUS = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+_message_ids = itertools.count(1)
+
+
+def _fcm_error(status: int) -> dict:
+    """Corpo de erro no formato da API v1 do FCM."""
+    return {"error": {"code": status, "message": "Erro simulado", "status": FCM_STATUS[status]}}
+
+
+def create_fcm_app(behavior: ProviderBehavior) -> web.Application:
+    """
+    Cria o servidor falso do FCM HTTP v1.
+
+    Rotas:
+        POST /v1/projects/{project}/messages:send
+        POST /batch (multipart/mixed, usado por messaging.send_all)
+        GET  /stats
+
+    Args:
+        behavior: Comportamento simulado
+
+    Returns:
+        Aplicação aiohttp
+    """
+
+    async def send(request: web.Request) -> web.Response:
+        await request.read()
+        status, _ = await behavior.outcome()
+
+        if status == 200:
+            project = request.match_info["project"]
+            return web.json_response({"name": f"projects/{project}/messages/{next(_message_ids)}"})
+
+        headers = {"Retry-After": str(behavior.retry_after)} if status == 429 else None
+        return web.json_response(_fcm_error(status), status=status, headers=headers)
+
+    async def batch(request: web.Request) -> web.Response:
+        body = (await request.read()).decode("utf-8")
+        match = re.search(r"boundary=\"?([^\";]+)\"?", request.headers.get("Content-Type", ""))
+        if not match:
+            return web.Response(status=400, text="Cabeçalho multipart sem boundary")
+        boundary = match.group(1)
+
+        # Cada parte é uma requisição HTTP embutida; o batch inteiro paga uma latência
+        parts = [p for p in body.split(f"--{boundary}") if p.strip() and p.strip() != "--"]
+        status, _ = await behavior.outcome()
+        if status == 429:
+            return web.json_response(
+                _fcm_error(429), status=429, headers={"Retry-After": str(behavior.retry_after)}
+            )
+
+        out_boundary = f"batch_{next(_message_ids)}"
+        chunks = []
+        for part in parts:
+            match = re.search(r"Content-ID:\s*<([^>]+)>", part, re.IGNORECASE)
+            content_id = match.group(1) if match else ""
+
+            part_status = 200 if random.random() >= behavior.error_rate else 503
+            behavior.stats["batch_ok" if part_status == 200 else "batch_503"] += 1
+            payload = (
+                {"name": f"projects/bench/messages/{next(_message_ids)}"}
+                if part_status == 200 else _fcm_error(503)
+            )
+            reason = "OK" if part_status == 200 else "Service Unavailable"
+            chunks.append(
+                f"--{out_boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {part_status} {reason}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        chunks.append(f"--{out_boundary}--\r\n")
+
+        return web.Response(
+            body="".join(chunks).encode("utf-8"),
+            headers={"Content-Type": f"multipart/mixed; boundary={out_boundary}"},
+        )
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(dict(behavior.stats))
+
+    app = web.Application(client_max_size=32 * 1024 * 1024)
+    app.router.add_post("/v1/projects/{project}/messages:send", send)
+    app.router.add_post("/batch", batch)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+# ====== SendGrid ======
+
+def create_sendgrid_app(behavior: ProviderBehavior) -> web.Application:
+    """
+    Cria o servidor falso do SendGrid v3.
+
+    Rotas:
+        POST /v3/mail/send
+        GET  /stats
+
+    Args:
+        behavior: Comportamento simulado
+
+    Returns:
+        Aplicação aiohttp
+    """
+
+    async def mail_send(request: web.Request) -> web.Response:
+        await request.read()
+        status, _ = await behavior.outcome()
+
+        if status == 200:
+            return web.Response(status=202)
+
+        if status == 429:
+            return web.json_response(
+                {"errors": [{"message": "too many requests"}]},
+                status=429,
+                headers={
+                    "Retry-After": str(behavior.retry_after),
+                    "X-RateLimit-Reset": str(int(time.time()) + behavior.retry_after),
+                },
+            )
+
+        return web.json_response({"errors": [{"message": "Erro simulado"}]}, status=status)
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(dict(behavior.stats))
+
+    app = web.Application()
+    app.router.add_post("/v3/mail/send", mail_send)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+async def start_site(app: web.Application, host: str, port: int) -> web.AppRunner:
+    """
+    Inicia uma aplicação aiohttp no loop atual.
+
+    Args:
+        app: Aplicação aiohttp
+        host: Endereço de escuta
+        port: Porta de escuta
+
+    Returns:
+        Runner (chamar `cleanup()` para encerrar)
+    """
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adiciona ao parser as opções de comportamento dos provedores falsos."""
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência média dos provedores")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Variação relativa da latência")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 5xx")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Limite (req/s) antes de 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After das respostas 429")
+
+
+def behavior_from_args(args: argparse.Namespace) -> ProviderBehavior:
+    """Monta o comportamento simulado a partir dos argumentos da linha de comando."""
+    return ProviderBehavior(
+        latency_ms=args.latency_ms,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+    )
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    """Mantém os dois servidores falsos no ar até interrupção."""
+    fcm = await start_site(create_fcm_app(behavior_from_args(args)), args.host, args.fcm_port)
+    sendgrid = await start_site(create_sendgrid_app(behavior_from_args(args)), args.host, args.sendgrid_port)
+    logger.info(f"FCM falso em http://{args.host}:{args.fcm_port}")
+    logger.info(f"SendGrid falso em http://{args.host}:{args.sendgrid_port}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fcm.cleanup()
+        await sendgrid.cleanup()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Servidores falsos de FCM e SendGrid")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--fcm-port", type=int, default=9901)
+    parser.add_argument("--sendgrid-port", type=int, default=9902)
+    add_behavior_arguments(parser)
+
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Benchmark de vazão do pipeline de entrega de notificações.
+
+Sobe os provedores falsos (benchmarks.fake_providers) no próprio processo,
+aponta o firebase_admin e o SendGrid para eles e envia N notificações pelos
+mesmos caminhos usados em produção (NotificationService._push / _email, com
+limite de taxa, novas tentativas e disjuntor). Ao final informa a vazão e a
+latência de cauda.
+
+Uso:
+    python -m benchmarks.notification_throughput --count 5000 --concurrency 200 \\
+        --channel both --latency-ms 80 --error-rate 0.01 --rate-limit 400 --client-rate 350
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+# Adicionar diretório do projeto ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_providers import (
+    add_behavior_arguments, behavior_from_args, create_fcm_app, create_sendgrid_app, start_site
+)
+
+logger = logging.getLogger("notification_throughput")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil pelo método do vizinho mais próximo (valores já ordenados)."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+def configure_firebase(fcm_url: str) -> None:
+    """
+    Inicializa o firebase_admin apontando para o FCM falso, sem credenciais reais.
+
+    Args:
+        fcm_url: URL base do servidor falso do FCM
+    """
+    import firebase_admin
+    from firebase_admin import credentials, messaging
+    from google.auth.credentials import AnonymousCredentials
+
+    class BenchCredential(credentials.Base):
+        def get_credential(self):
+            return AnonymousCredentials()
+
+    # O SDK não expõe a URL do FCM como opção; sobrescrever antes do primeiro envio
+    messaging._MessagingService.FCM_URL = fcm_url + "/v1/projects/{0}/messages:send"
+    messaging._MessagingService.FCM_BATCH_URL = fcm_url + "/batch"
+
+    firebase_admin.initialize_app(BenchCredential(), {"projectId": "ceriv-bench"})
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Executa o benchmark e imprime o relatório."""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+
+    fcm_behavior = behavior_from_args(args)
+    sendgrid_behavior = behavior_from_args(args)
+    fcm_runner = await start_site(create_fcm_app(fcm_behavior), "127.0.0.1", args.fcm_port)
+    sendgrid_runner = await start_site(create_sendgrid_app(sendgrid_behavior), "127.0.0.1", args.sendgrid_port)
+
+    # Configurar o serviço antes de importá-lo (os canais leem o ambiente na importação)
+    os.environ.pop("FIREBASE_CREDENTIALS_PATH", None)
+    os.environ["SENDGRID_API_KEY"] = "SG.benchmark"
+    os.environ["SENDGRID_API_HOST"] = f"http://127.0.0.1:{args.sendgrid_port}"
+    os.environ["FCM_RATE_LIMIT_PER_SECOND"] = str(args.client_rate)
+    os.environ["SENDGRID_RATE_LIMIT_PER_SECOND"] = str(args.client_rate)
+    os.environ["NOTIFICATION_MAX_RETRIES"] = str(args.max_retries)
+    configure_firebase(f"http://127.0.0.1:{args.fcm_port}")
+
+    from app.services.notifications import NotificationService, email_channel, push_channel
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    results: Counter = Counter()
+
+    async def deliver(i: int) -> None:
+        async with semaphore:
+            started = time.monotonic()
+            ok = True
+            if args.channel in ("push", "both"):
+                ok = await NotificationService._push(
+                    f"bench-token-{i}", "Benchmark", f"Notificação {i}", {"seq": i},
+                    "system", started, f"bench {i}"
+                ) and ok
+            if args.channel in ("email", "both"):
+                ok = await NotificationService._email(
+                    f"bench{i}@example.org", "Paciente Benchmark", "Benchmark", f"Notificação {i}",
+                    "system", started, f"bench {i}"
+                ) and ok
+            latencies.append(time.monotonic() - started)
+            results["ok" if ok else "failed"] += 1
+
+    logger.info(f"Enviando {args.count} notificações ({args.channel}), concorrência {args.concurrency}")
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*(deliver(i) for i in range(args.count)))
+    finally:
+        elapsed = time.monotonic() - started
+        await fcm_runner.cleanup()
+        await sendgrid_runner.cleanup()
+
+    latencies.sort()
+    print()
+    print(f"Notificações:      {args.count} ({args.channel})")
+    print(f"Tempo total:       {elapsed:.2f}s")
+    print(f"Vazão:             {args.count / elapsed:.1f} notificações/s")
+    print(f"Sucesso / falha:   {results['ok']} / {results['failed']}")
+    print(
+        "Latência (ms):     "
+        f"p50={percentile(latencies, 50) * 1000:.1f} "
+        f"p95={percentile(latencies, 95) * 1000:.1f} "
+        f"p99={percentile(latencies, 99) * 1000:.1f} "
+        f"max={(latencies[-1] if latencies else 0) * 1000:.1f}"
+    )
+    print(f"FCM falso:         {dict(fcm_behavior.stats)} (circuito {push_channel.breaker.state})")
+    print(f"SendGrid falso:    {dict(sendgrid_behavior.stats)} (circuito {email_channel.breaker.state})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logger.setLevel(logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Benchmark de vazão de notificações")
+    parser.add_argument("--count", type=int, default=5000, help="Número de notificações")
+    parser.add_argument("--concurrency", type=int, default=200, help="Envios simultâneos")
+    parser.add_argument("--channel", choices=("push", "email", "both"), default="push")
+    parser.add_argument("--client-rate", type=float, default=500.0, help="Limite do cliente (req/s por canal)")
+    parser.add_argument("--max-retries", type=int, default=3, help="Novas tentativas por envio")
+    parser.add_argument("--threads", type=int, default=64, help="Threads para as chamadas bloqueantes dos SDKs")
+    parser.add_argument("--fcm-port", type=int, default=9901)
+    parser.add_argument("--sendgrid-port", type=int, default=9902)
+    add_behavior_arguments(parser)
+
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,28 @@
+import importlib
+
+
+def test_chat_server_importa():
+    """O servidor do chat deve ser importável (sem conectar ao banco)."""
+    chat_server = importlib.import_module("app.services.chat_server")
+
+    assert chat_server.sio is not None
+    assert chat_server.app is not None
+
+
+def test_gerenciador_postgres_herda_pubsub():
+    from socketio.asyncio_pubsub_manager import AsyncPubSubManager
+
+    from app.services.chat_pubsub import AsyncPostgresManager
+
+    assert issubclass(AsyncPostgresManager, AsyncPubSubManager)
+
+
+def test_modelos_configuram():
+    """Os mapeamentos do ORM (relacionamentos e tabelas de associação) devem ser válidos."""
+    from sqlalchemy.orm import configure_mappers
+
+    from app.models import Guardian
+
+    configure_mappers()
+
+    assert Guardian.patients.property.secondary.name == "patient_guardian"